@@ -1,10 +1,11 @@
 import json
 import argparse
-import openai
-import os
+import sys
+from pathlib import Path
 
-
-openai.api_key = os.getenv("OPENAI-API-KEY")  # or: openai.api_key = "YOUR_API_KEY"
+# Shared OpenAI client (reads OPENAI_API_KEY from the environment)
+sys.path.append(str(Path(__file__).parent.parent))
+from llm_client import chat_completion
 
 def load_constraints(json_file):
     try:
@@ -82,7 +83,7 @@ def construct_prompt(user_input, constraints):
 
 def get_classified_action(prompt):
     try:
-        response = openai.ChatCompletion.create(
+        response = chat_completion(
             model="gpt-3.5-turbo",
             messages=[
                 {"role": "system", 
@@ -91,7 +92,7 @@ def get_classified_action(prompt):
             temperature=0.0  # Deterministic output
         )
         print(response)
-        action = response["choices"][0]["message"]["content"].strip()
+        action = response.choices[0].message.content.strip()
         return action
     except Exception as e:
         print(f"Error calling GPT API: {e}")
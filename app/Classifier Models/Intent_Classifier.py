@@ -71,9 +71,12 @@ class TextDataset(Dataset):
 
 # Roberta-based classifier (remains mostly unchanged)
 class RobertaClassifier(nn.Module):
-    def __init__(self, num_labels):
+    def __init__(self, num_labels, roberta_config=None):
         super(RobertaClassifier, self).__init__()
-        self.roberta = RobertaModel.from_pretrained('roberta-base')
+        if roberta_config is not None:
+            self.roberta = RobertaModel(roberta_config)
+        else:
+            self.roberta = RobertaModel.from_pretrained('roberta-base')
         self.dropout = nn.Dropout(0.1)
         self.classifier = nn.Linear(self.roberta.config.hidden_size, num_labels)
 
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+"""
+CPU benchmark of fixed (max_length) padding vs dynamic padding for the intent classifier.
+
+    python "app/Classifier Models/benchmark_padding.py" [--samples 500] [--batch-size 16]
+
+Reports per-sentence latency (batch size 1, like one Discord sentence) and batched throughput
+for each padding setting on app/data/Intent_dataset_combined.csv, plus how often the
+predictions differ from the fixed-padding baseline.
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import torch
+from transformers import RobertaTokenizer
+
+from Intent_Classifier import RobertaClassifier, LABELS, MAX_LENGTH, MODEL_SAVE_PATH
+from classifier_runtime import run_forward
+
+BENCHMARK_FILE = r"app\data\Intent_dataset_combined.csv"
+# BENCHMARK_FILE = "app/data/Intent_dataset_combined.csv"       # for MacOS
+
+SETTINGS = [
+    ("fixed (max_length)", "max_length", []),
+    ("dynamic (longest)", "longest", []),
+    ("dynamic + buckets", "longest", [16, 32, 64, 128]),
+]
+
+
+def time_per_sentence(model, tokenizer, texts, device, padding_mode, buckets):
+    latencies = []
+    for text in texts:
+        start = time.perf_counter()
+        run_forward(model, tokenizer, [text], device, MAX_LENGTH, padding_mode, buckets)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return np.percentile(latencies, 50), np.percentile(latencies, 95)
+
+
+def time_batched(model, tokenizer, texts, device, padding_mode, buckets, batch_size):
+    predictions = []
+    start = time.perf_counter()
+    for i in range(0, len(texts), batch_size):
+        logits = run_forward(model, tokenizer, texts[i:i + batch_size], device, MAX_LENGTH, padding_mode, buckets)
+        predictions.append((torch.sigmoid(logits) > 0.5).numpy())
+    elapsed = time.perf_counter() - start
+    return len(texts) / elapsed, np.concatenate(predictions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark fixed vs dynamic padding on CPU.")
+    parser.add_argument("--samples", type=int, default=500, help="Number of sentences from the dataset to use.")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--threads", type=int, default=None, help="torch.set_num_threads (defaults to torch's choice).")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    device = torch.device("cpu")
+    tokenizer = RobertaTokenizer.from_pretrained('roberta-base')
+    model = RobertaClassifier(len(LABELS))
+    if os.path.exists(MODEL_SAVE_PATH):
+        model.load_state_dict(torch.load(MODEL_SAVE_PATH, map_location=device))
+    else:
+        # Latency doesn't depend on the weights; predictions are only meaningful with the checkpoint.
+        print(f"{MODEL_SAVE_PATH} not found, benchmarking with an untrained head")
+    model.eval()
+
+    df = pd.read_csv(BENCHMARK_FILE)
+    texts = df["user_input"].astype(str).sample(n=min(args.samples, len(df)), random_state=42).tolist()
+    lengths = [len(ids) for ids in tokenizer(texts, truncation=True, max_length=MAX_LENGTH)["input_ids"]]
+    print(f"{len(texts)} sentences | tokens per sentence: mean {np.mean(lengths):.1f}, "
+          f"p95 {np.percentile(lengths, 95):.0f}, max {max(lengths)} (fixed padding uses {MAX_LENGTH})")
+    print(f"torch threads: {torch.get_num_threads()}\n")
+
+    # Warm up so the first setting doesn't pay for lazy initialization
+    run_forward(model, tokenizer, texts[:8], device, MAX_LENGTH, "max_length", [])
+
+    baseline = None
+    print(f"{'setting':<20} {'p50 ms/sent':>12} {'p95 ms/sent':>12} {f'sent/s @bs{args.batch_size}':>14} {'pred diff':>10}")
+    for name, padding_mode, buckets in SETTINGS:
+        p50, p95 = time_per_sentence(model, tokenizer, texts[:100], device, padding_mode, buckets)
+        throughput, predictions = time_batched(model, tokenizer, texts, device, padding_mode, buckets, args.batch_size)
+        if baseline is None:
+            baseline = predictions
+        diff = (predictions != baseline).any(axis=1).mean()
+        print(f"{name:<20} {p50:>12.1f} {p95:>12.1f} {throughput:>14.1f} {diff:>10.2%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+"""
+Startup-time benchmark for the classifier serving helpers.
+
+    python "app/Classifier Models/benchmark_startup.py" --bundle "app/Classifier Models/serving_bundle" [--runs 3]
+
+Each run starts a fresh Python process that initializes the intent and constraint classifiers,
+once with the original path (from_pretrained('roberta-base') + torch.load) and once from the
+local serving bundle with HF_HUB_OFFLINE=1 (so the bundle run proves no hub access is needed).
+Reports wall time and peak RSS of each child process.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+CHILD = r"""
+import json, sys, time
+start = time.perf_counter()
+from get_intent_classifier_outcome import initialize_intent_classifier, get_binary_outcome
+from get_constraint_classifier_outcome import initialize_constraint_classifier
+imported = time.perf_counter()
+initialize_intent_classifier()
+initialize_constraint_classifier()
+ready = time.perf_counter()
+get_binary_outcome("warm up")
+first = time.perf_counter()
+try:
+    import resource
+    scale = 1 if sys.platform == "darwin" else 1024  # ru_maxrss is bytes on macOS, KiB on Linux
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2**20
+except ImportError:  # Windows
+    peak_rss_mb = float("nan")
+print(json.dumps({"import_s": imported - start, "init_s": ready - imported,
+                  "first_prediction_s": first - ready, "peak_rss_mb": peak_rss_mb}))
+"""
+
+
+def run_child(env):
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD],
+        cwd=os.getcwd(),
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark classifier startup time.")
+    parser.add_argument("--bundle", required=True, help="Serving bundle written by export_serving_bundle.py")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    # Children import the helpers from this directory; run from the repo root like the bot
+    base_env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.abspath(__file__)))
+    base_env.pop("CLASSIFIER_BUNDLE_DIR", None)
+    modes = {
+        "from_pretrained + torch.load": base_env,
+        "local bundle (offline)": dict(base_env, CLASSIFIER_BUNDLE_DIR=args.bundle, HF_HUB_OFFLINE="1"),
+    }
+
+    print(f"{'mode':<30} {'import s':>9} {'init s':>8} {'1st pred s':>11} {'peak RSS MB':>12}")
+    for name, env in modes.items():
+        runs = [run_child(env) for _ in range(args.runs)]
+        median = {key: float(np.median([run[key] for run in runs])) for key in runs[0]}
+        print(f"{name:<30} {median['import_s']:>9.2f} {median['init_s']:>8.2f} "
+              f"{median['first_prediction_s']:>11.2f} {median['peak_rss_mb']:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
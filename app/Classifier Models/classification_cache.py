@@ -0,0 +1,113 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+
+#############################################
+# Sentence-level result cache in front of the serving helpers (get_*_outcome.py)
+CACHE_SIZE = int(os.environ.get("CLASSIFIER_CACHE_SIZE", "10000"))   # entries per model, 0 disables
+# Optional directory for a SQLite copy of each cache, so results survive bot restarts
+CACHE_DIR = os.environ.get("CLASSIFIER_CACHE_DIR", "")
+#############################################
+
+
+def normalize_sentence(text: str) -> str:
+    """Cache key for a sentence: whitespace collapsed. Case is kept, since the tokenizer is case-sensitive."""
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def file_signature(path: str) -> str:
+    """
+    Identifies a checkpoint file by path, size and modification time, so cached results are
+    dropped when the weights are replaced without reading hundreds of MB at startup.
+    """
+    stat = os.stat(path)
+    return f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+class ClassificationCache:
+    """
+    Bounded LRU of classifier results keyed by normalized sentence, for one model version.
+    The model version should identify everything that changes the outputs (checkpoint signature,
+    backend, quantization); entries persisted for any other version are discarded on load.
+    """
+
+    def __init__(self, name: str, model_version: str, max_entries: int = CACHE_SIZE, persist_dir: str = CACHE_DIR):
+        """
+        Args:
+            name (str): Model name, used for the SQLite file name
+            model_version (str): Identifies the weights/settings the results come from
+            max_entries (int): LRU capacity (0 disables caching)
+            persist_dir (str): Directory for the SQLite copy ("" keeps the cache in memory only)
+        """
+        self.name = name
+        self.model_version = model_version
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if persist_dir and max_entries:
+            os.makedirs(persist_dir, exist_ok=True)
+            self._db = sqlite3.connect(os.path.join(persist_dir, f"{name}_cache.sqlite"), check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS cache (sentence TEXT PRIMARY KEY, model_version TEXT, result TEXT)")
+            self._db.execute("DELETE FROM cache WHERE model_version != ?", (model_version,))
+            self._db.commit()
+            rows = self._db.execute("SELECT sentence, result FROM cache ORDER BY rowid DESC LIMIT ?", (max_entries,))
+            for sentence, result in reversed(rows.fetchall()):
+                self._entries[sentence] = json.loads(result)
+
+    def lookup(self, input_texts: list, compute) -> list:
+        """
+        Returns one result per input text. Texts missing from the cache (deduplicated by their
+        normalized form) are passed to `compute(texts) -> results` in a single call.
+        """
+        if not self.max_entries:
+            return compute(input_texts)
+
+        keys = [normalize_sentence(text) for text in input_texts]
+        results = {}
+        missing = OrderedDict()
+        with self._lock:
+            for key, text in zip(keys, input_texts):
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    results[key] = self._entries[key]
+                    self.hits += 1
+                else:
+                    missing.setdefault(key, text)
+                    self.misses += 1
+
+        if missing:
+            computed = compute(list(missing.values()))
+            with self._lock:
+                for key, result in zip(missing, computed):
+                    results[key] = result
+                    self._put(key, result)
+                if self._db is not None:
+                    self._db.commit()
+        return [results[key] for key in keys]
+
+    def _put(self, key, result):
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        if self._db is not None:
+            self._db.execute("INSERT OR REPLACE INTO cache VALUES (?, ?, ?)", (key, self.model_version, json.dumps(result)))
+        while len(self._entries) > self.max_entries:
+            evicted, _ = self._entries.popitem(last=False)
+            if self._db is not None:
+                self._db.execute("DELETE FROM cache WHERE sentence = ?", (evicted,))
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "model": self.name,
+            "model_version": self.model_version,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
@@ -73,9 +73,12 @@ class TextDataset(Dataset):
             return input_ids, attention_mask
 
 class RobertaBinaryClassifier(nn.Module):
-    def __init__(self):
+    def __init__(self, roberta_config=None):
         super(RobertaBinaryClassifier, self).__init__()
-        self.roberta = RobertaModel.from_pretrained('roberta-base')
+        if roberta_config is not None:
+            self.roberta = RobertaModel(roberta_config)
+        else:
+            self.roberta = RobertaModel.from_pretrained('roberta-base')
         self.dropout = nn.Dropout(0.1)
         # For a single binary label, output dimension is 1
         self.classifier = nn.Linear(self.roberta.config.hidden_size, 1)
@@ -0,0 +1,215 @@
+import os
+import torch
+from torch import nn
+from transformers import RobertaConfig, RobertaTokenizer
+from classification_cache import file_signature
+
+#############################################
+# Inference settings shared by the serving helpers (get_*_outcome.py)
+MAX_LENGTH = 128          # Maximum token length for RoBERTa (same as training)
+
+# "max_length" pads every sentence to MAX_LENGTH (same inputs as training).
+# "longest" pads only to the longest sentence in the batch (or in its length bucket).
+PADDING_MODE = os.environ.get("CLASSIFIER_PADDING", "max_length")
+
+# Optional length buckets for "longest" mode, e.g. CLASSIFIER_LENGTH_BUCKETS="16,32,64,128".
+# Sentences are grouped by the smallest bucket that fits them and each group runs as its
+# own forward, so one long sentence doesn't make a whole batch pay for its padding.
+LENGTH_BUCKETS = [int(b) for b in os.environ.get("CLASSIFIER_LENGTH_BUCKETS", "").split(",") if b.strip()]
+
+# "torch" runs the eager PyTorch models, "onnx" runs the graphs exported by export_onnx.py
+# with ONNX Runtime (CPU only; needs `pip install onnxruntime`).
+BACKEND = os.environ.get("CLASSIFIER_BACKEND", "torch")
+ONNX_THREADS = int(os.environ.get("CLASSIFIER_ONNX_THREADS", "0"))  # 0 lets ONNX Runtime decide
+
+# "int8" applies dynamic int8 quantization to the Linear layers (torch backend) or loads the
+# int8 graphs written by `export_onnx.py --quantize` (onnx backend). Quantized models run on CPU.
+QUANTIZE = os.environ.get("CLASSIFIER_QUANTIZE", "")
+
+# Local serving bundle written by export_serving_bundle.py. When set, models are built from the
+# bundled config (no roberta-base download), weights are loaded from memory-mapped safetensors
+# files and the tokenizer comes from the bundle, so startup needs no hub access.
+BUNDLE_DIR = os.environ.get("CLASSIFIER_BUNDLE_DIR", "")
+
+# ONNX graph paths
+INTENT_ONNX_PATH = r"app\Classifier Models\intent_classification.onnx"
+# INTENT_ONNX_PATH = "app/Classifier Models/intent_classification.onnx"       # for MacOS
+CONSTRAINT_ONNX_PATH = r"app\Classifier Models\Constraints.onnx"
+# CONSTRAINT_ONNX_PATH = "app/Classifier Models/Constraints.onnx"       # for MacOS
+RELEVANCE_ONNX_PATH = r"app\Classifier Models\relevance_classification.onnx"
+# RELEVANCE_ONNX_PATH = "app/Classifier Models/relevance_classification.onnx"       # for MacOS
+#############################################
+
+
+def load_tokenizer():
+    """The roberta-base tokenizer, from the serving bundle if CLASSIFIER_BUNDLE_DIR is set."""
+    if BUNDLE_DIR:
+        return RobertaTokenizer.from_pretrained(os.path.join(BUNDLE_DIR, "tokenizer"))
+    return RobertaTokenizer.from_pretrained('roberta-base')
+
+
+def load_classifier(build_model, bundle_name: str, checkpoint_path: str, device):
+    """
+    Builds a classifier and loads its fine-tuned weights.
+
+    `build_model(state_dict, roberta_config)` must return the model; `roberta_config` is None
+    when the encoder should come from `RobertaModel.from_pretrained('roberta-base')`.
+
+    With CLASSIFIER_BUNDLE_DIR set, the architecture is built from the bundled config without
+    initializing weights and the safetensors weights are assigned directly (no copy into a
+    freshly initialized model), so the roberta-base weights that the fine-tuned checkpoint
+    overwrites anyway are never downloaded. Otherwise this is the original from_pretrained +
+    torch.load path.
+    """
+    if BUNDLE_DIR:
+        from safetensors.torch import load_file
+        from transformers.modeling_utils import no_init_weights
+
+        model_dir = os.path.join(BUNDLE_DIR, bundle_name)
+        state_dict = load_file(os.path.join(model_dir, "model.safetensors"))
+        with no_init_weights():
+            model = build_model(state_dict, RobertaConfig.from_pretrained(model_dir))
+        model.load_state_dict(state_dict, assign=True)
+        return model.to(device)
+
+    state_dict = torch.load(checkpoint_path, map_location=device)
+    model = build_model(state_dict, None).to(device)
+    model.load_state_dict(state_dict)
+    return model
+
+
+def serving_model_version(bundle_name: str, checkpoint_path: str, onnx_path: str = None) -> str:
+    """
+    Identifies the weights and settings a helper serves with (signature of the file actually
+    loaded, backend and quantization). Used to invalidate cached classification results.
+    """
+    if onnx_path is not None and BACKEND == "onnx":
+        weights_path = serving_onnx_path(onnx_path)
+    elif BUNDLE_DIR:
+        weights_path = os.path.join(BUNDLE_DIR, bundle_name, "model.safetensors")
+    else:
+        weights_path = checkpoint_path
+    return f"{file_signature(weights_path)}:{BACKEND}:{QUANTIZE or 'fp32'}"
+
+
+def quantized_onnx_path(onnx_path: str) -> str:
+    """Path of the int8 graph written next to `onnx_path` by `export_onnx.py --quantize`."""
+    root, ext = os.path.splitext(onnx_path)
+    return f"{root}_int8{ext}"
+
+
+def serving_onnx_path(onnx_path: str) -> str:
+    """The fp32 or int8 graph, depending on CLASSIFIER_QUANTIZE."""
+    return quantized_onnx_path(onnx_path) if QUANTIZE == "int8" else onnx_path
+
+
+def quantize_dynamic_int8(model: nn.Module) -> nn.Module:
+    """
+    Dynamic int8 quantization of every Linear layer (weights stored as int8, activations
+    quantized on the fly). This covers almost all of RoBERTa's weights.
+    """
+    return torch.quantization.quantize_dynamic(model.to("cpu"), {nn.Linear}, dtype=torch.qint8)
+
+
+def prepare_for_serving(model: nn.Module, device):
+    """
+    Puts a loaded torch classifier in eval mode and applies CLASSIFIER_QUANTIZE.
+    Returns (model, device); quantized models always run on the CPU.
+    """
+    model.eval()
+    if QUANTIZE == "int8":
+        return quantize_dynamic_int8(model), torch.device("cpu")
+    return model, device
+
+
+class OnnxClassifierSession:
+    """
+    Wraps an ONNX Runtime session so it can be called like the torch classifiers:
+    `session(input_ids, attention_mask)` returns a logits tensor.
+    """
+
+    def __init__(self, onnx_path: str, num_threads: int = ONNX_THREADS):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(onnx_path, sess_options=options, providers=["CPUExecutionProvider"])
+
+    def __call__(self, input_ids, attention_mask):
+        logits = self.session.run(
+            ["logits"],
+            {
+                "input_ids": input_ids.cpu().numpy().astype("int64"),
+                "attention_mask": attention_mask.cpu().numpy().astype("int64"),
+            },
+        )[0]
+        return torch.from_numpy(logits)
+
+
+def group_by_length(lengths, buckets):
+    """
+    Groups indices by the smallest bucket boundary that fits each length (lengths above the
+    largest boundary share the last group). Returns a list of index lists.
+    """
+    if not buckets:
+        return [list(range(len(lengths)))]
+    buckets = sorted(buckets)
+    groups = {}
+    for i, length in enumerate(lengths):
+        bucket = next((b for b in buckets if length <= b), buckets[-1])
+        groups.setdefault(bucket, []).append(i)
+    return [groups[b] for b in sorted(groups)]
+
+
+def tokenize_batches(tokenizer, input_texts, max_length=MAX_LENGTH, padding_mode=None, buckets=None):
+    """
+    Tokenizes the input texts once and yields (indices, input_ids, attention_mask) for each
+    batch that should be run as a forward pass. `indices` are positions in `input_texts`.
+    """
+    padding_mode = padding_mode or PADDING_MODE
+    buckets = LENGTH_BUCKETS if buckets is None else buckets
+    encoded = tokenizer(list(input_texts), truncation=True, max_length=max_length, padding=False)["input_ids"]
+
+    if padding_mode == "max_length":
+        groups = [list(range(len(encoded)))]
+    elif padding_mode == "longest":
+        groups = group_by_length([len(ids) for ids in encoded], buckets)
+    else:
+        raise ValueError(f"Unknown padding mode: {padding_mode}")
+
+    for indices in groups:
+        padded = tokenizer.pad(
+            {"input_ids": [encoded[i] for i in indices]},
+            padding=padding_mode,
+            max_length=max_length,
+            return_tensors="pt"
+        )
+        yield indices, padded["input_ids"], padded["attention_mask"]
+
+
+def run_forward(forward, tokenizer, input_texts, device, max_length=MAX_LENGTH, padding_mode=None, buckets=None):
+    """
+    Runs `forward(input_ids, attention_mask)` over the input texts and returns its output on
+    the CPU, rows in the same order as `input_texts`. If `forward` returns a tuple of tensors
+    (e.g. the multi-head model), a tuple is returned; None entries are passed through.
+    """
+    outputs, order = [], []
+    with torch.no_grad():
+        for indices, input_ids, attention_mask in tokenize_batches(tokenizer, input_texts, max_length, padding_mode, buckets):
+            outputs.append(forward(input_ids.to(device), attention_mask.to(device)))
+            order.extend(indices)
+
+    # Undo the bucket grouping so row i belongs to input_texts[i]
+    inverse = torch.empty(len(order), dtype=torch.long)
+    inverse[torch.tensor(order, dtype=torch.long)] = torch.arange(len(order))
+
+    def merge(parts):
+        if parts[0] is None:
+            return None
+        return torch.cat([part.cpu() for part in parts])[inverse]
+
+    if isinstance(outputs[0], tuple):
+        return tuple(merge([output[k] for output in outputs]) for k in range(len(outputs[0])))
+    return merge(outputs)
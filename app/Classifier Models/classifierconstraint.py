@@ -77,9 +77,12 @@ class ConstraintDataset(Dataset):
 
 # Roberta-based classifier for single-label classification
 class RobertaClassifier(nn.Module):
-    def __init__(self, num_classes):
+    def __init__(self, num_classes, roberta_config=None):
         super(RobertaClassifier, self).__init__()
-        self.roberta = RobertaModel.from_pretrained('roberta-base')
+        if roberta_config is not None:
+            self.roberta = RobertaModel(roberta_config)
+        else:
+            self.roberta = RobertaModel.from_pretrained('roberta-base')
         self.dropout = nn.Dropout(0.1)
         self.classifier = nn.Linear(self.roberta.config.hidden_size, num_classes)
 
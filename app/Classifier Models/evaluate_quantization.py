@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+"""
+Offline evaluation of int8 dynamic quantization for the intent, constraint and relevance classifiers.
+
+    python "app/Classifier Models/evaluate_quantization.py" [--model intent|constraint|relevance|all] [--samples 1000]
+
+For every classifier this compares fp32 PyTorch with int8 PyTorch (quantize_dynamic on the Linear
+layers) and, if the graphs from `export_onnx.py --quantize` exist, fp32 vs int8 ONNX Runtime.
+It reports accuracy on the labelled CSVs in app/data, the accuracy delta vs fp32 PyTorch,
+the serialized weight size and the p50 per-sentence CPU latency.
+"""
+import argparse
+import io
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import torch
+from transformers import RobertaTokenizer
+
+from classifier_runtime import (MAX_LENGTH, OnnxClassifierSession, quantize_dynamic_int8,
+                                quantized_onnx_path, run_forward)
+from export_onnx import MODELS, load_torch_model
+from Intent_Classifier import LABELS
+
+LATENCY_SAMPLES = 100     # Sentences timed one at a time
+
+
+def load_labelled(name, samples):
+    """Returns (texts, labels) from the labelled CSV in the format predict() produces."""
+    spec = MODELS[name]
+    df = pd.read_csv(spec["data_file"])
+    if name == "constraint":
+        df['Constraint'] = pd.to_numeric(df['Constraint'], errors='coerce')
+        df = df.dropna(subset=['Constraint'])
+    if samples and samples < len(df):
+        df = df.sample(n=samples, random_state=42)
+    texts = df[spec["text_column"]].astype(str).tolist()
+    if name == "intent":
+        labels = df[LABELS].values.astype(int)
+    elif name == "constraint":
+        labels = df["Constraint"].astype(int).values - 1  # 1/2 -> 0/1, as in training
+    else:
+        labels = df["Relevance"].astype(int).values
+    return texts, labels
+
+
+def predict(name, logits):
+    if name == "intent":
+        return (torch.sigmoid(logits) > 0.5).int().numpy()
+    if name == "constraint":
+        return logits.argmax(dim=1).numpy()
+    return (torch.sigmoid(logits.view(-1)) > 0.5).int().numpy()
+
+
+def accuracy(name, predictions, labels):
+    if name == "intent":
+        # Exact match over all labels of a sentence (stricter than the per-label training metric)
+        return (predictions == labels).all(axis=1).mean()
+    return (predictions == labels).mean()
+
+
+def torch_size_mb(model):
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell() / 2**20
+
+
+def p50_latency_ms(forward, tokenizer, texts):
+    device = torch.device("cpu")
+    run_forward(forward, tokenizer, texts[:4], device, MAX_LENGTH)  # warm up
+    latencies = []
+    for text in texts[:LATENCY_SAMPLES]:
+        start = time.perf_counter()
+        run_forward(forward, tokenizer, [text], device, MAX_LENGTH)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return np.percentile(latencies, 50)
+
+
+def evaluate(name, tokenizer, samples):
+    spec = MODELS[name]
+    texts, labels = load_labelled(name, samples)
+    device = torch.device("cpu")
+
+    fp32_model = load_torch_model(spec)
+    variants = [
+        ("torch fp32", fp32_model, torch_size_mb(fp32_model)),
+    ]
+    int8_model = quantize_dynamic_int8(load_torch_model(spec))
+    variants.append(("torch int8", int8_model, torch_size_mb(int8_model)))
+    for label, path in (("onnx fp32", spec["onnx_path"]), ("onnx int8", quantized_onnx_path(spec["onnx_path"]))):
+        if os.path.exists(path):
+            variants.append((label, OnnxClassifierSession(path), os.path.getsize(path) / 2**20))
+
+    print(f"\n==== {name} ({len(texts)} labelled sentences) ====")
+    print(f"{'variant':<12} {'accuracy':>9} {'delta':>8} {'size MB':>9} {'p50 ms':>8}")
+    baseline = None
+    for label, forward, size_mb in variants:
+        logits = run_forward(forward, tokenizer, texts, device, MAX_LENGTH)
+        acc = accuracy(name, predict(name, logits), labels)
+        baseline = acc if baseline is None else baseline
+        latency = p50_latency_ms(forward, tokenizer, texts)
+        print(f"{label:<12} {acc:>9.4f} {acc - baseline:>+8.4f} {size_mb:>9.1f} {latency:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate int8 dynamic quantization of the classifiers.")
+    parser.add_argument("--model", choices=["intent", "constraint", "relevance", "all"], default="all")
+    parser.add_argument("--samples", type=int, default=1000, help="Labelled sentences per classifier (0 = all).")
+    parser.add_argument("--threads", type=int, default=None, help="torch.set_num_threads (defaults to torch's choice).")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    tokenizer = RobertaTokenizer.from_pretrained('roberta-base')
+    for name in (list(MODELS) if args.model == "all" else [args.model]):
+        evaluate(name, tokenizer, args.samples)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+"""
+Exports the fine-tuned intent, constraint and relevance classifiers to ONNX for the ONNX Runtime
+backend (CLASSIFIER_BACKEND=onnx), then checks logit parity and compares CPU latency against PyTorch.
+
+    pip install onnx onnxruntime
+    python "app/Classifier Models/export_onnx.py" [--model intent|constraint|relevance|all] [--quantize] [--skip-check]
+
+With --quantize an int8 copy of each graph (dynamic quantization of the MatMul weights) is also
+written next to it; it is served when CLASSIFIER_QUANTIZE=int8. Its accuracy is checked by
+evaluate_quantization.py rather than by the logit parity check here.
+
+The graphs take int64 `input_ids` / `attention_mask` with dynamic batch and sequence axes, so
+they work with both fixed and dynamic padding (see classifier_runtime.py).
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import torch
+from transformers import RobertaTokenizer
+
+import Intent_Classifier
+import classifierconstraint
+import classifier_relevance
+from classifier_runtime import (MAX_LENGTH, INTENT_ONNX_PATH, CONSTRAINT_ONNX_PATH, RELEVANCE_ONNX_PATH,
+                                OnnxClassifierSession, run_forward, quantized_onnx_path)
+
+#############################################
+OPSET_VERSION = 14
+PARITY_ATOL = 1e-4        # Max allowed absolute logit difference between PyTorch and ONNX Runtime
+PARITY_SAMPLES = 200      # Sentences from the labelled CSV used for the parity check
+LATENCY_SAMPLES = 100     # Sentences timed one at a time for the latency comparison
+
+# classifier_relevance.py points at a Colab path, so the labelled relevance data is set here
+RELEVANCE_DATA_FILE = r"app\data\succeeded\RelevanceDataLabelled.csv"
+# RELEVANCE_DATA_FILE = "app/data/succeeded/RelevanceDataLabelled.csv"       # for MacOS
+#############################################
+
+MODELS = {
+    "intent": {
+        "model_class": lambda: Intent_Classifier.RobertaClassifier(Intent_Classifier.NUM_LABELS),
+        "checkpoint": Intent_Classifier.MODEL_SAVE_PATH,
+        "onnx_path": INTENT_ONNX_PATH,
+        "data_file": Intent_Classifier.LABELLED_FILE,
+        "text_column": "Prompt",
+    },
+    "constraint": {
+        "model_class": lambda: classifierconstraint.RobertaClassifier(classifierconstraint.NUM_CLASSES),
+        "checkpoint": classifierconstraint.MODEL_SAVE_PATH,
+        "onnx_path": CONSTRAINT_ONNX_PATH,
+        "data_file": classifierconstraint.LABELLED_FILE,
+        "text_column": "Text",
+    },
+    "relevance": {
+        "model_class": lambda: classifier_relevance.RobertaBinaryClassifier(),
+        "checkpoint": classifier_relevance.MODEL_SAVE_PATH,
+        "onnx_path": RELEVANCE_ONNX_PATH,
+        "data_file": RELEVANCE_DATA_FILE,
+        "text_column": "Text",
+    },
+}
+
+
+def load_torch_model(spec):
+    model = spec["model_class"]()
+    model.load_state_dict(torch.load(spec["checkpoint"], map_location="cpu"))
+    model.eval()
+    return model
+
+
+def export(model, tokenizer, onnx_path):
+    dummy = tokenizer(["export example"], truncation=True, padding='max_length',
+                      max_length=MAX_LENGTH, return_tensors="pt")
+    torch.onnx.export(
+        model,
+        (dummy["input_ids"], dummy["attention_mask"]),
+        onnx_path,
+        input_names=["input_ids", "attention_mask"],
+        output_names=["logits"],
+        dynamic_axes={
+            "input_ids": {0: "batch", 1: "sequence"},
+            "attention_mask": {0: "batch", 1: "sequence"},
+            "logits": {0: "batch"},
+        },
+        opset_version=OPSET_VERSION,
+        do_constant_folding=True,
+    )
+    print(f"Exported {onnx_path}")
+
+
+def quantize(onnx_path):
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    output_path = quantized_onnx_path(onnx_path)
+    quantize_dynamic(onnx_path, output_path, weight_type=QuantType.QInt8)
+    print(f"Exported {output_path}")
+
+
+def check(model, session, tokenizer, texts) -> bool:
+    """Logit parity on `texts` (batched, fixed and dynamic padding) plus a per-sentence latency comparison."""
+    device = torch.device("cpu")
+    passed = True
+    for padding_mode in ("max_length", "longest"):
+        torch_logits = run_forward(model, tokenizer, texts, device, MAX_LENGTH, padding_mode, [])
+        onnx_logits = run_forward(session, tokenizer, texts, device, MAX_LENGTH, padding_mode, [])
+        max_diff = (torch_logits - onnx_logits).abs().max().item()
+        same_argmax = (torch_logits.argmax(dim=1) == onnx_logits.argmax(dim=1)).float().mean().item()
+        ok = max_diff <= PARITY_ATOL
+        passed = passed and ok
+        print(f"  parity [{padding_mode}]: max |diff| {max_diff:.2e} | argmax agreement {same_argmax:.2%} | "
+              f"{'OK' if ok else 'FAIL'}")
+
+    for name, forward in (("pytorch", model), ("onnxruntime", session)):
+        run_forward(forward, tokenizer, texts[:4], device, MAX_LENGTH)  # warm up
+        latencies = []
+        for text in texts[:LATENCY_SAMPLES]:
+            start = time.perf_counter()
+            run_forward(forward, tokenizer, [text], device, MAX_LENGTH)
+            latencies.append((time.perf_counter() - start) * 1000)
+        print(f"  latency [{name}]: p50 {np.percentile(latencies, 50):.1f} ms | p95 {np.percentile(latencies, 95):.1f} ms")
+    return passed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the RoBERTa classifiers to ONNX.")
+    parser.add_argument("--model", choices=["intent", "constraint", "relevance", "all"], default="all")
+    parser.add_argument("--quantize", action="store_true", help="Also write an int8 copy of each graph.")
+    parser.add_argument("--skip-check", action="store_true", help="Skip the parity and latency check.")
+    args = parser.parse_args()
+
+    tokenizer = RobertaTokenizer.from_pretrained('roberta-base')
+    names = list(MODELS) if args.model == "all" else [args.model]
+    passed = True
+    for name in names:
+        spec = MODELS[name]
+        print(f"\n==== {name} ====")
+        model = load_torch_model(spec)
+        export(model, tokenizer, spec["onnx_path"])
+        if args.quantize:
+            quantize(spec["onnx_path"])
+        if args.skip_check:
+            continue
+        texts = pd.read_csv(spec["data_file"])[spec["text_column"]].astype(str) \
+            .sample(n=PARITY_SAMPLES, random_state=42).tolist()
+        passed = check(model, OnnxClassifierSession(spec["onnx_path"]), tokenizer, texts) and passed
+
+    if not passed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
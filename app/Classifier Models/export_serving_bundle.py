@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+"""
+Writes a local serving bundle so the bot starts without touching the Hugging Face hub:
+
+    python "app/Classifier Models/export_serving_bundle.py" [--output DIR]
+
+    <bundle>/tokenizer/                   roberta-base tokenizer files
+    <bundle>/<model>/config.json          roberta-base architecture config
+    <bundle>/<model>/model.safetensors    fine-tuned weights (memory-mappable)
+
+for every classifier checkpoint that exists (intent, constraint, relevance, multi_head).
+Point CLASSIFIER_BUNDLE_DIR at the bundle to serve from it (see classifier_runtime.load_classifier).
+"""
+import argparse
+import os
+
+import torch
+from safetensors.torch import save_file
+from transformers import RobertaConfig, RobertaTokenizer
+
+import Intent_Classifier
+import classifierconstraint
+import classifier_relevance
+import multi_head_classifier
+
+# Default bundle location
+SERVING_BUNDLE_PATH = r"app\Classifier Models\serving_bundle"
+# SERVING_BUNDLE_PATH = "app/Classifier Models/serving_bundle"       # for MacOS
+
+CHECKPOINTS = {
+    "intent": Intent_Classifier.MODEL_SAVE_PATH,
+    "constraint": classifierconstraint.MODEL_SAVE_PATH,
+    "relevance": classifier_relevance.MODEL_SAVE_PATH,
+    "multi_head": multi_head_classifier.MODEL_SAVE_PATH,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write the local classifier serving bundle.")
+    parser.add_argument("--output", default=SERVING_BUNDLE_PATH)
+    args = parser.parse_args()
+
+    RobertaTokenizer.from_pretrained('roberta-base').save_pretrained(os.path.join(args.output, "tokenizer"))
+    config = RobertaConfig.from_pretrained('roberta-base')
+
+    for name, checkpoint_path in CHECKPOINTS.items():
+        if not os.path.exists(checkpoint_path):
+            print(f"Skipping {name}: {checkpoint_path} not found")
+            continue
+        model_dir = os.path.join(args.output, name)
+        os.makedirs(model_dir, exist_ok=True)
+        config.save_pretrained(model_dir)
+        state_dict = torch.load(checkpoint_path, map_location="cpu")
+        save_file({k: v.contiguous() for k, v in state_dict.items()}, os.path.join(model_dir, "model.safetensors"))
+        print(f"Wrote {model_dir}")
+
+    print(f"\nSet CLASSIFIER_BUNDLE_DIR={args.output} to serve from this bundle")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,54 +1,73 @@
 import torch
-from transformers import RobertaTokenizer
+from classification_cache import ClassificationCache
 from classifierconstraint import RobertaClassifier, NUM_CLASSES, MAX_LENGTH, MODEL_SAVE_PATH
+from classifier_runtime import (run_forward, prepare_for_serving, serving_onnx_path, load_tokenizer, load_classifier,
+                                serving_model_version, BACKEND, CONSTRAINT_ONNX_PATH, OnnxClassifierSession)
 
 def initialize_constraint_classifier():
-    global model, tokenizer, device
+    global model, tokenizer, device, cache
 
     # Set device (GPU if available, else CPU)
     device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
     # Load the tokenizer (same as used during training)
-    tokenizer = RobertaTokenizer.from_pretrained('roberta-base')
+    tokenizer = load_tokenizer()
+
+    # Sentence-level result cache, invalidated when the served weights change
+    cache = ClassificationCache("constraint", serving_model_version("constraint", MODEL_SAVE_PATH, CONSTRAINT_ONNX_PATH))
+
+    # ONNX Runtime backend (graph exported by export_onnx.py), CPU only
+    if BACKEND == "onnx":
+        device = torch.device("cpu")
+        model = OnnxClassifierSession(serving_onnx_path(CONSTRAINT_ONNX_PATH))
+        return
 
     # Instantiate the model using the imported model definition and load its weights
-    model = RobertaClassifier(NUM_CLASSES).to(device)
-    state_dict = torch.load(MODEL_SAVE_PATH, map_location=device)
-    model.load_state_dict(state_dict)
-    model.eval()
+    # (from the local serving bundle if CLASSIFIER_BUNDLE_DIR is set)
+    model = load_classifier(
+        lambda state_dict, roberta_config: RobertaClassifier(NUM_CLASSES, roberta_config=roberta_config),
+        "constraint", MODEL_SAVE_PATH, device
+    )
 
+    # Eval mode, plus int8 dynamic quantization when CLASSIFIER_QUANTIZE=int8
+    model, device = prepare_for_serving(model, device)
 
-def get_constraint_prediction(input_text: str) -> dict:
+
+def get_constraint_prediction(input_text: str) -> list:
     """
     Given an input text (string), this function loads the saved constraint classifier,
-    processes the text, and returns a dictionary with the predicted outcome.
+    processes the text, and returns a list with the predicted outcome.
 
     The prediction is a single label:
       0: soft constraint
       1: hard constraint
     """
-    # Tokenize the input text
-    inputs = tokenizer(
-        input_text,
-        truncation=True,
-        padding='max_length',
-        max_length=MAX_LENGTH,
-        return_tensors="pt"
-    )
-    input_ids = inputs["input_ids"].to(device)
-    attention_mask = inputs["attention_mask"].to(device)
+    return get_constraint_predictions([input_text])[0]
+
+
+def get_constraint_predictions(input_texts: list) -> list:
+    """
+    Batched version of get_constraint_prediction. All texts are tokenized together and
+    classified in a single forward pass (one per length bucket with dynamic padding);
+    returns one prediction list per input text.
+    """
+    if not input_texts:
+        return []
+
+    # Repeated sentences are served from the cache
+    return cache.lookup(list(input_texts), _predict_constraints)
+
 
-    # Run inference
-    with torch.no_grad():
-        outputs = model(input_ids, attention_mask)
+def _predict_constraints(input_texts: list) -> list:
+    # Tokenize and run inference (padding follows classifier_runtime.PADDING_MODE)
+    outputs = run_forward(model, tokenizer, input_texts, device, max_length=MAX_LENGTH)
 
     # For single-label classification, choose the class with the highest logit
-    pred_label = torch.argmax(outputs, dim=1).item()
-    pred_label += 1 # CHANGING BACK TO 1 or 2
+    pred_labels = torch.argmax(outputs, dim=1).tolist()
 
     # Optionally, map the numeric prediction to a human-readable format
     label_map = {1: 'soft', 2: 'hard'}
-    return [label_map[pred_label]]
+    return [[label_map[pred_label + 1]] for pred_label in pred_labels] # CHANGING BACK TO 1 or 2
 
 # Example usage:
 if __name__ == "__main__":
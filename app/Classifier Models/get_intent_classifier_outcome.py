@@ -1,53 +1,70 @@
 import torch
-from transformers import RobertaTokenizer
+from classification_cache import ClassificationCache
 from Intent_Classifier import RobertaClassifier, LABELS, MAX_LENGTH, MODEL_SAVE_PATH
+from classifier_runtime import (run_forward, prepare_for_serving, serving_onnx_path, load_tokenizer, load_classifier,
+                                serving_model_version, BACKEND, INTENT_ONNX_PATH, OnnxClassifierSession)
 
 def initialize_intent_classifier():
-    global model, tokenizer, device
+    global model, tokenizer, device, cache
 
     # Set device (use GPU if available)
     device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
     # Load the tokenizer (same as used in training)
-    tokenizer = RobertaTokenizer.from_pretrained('roberta-base')
+    tokenizer = load_tokenizer()
 
-    # Instantiate the model using the imported model definition
-    model = RobertaClassifier(len(LABELS)).to(device)
+    # Sentence-level result cache, invalidated when the served weights change
+    cache = ClassificationCache("intent", serving_model_version("intent", MODEL_SAVE_PATH, INTENT_ONNX_PATH))
 
-    # Load the saved model weights
-    state_dict = torch.load(MODEL_SAVE_PATH, map_location=device)
-    model.load_state_dict(state_dict)
-    model.eval()
+    # ONNX Runtime backend (graph exported by export_onnx.py), CPU only
+    if BACKEND == "onnx":
+        device = torch.device("cpu")
+        model = OnnxClassifierSession(serving_onnx_path(INTENT_ONNX_PATH))
+        return
+
+    # Instantiate the model using the imported model definition and load the saved weights
+    # (from the local serving bundle if CLASSIFIER_BUNDLE_DIR is set)
+    model = load_classifier(
+        lambda state_dict, roberta_config: RobertaClassifier(len(LABELS), roberta_config=roberta_config),
+        "intent", MODEL_SAVE_PATH, device
+    )
+
+    # Eval mode, plus int8 dynamic quantization when CLASSIFIER_QUANTIZE=int8
+    model, device = prepare_for_serving(model, device)
 
 
-def get_binary_outcome(input_text: str) -> dict:
+def get_binary_outcome(input_text: str) -> list:
     """
     Given an input text (string), load the saved model (using definitions from the training code),
-    process the text, and return a dictionary mapping each label to its binary outcome (0 or 1).
+    process the text, and return the list of labels predicted for it.
     """
-    # Tokenize the input text
-    inputs = tokenizer(
-        input_text,
-        truncation=True,
-        padding='max_length',
-        max_length=MAX_LENGTH,
-        return_tensors="pt"
-    )
-    input_ids = inputs["input_ids"].to(device)
-    attention_mask = inputs["attention_mask"].to(device)
+    return get_binary_outcomes([input_text])[0]
+
+
+def get_binary_outcomes(input_texts: list) -> list:
+    """
+    Batched version of get_binary_outcome. All texts are tokenized together and classified
+    in a single forward pass (one per length bucket with dynamic padding); returns one
+    list of predicted labels per input text.
+    """
+    if not input_texts:
+        return []
+
+    # Repeated sentences ("thanks", "I prefer videos") are served from the cache
+    return cache.lookup(list(input_texts), _predict_binary_outcomes)
+
 
-    # Run inference
-    with torch.no_grad():
-        outputs = model(input_ids, attention_mask)
+def _predict_binary_outcomes(input_texts: list) -> list:
+    # Tokenize and run inference (padding follows classifier_runtime.PADDING_MODE)
+    outputs = run_forward(model, tokenizer, input_texts, device, max_length=MAX_LENGTH)
 
     # Convert logits to probabilities and apply threshold (0.5) to get binary outcomes
-    preds = (torch.sigmoid(outputs) > 0.5).float().cpu().numpy()[0]
+    preds = (torch.sigmoid(outputs) > 0.5).float().numpy()
 
     # Create and return a dictionary mapping each label to its binary prediction
     # binary_outcome = {label: int(pred) for label, pred in zip(LABELS, preds)}
 
-    res = [LABELS[i] for i in range(len(preds)) if preds[i]]
-    return res
+    return [[LABELS[i] for i in range(len(row)) if row[i]] for row in preds]
 
 # Example usage:
 if __name__ == "__main__":
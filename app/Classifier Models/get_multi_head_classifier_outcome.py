@@ -0,0 +1,80 @@
+import torch
+from classification_cache import ClassificationCache
+from Intent_Classifier import LABELS
+from multi_head_classifier import (RobertaMultiHeadClassifier, NUM_CONSTRAINT_CLASSES, TYPE_LABELS,
+                                   MAX_LENGTH, MODEL_SAVE_PATH, num_type_classes_in)
+from classifier_runtime import (run_forward, prepare_for_serving, load_tokenizer, load_classifier,
+                                serving_model_version, BACKEND)
+
+def initialize_multi_head_classifier():
+    global model, tokenizer, device, cache
+
+    # export_onnx.py only exports the single-head classifiers
+    if BACKEND != "torch":
+        print(f"Warning: CLASSIFIER_BACKEND={BACKEND} is not supported by the multi-head classifier; "
+              "running it on torch (CLASSIFIER_QUANTIZE still applies)")
+
+    # Set device (GPU if available, else CPU)
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+    # Load the tokenizer (same as used during training)
+    tokenizer = load_tokenizer()
+
+    # Sentence-level result cache, invalidated when the served weights change
+    cache = ClassificationCache("multi_head", serving_model_version("multi_head", MODEL_SAVE_PATH))
+
+    # One shared encoder for every head; the type head is only built if the checkpoint has one
+    model = load_classifier(
+        lambda state_dict, roberta_config: RobertaMultiHeadClassifier(
+            len(LABELS), NUM_CONSTRAINT_CLASSES, num_type_classes_in(state_dict), roberta_config=roberta_config
+        ),
+        "multi_head", MODEL_SAVE_PATH, device
+    )
+
+    # Eval mode, plus int8 dynamic quantization when CLASSIFIER_QUANTIZE=int8
+    model, device = prepare_for_serving(model, device)
+
+
+def get_multi_head_outcomes(input_texts: list) -> list:
+    """
+    Runs the shared encoder once over all input texts and reads every head from the same
+    CLS vector. Returns one (intents, constraint) pair per input text, in the same formats
+    as get_binary_outcome and get_constraint_prediction. The constraint is ["N/A"] unless
+    the text was classified as Provide_Preference; if the checkpoint has a type head, the
+    predicted constraint type is appended (e.g. ['soft', 'learning_style']).
+    """
+    if not input_texts:
+        return []
+
+    # Repeated sentences are served from the cache
+    return cache.lookup(list(input_texts), _predict_multi_head_outcomes)
+
+
+def _predict_multi_head_outcomes(input_texts: list) -> list:
+    # Tokenize and run inference (padding follows classifier_runtime.PADDING_MODE)
+    intent_logits, constraint_logits, type_logits = run_forward(model, tokenizer, input_texts, device, max_length=MAX_LENGTH)
+
+    intent_preds = (torch.sigmoid(intent_logits) > 0.5).numpy()
+    constraint_preds = torch.argmax(constraint_logits, dim=1).tolist()
+    type_preds = torch.argmax(type_logits, dim=1).tolist() if type_logits is not None else None
+
+    label_map = {1: 'soft', 2: 'hard'}
+    results = []
+    for i, row in enumerate(intent_preds):
+        intents = [LABELS[j] for j in range(len(row)) if row[j]]
+        if "Provide_Preference" in intents:
+            constraint = [label_map[constraint_preds[i] + 1]] # CHANGING BACK TO 1 or 2
+            if type_preds is not None:
+                constraint.append(TYPE_LABELS[type_preds[i]])
+        else:
+            constraint = ["N/A"]
+        results.append((intents, constraint))
+    return results
+
+# Example usage:
+if __name__ == "__main__":
+    initialize_multi_head_classifier()
+    sample_texts = ["Can you recommend some resources on machine learning?", "I prefer short videos in English."]
+    for text, (intents, constraint) in zip(sample_texts, get_multi_head_outcomes(sample_texts)):
+        print("Input text:", text)
+        print("Intents:", intents, "| Constraint:", constraint)
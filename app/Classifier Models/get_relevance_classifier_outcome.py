@@ -0,0 +1,69 @@
+import torch
+from classification_cache import ClassificationCache
+from classifier_relevance import RobertaBinaryClassifier, MAX_LENGTH, MODEL_SAVE_PATH
+from classifier_runtime import (run_forward, prepare_for_serving, serving_onnx_path, load_tokenizer, load_classifier,
+                                serving_model_version, BACKEND, RELEVANCE_ONNX_PATH, OnnxClassifierSession)
+
+def initialize_relevance_classifier():
+    global model, tokenizer, device, cache
+
+    # Set device (GPU if available, else CPU)
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+    # Load the tokenizer (same as used during training)
+    tokenizer = load_tokenizer()
+
+    # Sentence-level result cache, invalidated when the served weights change
+    cache = ClassificationCache("relevance", serving_model_version("relevance", MODEL_SAVE_PATH, RELEVANCE_ONNX_PATH))
+
+    # ONNX Runtime backend (graph exported by export_onnx.py), CPU only
+    if BACKEND == "onnx":
+        device = torch.device("cpu")
+        model = OnnxClassifierSession(serving_onnx_path(RELEVANCE_ONNX_PATH))
+        return
+
+    # Instantiate the model using the imported model definition and load its weights
+    # (from the local serving bundle if CLASSIFIER_BUNDLE_DIR is set)
+    model = load_classifier(
+        lambda state_dict, roberta_config: RobertaBinaryClassifier(roberta_config=roberta_config),
+        "relevance", MODEL_SAVE_PATH, device
+    )
+
+    # Eval mode, plus int8 dynamic quantization when CLASSIFIER_QUANTIZE=int8
+    model, device = prepare_for_serving(model, device)
+
+
+def get_relevance_probability(input_text: str) -> float:
+    """
+    Given an input text (string), returns the probability that it is relevant to
+    UTMIST or AI/ML (label 1 in RelevanceDataLabelled.csv).
+    """
+    return get_relevance_probabilities([input_text])[0]
+
+
+def get_relevance_probabilities(input_texts: list) -> list:
+    """
+    Batched version of get_relevance_probability. All texts are classified in a single
+    forward pass (one per length bucket with dynamic padding); returns one probability per text.
+    """
+    if not input_texts:
+        return []
+
+    # Repeated messages are served from the cache
+    return cache.lookup(list(input_texts), _predict_relevance)
+
+
+def _predict_relevance(input_texts: list) -> list:
+    # Tokenize and run inference (padding follows classifier_runtime.PADDING_MODE)
+    outputs = run_forward(model, tokenizer, input_texts, device, max_length=MAX_LENGTH)
+
+    # Single logit per text; the model was trained with BCEWithLogitsLoss
+    return torch.sigmoid(outputs.view(-1)).tolist()
+
+# Example usage:
+if __name__ == "__main__":
+    initialize_relevance_classifier()
+    sample_text = "When is the next UTMIST workshop?"
+    probability = get_relevance_probability(sample_text)
+    print("Input Text:", sample_text)
+    print("Relevance probability:", probability)
@@ -0,0 +1,270 @@
+#!/usr/bin/env python
+"""
+Multi-head serving model: one RoBERTa encoder shared by the intent head, the soft/hard
+constraint head and (optionally) the constraint-type head from ConstraintClassifier.py.
+
+Running this file converts the existing fine-tuned checkpoints into a single multi-head
+checkpoint and then runs the accuracy-parity check against the separate models:
+
+    python "app/Classifier Models/multi_head_classifier.py" [--type-head] [--type-checkpoint PATH]
+
+The intent model's encoder becomes the shared encoder. The constraint (and type) heads were
+trained against their own encoders, so they are initialized from their checkpoints and then
+re-fit on the shared encoder's frozen CLS features using the training split of the labelled
+constraint data. The parity check compares both setups on the held-out test splits.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import torch
+from torch import nn
+from sklearn.model_selection import train_test_split
+from transformers import RobertaTokenizer, RobertaModel
+
+import Intent_Classifier
+import classifierconstraint
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))  # repo root, for ConstraintClassifier.py
+from ConstraintClassifier import TYPE2ID
+
+#############################################
+# Hyperparameters and File Paths (edit as needed)
+MAX_LENGTH = 128
+INTENT_LABELS = Intent_Classifier.LABELS
+NUM_CONSTRAINT_CLASSES = classifierconstraint.NUM_CLASSES
+TYPE_LABELS = [t for t, _ in sorted(TYPE2ID.items(), key=lambda item: item[1])]
+
+HEAD_EPOCHS = 30           # Epochs for re-fitting a head on frozen CLS features
+HEAD_LEARNING_RATE = 1e-3
+FEATURE_BATCH_SIZE = 32    # Batch size for extracting CLS features
+PARITY_TOLERANCE = 0.02    # Max allowed accuracy drop per head before the check fails
+
+# Model save path
+MODEL_SAVE_PATH = r"app\Classifier Models\multi_head_classifier.pth"
+# MODEL_SAVE_PATH = "app/Classifier Models/multi_head_classifier.pth"       # for MacOS
+
+# Multi-task checkpoint produced by ConstraintClassifier.py (only used with --type-checkpoint)
+TYPE_CHECKPOINT_PATH = "model3_weights.pth"
+#############################################
+
+
+class RobertaMultiHeadClassifier(nn.Module):
+    """One RoBERTa encoder whose CLS vector feeds every classification head."""
+
+    def __init__(self, num_intent_labels, num_constraint_classes, num_type_classes=0, roberta_config=None):
+        super(RobertaMultiHeadClassifier, self).__init__()
+        if roberta_config is not None:
+            self.roberta = RobertaModel(roberta_config)
+        else:
+            self.roberta = RobertaModel.from_pretrained('roberta-base')
+        self.dropout = nn.Dropout(0.1)
+        hidden_size = self.roberta.config.hidden_size
+        self.intent_classifier = nn.Linear(hidden_size, num_intent_labels)
+        self.constraint_classifier = nn.Linear(hidden_size, num_constraint_classes)
+        self.type_classifier = nn.Linear(hidden_size, num_type_classes) if num_type_classes else None
+
+    def encode(self, input_ids, attention_mask):
+        outputs = self.roberta(input_ids=input_ids, attention_mask=attention_mask)
+        # Use the representation of the first token (<s>) as the pooled output.
+        return self.dropout(outputs.last_hidden_state[:, 0])
+
+    def forward(self, input_ids, attention_mask):
+        pooled_output = self.encode(input_ids, attention_mask)
+        intent_logits = self.intent_classifier(pooled_output)
+        constraint_logits = self.constraint_classifier(pooled_output)
+        type_logits = self.type_classifier(pooled_output) if self.type_classifier is not None else None
+        return intent_logits, constraint_logits, type_logits
+
+
+def num_type_classes_in(state_dict) -> int:
+    """Number of constraint-type classes stored in a multi-head checkpoint (0 if it has no type head)."""
+    weight = state_dict.get("type_classifier.weight")
+    return 0 if weight is None else weight.shape[0]
+
+
+# ---- Data splits (identical to the training scripts, so the test splits are held out) ----
+def load_intent_splits():
+    df = pd.read_csv(Intent_Classifier.LABELLED_FILE)
+    texts = df["Prompt"].tolist()
+    labels = df[df.columns[1:]].values.astype(float).tolist()
+    stratify_labels = [np.argmax(row) for row in labels]
+    X_temp, X_test, y_temp, y_test = train_test_split(
+        texts, labels, test_size=0.1, random_state=42, stratify=stratify_labels
+    )
+    return (X_temp, y_temp), (X_test, y_test)
+
+
+def load_constraint_splits():
+    df = pd.read_csv(classifierconstraint.LABELLED_FILE)
+    df['Constraint'] = pd.to_numeric(df['Constraint'], errors='coerce')
+    df = df.dropna(subset=['Constraint'])
+    texts = df["Text"].tolist()
+    constraints = (df["Constraint"].astype(int) - 1).tolist()
+    types_ = [TYPE2ID.get(str(t), -1) for t in df["Type"]]
+    X_temp, X_test, c_temp, c_test, t_temp, t_test = train_test_split(
+        texts, constraints, types_, test_size=0.1, random_state=42, stratify=constraints
+    )
+    return (X_temp, c_temp, t_temp), (X_test, c_test, t_test)
+
+
+# ---- Helpers ----
+def batched_forward(forward, tokenizer, texts, device):
+    """Runs `forward(input_ids, attention_mask)` over `texts` in batches and concatenates the outputs."""
+    outputs = []
+    with torch.no_grad():
+        for start in range(0, len(texts), FEATURE_BATCH_SIZE):
+            inputs = tokenizer(
+                texts[start:start + FEATURE_BATCH_SIZE],
+                truncation=True,
+                padding='max_length',
+                max_length=MAX_LENGTH,
+                return_tensors="pt"
+            )
+            outputs.append(forward(inputs["input_ids"].to(device), inputs["attention_mask"].to(device)).cpu())
+    return torch.cat(outputs)
+
+
+def fit_head(head, features, labels, device):
+    """Re-fits a linear head with cross-entropy on frozen CLS features."""
+    head.train()
+    features = features.to(device)
+    labels = torch.tensor(labels, dtype=torch.long, device=device)
+    optimizer = torch.optim.AdamW(head.parameters(), lr=HEAD_LEARNING_RATE)
+    criterion = nn.CrossEntropyLoss()
+    for epoch in range(1, HEAD_EPOCHS + 1):
+        permutation = torch.randperm(len(labels), device=device)
+        losses = []
+        for start in range(0, len(labels), FEATURE_BATCH_SIZE):
+            idx = permutation[start:start + FEATURE_BATCH_SIZE]
+            optimizer.zero_grad()
+            loss = criterion(head(features[idx]), labels[idx])
+            loss.backward()
+            optimizer.step()
+            losses.append(loss.item())
+        if epoch == 1 or epoch % 10 == 0:
+            print(f"  Head epoch {epoch}/{HEAD_EPOCHS} | Loss: {np.mean(losses):.4f}")
+    head.eval()
+
+
+def load_separate_models(device):
+    intent_model = Intent_Classifier.RobertaClassifier(len(INTENT_LABELS)).to(device)
+    intent_model.load_state_dict(torch.load(Intent_Classifier.MODEL_SAVE_PATH, map_location=device))
+    intent_model.eval()
+    constraint_model = classifierconstraint.RobertaClassifier(NUM_CONSTRAINT_CLASSES).to(device)
+    constraint_model.load_state_dict(torch.load(classifierconstraint.MODEL_SAVE_PATH, map_location=device))
+    constraint_model.eval()
+    return intent_model, constraint_model
+
+
+# ---- Conversion ----
+def build_multi_head_model(intent_model, constraint_model, tokenizer, device, type_head=False, type_checkpoint=None):
+    num_types = len(TYPE_LABELS) if (type_head or type_checkpoint) else 0
+    model = RobertaMultiHeadClassifier(len(INTENT_LABELS), NUM_CONSTRAINT_CLASSES, num_types).to(device)
+    model.roberta.load_state_dict(intent_model.roberta.state_dict())
+    model.intent_classifier.load_state_dict(intent_model.classifier.state_dict())
+    model.constraint_classifier.load_state_dict(constraint_model.classifier.state_dict())
+    if type_checkpoint:
+        multitask_state = torch.load(type_checkpoint, map_location=device)
+        model.type_classifier.load_state_dict({
+            "weight": multitask_state["type_classifier.weight"],
+            "bias": multitask_state["type_classifier.bias"],
+        })
+    model.eval()
+
+    (X_train, c_train, t_train), _ = load_constraint_splits()
+    print(f"Extracting shared-encoder CLS features for {len(X_train)} constraint training sentences")
+    features = batched_forward(model.encode, tokenizer, X_train, device)
+
+    print("Re-fitting constraint head on the shared encoder")
+    fit_head(model.constraint_classifier, features, c_train, device)
+
+    if model.type_classifier is not None:
+        known = [i for i, t in enumerate(t_train) if t >= 0]
+        print(f"Re-fitting type head on the shared encoder ({len(known)} typed sentences)")
+        fit_head(model.type_classifier, features[known], [t_train[i] for i in known], device)
+    return model
+
+
+# ---- Parity check ----
+def check_parity(intent_model, constraint_model, multi_model, tokenizer, device) -> bool:
+    """
+    Compares the separate models against the multi-head model on the held-out test splits.
+    Returns True if no head loses more than PARITY_TOLERANCE accuracy.
+    """
+    _, (X_intent, y_intent) = load_intent_splits()
+    _, (X_constraint, c_constraint, t_constraint) = load_constraint_splits()
+    y_intent = torch.tensor(y_intent)
+    c_constraint = torch.tensor(c_constraint)
+
+    separate_intent = (torch.sigmoid(batched_forward(intent_model, tokenizer, X_intent, device)) > 0.5).float()
+    multi_intent = (torch.sigmoid(batched_forward(lambda i, a: multi_model(i, a)[0], tokenizer, X_intent, device)) > 0.5).float()
+    separate_constraint = batched_forward(constraint_model, tokenizer, X_constraint, device).argmax(dim=1)
+    multi_constraint = batched_forward(lambda i, a: multi_model(i, a)[1], tokenizer, X_constraint, device).argmax(dim=1)
+
+    results = {
+        "intent": ((separate_intent == y_intent).float().mean().item(),
+                   (multi_intent == y_intent).float().mean().item(),
+                   (separate_intent == multi_intent).all(dim=1).float().mean().item()),
+        "constraint": ((separate_constraint == c_constraint).float().mean().item(),
+                       (multi_constraint == c_constraint).float().mean().item(),
+                       (separate_constraint == multi_constraint).float().mean().item()),
+    }
+
+    print("\n==== Parity Results (held-out test splits) ====")
+    passed = True
+    for head, (separate_acc, multi_acc, agreement) in results.items():
+        ok = separate_acc - multi_acc <= PARITY_TOLERANCE
+        passed = passed and ok
+        print(f"{head:>10}: separate acc {separate_acc:.4f} | multi-head acc {multi_acc:.4f} | "
+              f"agreement {agreement:.4f} | {'OK' if ok else 'FAIL'}")
+
+    if multi_model.type_classifier is not None:
+        known = [i for i, t in enumerate(t_constraint) if t >= 0]
+        type_logits = batched_forward(lambda i, a: multi_model(i, a)[2], tokenizer, [X_constraint[i] for i in known], device)
+        type_acc = (type_logits.argmax(dim=1) == torch.tensor([t_constraint[i] for i in known])).float().mean().item()
+        print(f"{'type':>10}: multi-head acc {type_acc:.4f} (no separate serving model to compare against)")
+
+    # Per-sentence CPU time: separate models run two encoder passes, the multi-head model one.
+    sample = X_intent[:64]
+    start = time.perf_counter()
+    for text in sample:
+        batched_forward(intent_model, tokenizer, [text], device)
+        batched_forward(constraint_model, tokenizer, [text], device)
+    separate_ms = (time.perf_counter() - start) / len(sample) * 1000
+    start = time.perf_counter()
+    for text in sample:
+        batched_forward(lambda i, a: multi_model(i, a)[0], tokenizer, [text], device)
+    multi_ms = (time.perf_counter() - start) / len(sample) * 1000
+    print(f"\nPer-sentence latency: separate {separate_ms:.1f} ms | multi-head {multi_ms:.1f} ms")
+    return passed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the shared-encoder multi-head classifier checkpoint.")
+    parser.add_argument("--type-head", action="store_true", help="Add a constraint-type head fit on the shared encoder.")
+    parser.add_argument("--type-checkpoint", default=None,
+                        help=f"ConstraintClassifier.py checkpoint to initialize the type head from (e.g. {TYPE_CHECKPOINT_PATH}).")
+    parser.add_argument("--output", default=MODEL_SAVE_PATH)
+    parser.add_argument("--skip-parity", action="store_true")
+    args = parser.parse_args()
+
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    print(f"Using device: {device}")
+    tokenizer = RobertaTokenizer.from_pretrained('roberta-base')
+
+    intent_model, constraint_model = load_separate_models(device)
+    multi_model = build_multi_head_model(intent_model, constraint_model, tokenizer, device,
+                                         type_head=args.type_head, type_checkpoint=args.type_checkpoint)
+    torch.save(multi_model.state_dict(), args.output)
+    print(f"Multi-head model weights saved to {args.output}")
+
+    if not args.skip_parity and not check_parity(intent_model, constraint_model, multi_model, tokenizer, device):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,10 @@
 import os
-from openai import OpenAI
+import sys
+from pathlib import Path
 
-api_key = os.environ["OPENAI_API_KEY"] = "..."
+# Shared OpenAI client (reads OPENAI_API_KEY from the environment)
+sys.path.append(str(Path(__file__).parent.parent))
+from llm_client import chat_completion
 
 
 def process_text_with_gpt3(input_file_path, output_file_path) :
@@ -9,17 +12,12 @@ def process_text_with_gpt3(input_file_path, output_file_path) :
     with open ( input_file_path, 'r' ) as file :
         input_data = file.read ()
 
-    client = OpenAI (
-        # This is the default and can be omitted
-        api_key=os.environ.get ( api_key ),
-    )
-
     # Define the prompt for GPT-3
     prompt = f"Transform the following text into Q&A form. If not possible, provide it in point form:\n\n{input_data}"
 
     try :
         # Make a call to the OpenAI GPT-3 model
-        chat_completion = client.chat.completions.create (
+        response = chat_completion (
             model="gpt-3.5-turbo",  # You can use other models like "gpt-4" if available
             messages=[
                 {"role" : "system", "content" : "You are a helpful assistant."},
@@ -32,7 +30,7 @@ def process_text_with_gpt3(input_file_path, output_file_path) :
         )
 
         # Get the response text
-        response_message_raw = chat_completion.choices[0].message.content
+        response_message_raw = response.choices[0].message.content
         response_message = response_message_raw.strip ()
 
         # Write the output data to a text file
@@ -1,17 +1,19 @@
 import pandas as pd
 from duckduckgo_search import DDGS
-import openai
 import requests
 from bs4 import BeautifulSoup
 import os
 import os.path
+import sys
 from pathlib import Path
 from dotenv import load_dotenv
 
+sys.path.append(str(Path(__file__).parent.parent))
+from llm_client import chat_completion
+
 # Load environment variables (including OPENAI_API_KEY)
 env_path = Path(__file__).parent.parent / ".env"
 load_dotenv(dotenv_path=env_path, override=True)
-client = openai.OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
 
 search_query = "Machine learning tutorials"
 descriptions = {}
@@ -29,7 +31,7 @@ def generate_description(content):
         ""
         f"{content}\n\nDescription:"
     )
-    response = client.chat.completions.create(
+    response = chat_completion(
         model="gpt-3.5-turbo",
         messages=[{"role": "user", "content": prompt}]
     )
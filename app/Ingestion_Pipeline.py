@@ -1,8 +1,6 @@
 import os
-import openai
-from llama_index.llms.openai import OpenAI
 from llama_index.core import Document
-from llama_index.embeddings.openai import OpenAIEmbedding
+from llm_client import llama_llm, openai_embedding
 from llama_index.core.node_parser import SentenceSplitter
 from llama_index.core.extractors import TitleExtractor
 from llama_index.core.ingestion import IngestionPipeline
@@ -28,7 +26,7 @@ load_dotenv()
 
 os.environ["OPENAI_API_KEY"] = os.getenv("OPENAI_API_KEY")
 # Set up OpenAI API key
-llm = OpenAI(temperature=0.1, model="gpt-3.5-turbo")
+llm = llama_llm(temperature=0.1, model="gpt-3.5-turbo")
 
 # Define the directory containing the text files
 desktop = os.path.expanduser("~\Desktop")
@@ -62,7 +60,7 @@ pipeline = IngestionPipeline(
         #SummaryExtractor(summaries=["prev", "self", "next"], llm=llm),
         #TitleExtractor(llm=llm, max_tokens=10, temperature=0.3, top_p=0.9),
         #KeywordExtractor(llm=llm, max_keywords=10, threshold=0.2, include_scores=True),
-        OpenAIEmbedding(),
+        openai_embedding(),
     ], 
     vector_store=vector_store
 )
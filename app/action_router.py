@@ -0,0 +1,217 @@
+import asyncio
+import os
+import random
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional
+
+#############################################
+# Actions the answer pipeline understands (same phrases as the Classify_Action prompt)
+REQUEST_MORE_INFO = "Request More Information"
+GENERATE_RECOMMENDATION = "Generate Recommendation"
+ANSWER_QUESTION = "Answer a Question"
+QUICK_RESPONSE = "Other/Quick Response"
+ACTIONS = [REQUEST_MORE_INFO, GENERATE_RECOMMENDATION, ANSWER_QUESTION, QUICK_RESPONSE]
+
+# Decisions below this confidence fall back to the Classify_Action LLM call
+ROUTER_CONFIDENCE_THRESHOLD = float(os.environ.get("ACTION_ROUTER_THRESHOLD", "0.8"))
+# Share of confident decisions that are also sent to the LLM to measure agreement
+ROUTER_SHADOW_RATE = float(os.environ.get("ACTION_ROUTER_SHADOW_RATE", "0.05"))
+# Hard-constraint sentences (this message + memory) needed before recommending without asking first
+MIN_HARD_CONSTRAINTS = int(os.environ.get("ACTION_ROUTER_MIN_HARD_CONSTRAINTS", "2"))
+#############################################
+
+INQUIRY_INTENTS = {"Inquire_Resources", "Club_Related_Inquiry", "Short_Answer_Inquiry"}
+
+
+@dataclass
+class RouterDecision:
+    action: str
+    confidence: float
+    reason: str
+
+
+def count_constraints(classified: list, memories: list) -> Counter:
+    """
+    Counts the known constraint sentences by kind ('hard' / 'soft') across the current
+    message (classify_sentences output) and the mem0 memories stored by earlier messages.
+    """
+    counts = Counter()
+    for _, _, constraint_res in classified:
+        counts.update(c for c in constraint_res if c in ("hard", "soft"))
+    for memory in memories:
+        metadata = memory.get("metadata") or {}
+        counts.update(c for c in metadata.get("constraints") or [] if c in ("hard", "soft"))
+    return counts
+
+
+def route_action(classified: list, memories: list) -> RouterDecision:
+    """
+    Picks the bot action from the classifier outputs without an LLM call.
+
+    Args:
+        classified (list): (sentence, intent_res, constraint_res) tuples for the current message
+        memories (list): The user's recent mem0 memories (dicts with "memory" and "metadata")
+
+    Returns:
+        RouterDecision: The action and a confidence in [0, 1]; mixed or empty signals get a
+            low confidence so the caller can defer to the LLM.
+    """
+    intents = set()
+    for _, intent_res, _ in classified:
+        intents.update(intent_res)
+    constraints = count_constraints(classified, memories)
+    enough_constraints = constraints["hard"] >= MIN_HARD_CONSTRAINTS
+    wants_resources = bool(intents & {"Inquire_Resources", "Reject_Recommendation"})
+    asks_question = bool(intents & {"Club_Related_Inquiry", "Short_Answer_Inquiry"})
+
+    if wants_resources and asks_question:
+        return RouterDecision(ANSWER_QUESTION, 0.4, "mixed question and resource request")
+    if wants_resources:
+        if enough_constraints:
+            return RouterDecision(GENERATE_RECOMMENDATION, 0.9, f"{constraints['hard']} hard constraints known")
+        # Close to the threshold the LLM may judge the soft constraints to be enough
+        confidence = 0.9 if constraints["hard"] + constraints["soft"] < MIN_HARD_CONSTRAINTS else 0.6
+        return RouterDecision(REQUEST_MORE_INFO, confidence, f"only {constraints['hard']} hard constraints known")
+    if asks_question:
+        return RouterDecision(ANSWER_QUESTION, 0.95, "question without a resource request")
+    if "Accept_Recommendation" in intents:
+        return RouterDecision(QUICK_RESPONSE, 0.85, "accepted a recommendation")
+    if "Provide_Preference" in intents:
+        # Usually the answer to a missing-information prompt
+        if enough_constraints:
+            return RouterDecision(GENERATE_RECOMMENDATION, 0.7, "preferences given, enough constraints known")
+        return RouterDecision(REQUEST_MORE_INFO, 0.7, "preferences given, constraints still missing")
+    return RouterDecision(QUICK_RESPONSE, 0.85, "no intent detected")
+
+
+def normalize_action(llm_output: str) -> Optional[str]:
+    """Maps a Classify_Action completion onto one of ACTIONS (None if it names none of them)."""
+    text = llm_output.strip().lower()
+    for action in ACTIONS:
+        if action.lower() in text:
+            return action
+    return None
+
+
+class RouterStats:
+    """
+    Counts how often the router decided locally and, for every decision the LLM also saw
+    (fallbacks and shadow samples), whether the two agreed. Used to tune the threshold.
+    """
+
+    def __init__(self):
+        self.local = 0
+        self.fallbacks = 0
+        self.compared = Counter()
+        self.agreed = Counter()
+        self._lock = threading.Lock()
+
+    def record_local(self):
+        with self._lock:
+            self.local += 1
+
+    def record_fallback(self):
+        with self._lock:
+            self.fallbacks += 1
+
+    def record_comparison(self, decision: RouterDecision, llm_output: str):
+        llm_action = normalize_action(llm_output)
+        agreed = llm_action == decision.action
+        with self._lock:
+            self.compared[decision.action] += 1
+            self.agreed[decision.action] += agreed
+        if not agreed:
+            print(f"Action router disagreement: router={decision.action} ({decision.confidence:.2f}, "
+                  f"{decision.reason}) llm={llm_action or llm_output!r}")
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            compared = sum(self.compared.values())
+            return {
+                "local": self.local,
+                "llm_fallbacks": self.fallbacks,
+                "compared": compared,
+                "agreement_rate": sum(self.agreed.values()) / compared if compared else 0.0,
+                "agreement_by_action": {
+                    action: self.agreed[action] / self.compared[action] for action in self.compared
+                },
+            }
+
+
+router_stats = RouterStats()
+
+
+def should_shadow() -> bool:
+    """Whether a confident decision should also be checked against the LLM."""
+    return random.random() < ROUTER_SHADOW_RATE
+
+
+def _llm_action(llm_output: str) -> str:
+    # Quoted, punctuated or differently cased completions still name one of ACTIONS; anything
+    # else is passed on as is (build_answer_prompt then asks for more information)
+    return normalize_action(llm_output) or llm_output
+
+
+def choose_action(classified: list, memories: list, classify_with_llm: Callable[[], str],
+                  stats: RouterStats = router_stats) -> str:
+    """
+    Picks the action with route_action and only calls `classify_with_llm` (the Classify_Action
+    prompt) when the router is not confident. A sample of confident decisions is also checked
+    against the LLM in a background thread to track agreement.
+
+    Args:
+        classified (list): (sentence, intent_res, constraint_res) tuples for the current message
+        memories (list): The user's recent mem0 memories
+        classify_with_llm (Callable[[], str]): Returns the Classify_Action completion
+        stats (RouterStats): Where decisions and comparisons are counted
+
+    Returns:
+        str: One of ACTIONS (or the LLM output if it names none of them)
+    """
+    decision = route_action(classified, memories)
+    print(f"Router decision: {decision.action} ({decision.confidence:.2f}, {decision.reason})")
+    if decision.confidence >= ROUTER_CONFIDENCE_THRESHOLD:
+        stats.record_local()
+        if should_shadow():
+            def shadow():
+                try:
+                    stats.record_comparison(decision, _llm_action(classify_with_llm()))
+                except Exception as e:
+                    print(f"Error in action router shadow check: {e}")
+            threading.Thread(target=shadow, daemon=True).start()
+        return decision.action
+
+    stats.record_fallback()
+    action = _llm_action(classify_with_llm())
+    stats.record_comparison(decision, action)
+    return action
+
+
+# Keeps shadow comparisons alive until they finish (the event loop only holds weak references)
+_shadow_tasks = set()
+
+
+async def achoose_action(classified: list, memories: list, classify_with_llm: Callable[[], Awaitable[str]],
+                         stats: RouterStats = router_stats) -> str:
+    """Async version of choose_action; `classify_with_llm` returns an awaitable and shadow checks run as tasks."""
+    decision = route_action(classified, memories)
+    print(f"Router decision: {decision.action} ({decision.confidence:.2f}, {decision.reason})")
+    if decision.confidence >= ROUTER_CONFIDENCE_THRESHOLD:
+        stats.record_local()
+        if should_shadow():
+            async def shadow():
+                try:
+                    stats.record_comparison(decision, _llm_action(await classify_with_llm()))
+                except Exception as e:
+                    print(f"Error in action router shadow check: {e}")
+            task = asyncio.create_task(shadow())
+            _shadow_tasks.add(task)
+            task.add_done_callback(_shadow_tasks.discard)
+        return decision.action
+
+    stats.record_fallback()
+    action = _llm_action(await classify_with_llm())
+    stats.record_comparison(decision, action)
+    return action
@@ -0,0 +1,129 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional
+
+import numpy as np
+
+#############################################
+ANSWER_CACHE_SIZE = int(os.environ.get("ANSWER_CACHE_SIZE", "500"))              # entries, 0 disables
+ANSWER_CACHE_TTL = float(os.environ.get("ANSWER_CACHE_TTL", str(24 * 3600)))     # seconds
+# Minimum cosine similarity between query embeddings for a cached answer to be reused
+ANSWER_CACHE_THRESHOLD = float(os.environ.get("ANSWER_CACHE_THRESHOLD", "0.95"))
+#############################################
+
+
+def storage_version(persist_dir: str) -> str:
+    """
+    Identifies the current contents of a llama-index storage directory by the name, size and
+    modification time of its files, so re-indexing `./storage` changes the version.
+    """
+    parts = []
+    for name in sorted(os.listdir(persist_dir)):
+        stat = os.stat(os.path.join(persist_dir, name))
+        parts.append(f"{name}:{stat.st_size}:{stat.st_mtime_ns}")
+    return "|".join(parts)
+
+
+class AnswerCache:
+    """
+    Answers keyed by query embedding. A lookup returns the stored answer of the most similar
+    cached query if the cosine similarity is at least `threshold`, the entry is younger than
+    `ttl` seconds and the index version is unchanged (every entry is dropped when it changes).
+    Least recently used entries are evicted beyond `max_entries`.
+
+    Answers generated with a user's chat history are stored with that user's ID and only served
+    back to the same user; answers stored without a user ID are shared by everyone.
+    """
+
+    def __init__(self, persist_dir: str, max_entries: int = ANSWER_CACHE_SIZE, ttl: float = ANSWER_CACHE_TTL,
+                 threshold: float = ANSWER_CACHE_THRESHOLD):
+        """
+        Args:
+            persist_dir (str): Storage directory of the index the answers were generated from
+            max_entries (int): LRU capacity (0 disables caching)
+            ttl (float): Seconds an answer stays valid
+            threshold (float): Minimum cosine similarity for a hit
+        """
+        self.persist_dir = persist_dir
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._version = storage_version(persist_dir)
+        self._entries = OrderedDict()   # id -> (normalized embedding, query, answer, created, user ID or None)
+        self._next_id = 0
+        self._matrix = None             # stacked embeddings of _entries, rebuilt after changes
+        self._lock = threading.Lock()
+
+    def _check_version(self):
+        version = storage_version(self.persist_dir)
+        if version != self._version:
+            self._version = version
+            self._entries.clear()
+            self._matrix = None
+            self.invalidations += 1
+
+    def _expire(self, now: float):
+        expired = [key for key, (_, _, _, created, _) in self._entries.items() if now - created > self.ttl]
+        for key in expired:
+            del self._entries[key]
+        if expired:
+            self._matrix = None
+
+    def lookup(self, query_embedding: List[float], user_id: Optional[str] = None) -> Optional[str]:
+        """Returns the cached answer for a similar enough query (shared, or stored for `user_id`), or None."""
+        if not self.max_entries:
+            return None
+        embedding = _normalize(query_embedding)
+        with self._lock:
+            self._check_version()
+            self._expire(time.time())
+            if self._entries:
+                if self._matrix is None:
+                    self._matrix = np.stack([entry[0] for entry in self._entries.values()])
+                similarities = self._matrix @ embedding
+                visible = np.array([entry[4] is None or entry[4] == user_id for entry in self._entries.values()])
+                similarities = np.where(visible, similarities, -np.inf)
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    key = list(self._entries)[best]
+                    self._entries.move_to_end(key)
+                    self._matrix = None
+                    self.hits += 1
+                    _, query, answer, _, _ = self._entries[key]
+                    print(f"Answer cache hit ({similarities[best]:.3f}): {query!r}")
+                    return answer
+            self.misses += 1
+            return None
+
+    def store(self, query: str, query_embedding: List[float], answer: str, user_id: Optional[str] = None):
+        """Caches an answer; pass `user_id` if the answer depends on that user (e.g. their chat history)."""
+        if not self.max_entries:
+            return
+        with self._lock:
+            self._check_version()
+            self._entries[self._next_id] = (_normalize(query_embedding), query, answer, time.time(), user_id)
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "invalidations": self.invalidations,
+        }
+
+
+def _normalize(embedding: List[float]) -> np.ndarray:
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
@@ -1,10 +1,11 @@
 
-from llama_index.llms.openai import OpenAI
 from qdrant_client import QdrantClient
 from llama_index.vector_stores.qdrant import QdrantVectorStore
 from retrieval.query_transformers import LLMQueryTransformer
 from jinja2 import Template
 from retrieval.retriever import VectorStoreRetriever
+from retrieval.mmap_vector_store import load_vector_store
+from llm_client import llama_llm
 from llama_index.core import (
     VectorStoreIndex,
     SimpleDirectoryReader,
@@ -23,9 +24,10 @@ load_dotenv()
 #                         api_key=os.environ.get("QDRANT_API_KEY")),
 #     collection_name="test_collection_1",
 # )
-VEC_STORE = SimpleVectorStore.from_persist_path("storage/vector_store.json")
+# Memory-mapped binary store if converted (convert_vector_store.py), else storage/vector_store.json
+VEC_STORE = load_vector_store("storage")
 
-LLM = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+LLM = llama_llm(api_key=os.environ.get("OPENAI_API_KEY"))
 DATA_SOURCE_FOLDER = "/app/data/input"
 DATA_SOURCE_FINISHED_FOLDER = "/app/data/finished"
 CONSTRAINTS_TO_QUERY_PROMPT_PATH = "app/prompts/constraints_to_query.jinja"
@@ -0,0 +1,59 @@
+"""
+Recall@k and latency of the IVF index (vector_store_ivf.npz) against exact search, for a range of
+nprobe values. Queries are stored vectors with Gaussian noise added, so no embedding calls are made.
+
+    python app/chatbot_convrec/scripts/benchmark_ann_index.py [--persist-dir storage] [--k 5] [--nprobe 1 2 4 8 16]
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+from retrieval.dense_index import normalize_rows
+from retrieval.ivf_index import IVFIndex
+from retrieval.mmap_vector_store import MmapVectorStore, has_binary_vector_store
+
+
+def time_queries(search, queries):
+    """Per-query results and latencies in ms."""
+    results, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(search(query))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return results, np.asarray(latencies)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the IVF index against exact search.")
+    parser.add_argument("--persist-dir", default="storage", help="llama-index storage directory")
+    parser.add_argument("--k", type=int, default=5, help="results per query (the retriever's top_k)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--noise", type=float, default=0.5, help="noise norm relative to the (unit) query vector")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if not has_binary_vector_store(args.persist_dir):
+        sys.exit(f"No up-to-date binary vector store in {args.persist_dir}; run convert_vector_store.py first")
+    store = MmapVectorStore.from_persist_dir(args.persist_dir)
+    exact = store.exact_index
+    ivf = IVFIndex.load(args.persist_dir, exact)
+    if ivf is None:
+        sys.exit(f"No IVF index for this store in {args.persist_dir}; run build_ann_index.py first")
+
+    rng = np.random.default_rng(args.seed)
+    rows = rng.choice(len(exact), args.queries, replace=len(exact) < args.queries)
+    noise = rng.standard_normal((len(rows), store.matrix.shape[1])).astype(np.float32)
+    queries = exact.row_vectors(np.sort(rows)) + args.noise * normalize_rows(noise)
+
+    truth, exact_ms = time_queries(lambda q: exact.search(q, args.k)[0], queries)
+    print(f"{len(exact)} vectors, {ivf.nlist} lists, {len(queries)} queries, recall@{args.k}")
+    print(f"{'nprobe':>8} {'recall':>8} {'mean ms':>8} {'p95 ms':>8}")
+    print(f"{'exact':>8} {1.0:>8.3f} {exact_ms.mean():>8.3f} {np.percentile(exact_ms, 95):>8.3f}")
+    for nprobe in args.nprobe:
+        if nprobe > ivf.nlist:
+            break
+        found, ann_ms = time_queries(lambda q: ivf.search(q, args.k, nprobe)[0], queries)
+        recall = np.mean([len(set(a) & set(b)) / len(b) for a, b in zip(found, truth)])
+        print(f"{nprobe:>8} {recall:>8.3f} {ann_ms.mean():>8.3f} {np.percentile(ann_ms, 95):>8.3f}")
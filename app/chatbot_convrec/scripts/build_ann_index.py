@@ -0,0 +1,40 @@
+"""
+Builds the IVF approximate-nearest-neighbour index of retrieval/ivf_index.py for a converted
+storage directory and writes it next to the vector store (vector_store_ivf.npz). Run it after
+convert_vector_store.py, whenever the store is re-indexed; the bot uses it when USE_ANN_INDEX=true
+and falls back to exact search if it is missing or was built for other vectors.
+
+    python app/chatbot_convrec/scripts/build_ann_index.py [--persist-dir storage] [--nlist N]
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+from retrieval.ivf_index import IVF_FNAME, IVFIndex, default_nlist
+from retrieval.mmap_vector_store import MmapVectorStore, has_binary_vector_store
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the IVF index for a converted vector store.")
+    parser.add_argument("--persist-dir", default="storage", help="llama-index storage directory")
+    parser.add_argument("--nlist", type=int, default=None, help="number of clusters (default: 4 * sqrt(n))")
+    parser.add_argument("--iterations", type=int, default=20, help="k-means iterations")
+    parser.add_argument("--sample-size", type=int, default=None, help="k-means training vectors (default: 256 per cluster)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if not has_binary_vector_store(args.persist_dir):
+        sys.exit(f"No up-to-date binary vector store in {args.persist_dir}; run convert_vector_store.py first")
+
+    store = MmapVectorStore.from_persist_dir(args.persist_dir)
+    if not len(store.data.ids):
+        sys.exit("The vector store is empty")
+
+    start = time.perf_counter()
+    ivf = IVFIndex.build(store.exact_index, args.nlist or default_nlist(len(store.data.ids)),
+                         args.iterations, args.sample_size, args.seed)
+    ivf.save(args.persist_dir)
+
+    sizes = np.diff(ivf.list_offsets)
+    print(f"Built {IVF_FNAME}: {len(ivf)} vectors in {ivf.nlist} lists ({time.perf_counter() - start:.1f} s)")
+    print(f"  list sizes: min {sizes.min()}, median {int(np.median(sizes))}, max {sizes.max()}")
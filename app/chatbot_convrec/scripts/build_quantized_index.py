@@ -0,0 +1,78 @@
+"""
+Builds the int8 first-stage index of retrieval/quantized_index.py for a converted storage directory
+(vector_store_int8.npy + vector_store_int8.json, next to the float matrix), then reports its size
+and its recall@k and latency against exact search. The bot uses it when USE_QUANTIZED_INDEX=true.
+Queries are stored vectors with Gaussian noise added, so no embedding calls are made.
+
+    python app/chatbot_convrec/scripts/build_quantized_index.py [--persist-dir storage] [--k 5]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from retrieval.dense_index import normalize_rows, top_k_rows
+from retrieval.mmap_vector_store import JSON_FNAME, MATRIX_FNAME, NORMS_FNAME, MmapVectorStore, has_binary_vector_store
+from retrieval.quantized_index import CODES_FNAME, QuantizedIndex
+
+
+def recall(found, truth) -> float:
+    return float(np.mean([len(set(a) & set(b)) / len(b) for a, b in zip(found, truth)]))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build and evaluate the int8 vector index.")
+    parser.add_argument("--persist-dir", default="storage", help="llama-index storage directory")
+    parser.add_argument("--k", type=int, default=5, help="results per query (the retriever's top_k)")
+    parser.add_argument("--rerank", type=int, nargs="+", default=[10, 20, 50, 100], help="candidates re-scored exactly")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--noise", type=float, default=0.5, help="noise norm relative to the (unit) query vector")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if not has_binary_vector_store(args.persist_dir):
+        sys.exit(f"No up-to-date binary vector store in {args.persist_dir}; run convert_vector_store.py first")
+    store = MmapVectorStore.from_persist_dir(args.persist_dir)
+    exact = store.exact_index
+    if not len(exact):
+        sys.exit("The vector store is empty")
+
+    start = time.perf_counter()
+    quantized = QuantizedIndex.build(exact, args.persist_dir)
+    print(f"Built {CODES_FNAME}: {len(quantized)} vectors of dimension {quantized.codes.shape[1]} "
+          f"({time.perf_counter() - start:.1f} s)")
+
+    def size_mb(name):
+        path = os.path.join(args.persist_dir, name)
+        return os.path.getsize(path) / 2**20 if os.path.exists(path) else float("nan")
+
+    float_mb, codes_mb = size_mb(MATRIX_FNAME), size_mb(CODES_FNAME)
+    print(f"  JSON store:    {size_mb(JSON_FNAME):8.2f} MB")
+    if os.path.exists(os.path.join(args.persist_dir, NORMS_FNAME)):
+        print(f"  float32 file:  {float_mb:8.2f} MB (only re-ranked rows are read)")
+    else:
+        print(f"  float32 file:  {float_mb:8.2f} MB (read whole at load to compute row norms; "
+              f"re-run convert_vector_store.py to write {NORMS_FNAME})")
+    print(f"  int8 codes:    {codes_mb:8.2f} MB ({codes_mb / float_mb:.0%} of float32)")
+
+    rng = np.random.default_rng(args.seed)
+    rows = rng.choice(len(exact), args.queries, replace=len(exact) < args.queries)
+    noise = rng.standard_normal((len(rows), store.matrix.shape[1])).astype(np.float32)
+    queries = exact.row_vectors(np.sort(rows)) + args.noise * normalize_rows(noise)
+
+    start = time.perf_counter()
+    truth = [exact.search(query, args.k)[0] for query in queries]
+    exact_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    int8_only = top_k_rows(quantized.approximate_scores(queries), args.k)
+
+    print(f"{len(queries)} queries, recall@{args.k}")
+    print(f"{'rerank':>8} {'recall':>8} {'ms/query':>9}")
+    print(f"{'exact':>8} {1.0:>8.3f} {exact_ms:>9.3f}")
+    print(f"{'none':>8} {recall(int8_only, truth):>8.3f} {'':>9}")
+    for rerank in args.rerank:
+        quantized.rerank = rerank
+        start = time.perf_counter()
+        found = [quantized.search(query, args.k)[0] for query in queries]
+        ms = (time.perf_counter() - start) * 1000 / len(queries)
+        print(f"{rerank:>8} {recall(found, truth):>8.3f} {ms:>9.3f}")
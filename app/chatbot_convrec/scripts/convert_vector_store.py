@@ -0,0 +1,40 @@
+"""
+Converts a llama-index storage directory's vector_store.json into the memory-mapped binary
+format of retrieval/mmap_vector_store.py (vector_store.npy, vector_store_norms.npy and
+vector_store_ids.json, written next to it). The JSON file is left in place; load_vector_store() prefers the binary files
+unless the JSON is newer, so re-run this after re-indexing.
+
+    python app/chatbot_convrec/scripts/convert_vector_store.py [--persist-dir storage]
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+from llama_index.core.vector_stores.simple import SimpleVectorStore
+from retrieval.mmap_vector_store import MmapVectorStore, JSON_FNAME, MATRIX_FNAME, NORMS_FNAME, SIDECAR_FNAME
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert vector_store.json to the memory-mapped format.")
+    parser.add_argument("--persist-dir", default="storage", help="llama-index storage directory")
+    args = parser.parse_args()
+
+    json_path = os.path.join(args.persist_dir, JSON_FNAME)
+    start = time.perf_counter()
+    json_store = SimpleVectorStore.from_persist_path(json_path)
+    json_load_ms = (time.perf_counter() - start) * 1000
+
+    MmapVectorStore.from_simple_vector_store(json_store).persist(json_path)
+
+    start = time.perf_counter()
+    mmap_store = MmapVectorStore.from_persist_dir(args.persist_dir)
+    mmap_load_ms = (time.perf_counter() - start) * 1000
+
+    # The float32 copy must match the JSON vectors up to float32 rounding
+    expected = np.asarray([json_store.data.embedding_dict[node_id] for node_id in mmap_store.data.ids], dtype=np.float32)
+    assert np.array_equal(expected, np.asarray(mmap_store.matrix)), "converted vectors differ from the JSON store"
+
+    binary_bytes = sum(os.path.getsize(os.path.join(args.persist_dir, name)) for name in (MATRIX_FNAME, NORMS_FNAME, SIDECAR_FNAME))
+    print(f"Converted {len(mmap_store.data.ids)} vectors of dimension {mmap_store.matrix.shape[1]}")
+    print(f"  JSON:   {os.path.getsize(json_path) / 2**20:.2f} MB, load {json_load_ms:.1f} ms")
+    print(f"  binary: {binary_bytes / 2**20:.2f} MB, load {mmap_load_ms:.1f} ms")
@@ -0,0 +1,40 @@
+"""
+Migrates a llama-index storage directory's docstore.json and index_store.json into docstore.sqlite
+(retrieval/sqlite_kvstore.py), written next to them, so the bot reads nodes on demand instead of
+loading the whole docstore at startup. The JSON files are left in place; load_docstore_and_index_store()
+prefers the SQLite file unless a JSON file is newer, so re-run this after re-indexing.
+
+    python app/chatbot_convrec/scripts/migrate_docstore.py [--persist-dir storage]
+"""
+import argparse
+import os
+import time
+
+from llama_index.core.storage.docstore import SimpleDocumentStore
+from retrieval.sqlite_kvstore import DOCSTORE_JSON_FNAME, KV_DB_FNAME, load_docstore_and_index_store, migrate_json_stores
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate the JSON docstore and index store to SQLite.")
+    parser.add_argument("--persist-dir", default="storage", help="llama-index storage directory")
+    args = parser.parse_args()
+
+    for collection, count in migrate_json_stores(args.persist_dir).items():
+        print(f"{collection}: {count} entries")
+
+    start = time.perf_counter()
+    json_docstore = SimpleDocumentStore.from_persist_dir(args.persist_dir)
+    json_load_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    docstore, index_store = load_docstore_and_index_store(args.persist_dir)
+    sqlite_load_ms = (time.perf_counter() - start) * 1000
+
+    # Every node must come back unchanged
+    for node_id, node in json_docstore.docs.items():
+        assert docstore.get_node(node_id) == node, f"node {node_id} differs after migration"
+
+    json_path = os.path.join(args.persist_dir, DOCSTORE_JSON_FNAME)
+    db_path = os.path.join(args.persist_dir, KV_DB_FNAME)
+    print(f"Migrated {len(json_docstore.docs)} nodes and {len(index_store.index_structs())} index structs")
+    print(f"  JSON:   {os.path.getsize(json_path) / 2**20:.2f} MB, load {json_load_ms:.1f} ms")
+    print(f"  SQLite: {os.path.getsize(db_path) / 2**20:.2f} MB, load {sqlite_load_ms:.1f} ms (nodes read on demand)")
@@ -0,0 +1,106 @@
+import json
+import os
+from dataclasses import dataclass
+from typing import Callable
+
+from action_router import ACTIONS, QUICK_RESPONSE
+from relevance_gate import Relevance
+
+#############################################
+CLASSIFICATION_MODEL = os.environ.get("CLASSIFICATION_MODEL", "gpt-3.5-turbo")
+COMBINED_CLASSIFICATION_ATTEMPTS = 3     # LLM calls before falling back to FALLBACK_CLASSIFICATION
+#############################################
+
+
+@dataclass
+class CombinedClassification:
+    relevance: Relevance
+    action: str
+    response_length: str
+
+
+# Used when no attempt produces valid output
+FALLBACK_CLASSIFICATION = CombinedClassification(Relevance.UNKNOWN, QUICK_RESPONSE, "general")
+
+COMBINED_CLASSIFICATION_PROMPT = """You are the message router of a chatbot that represents a club called the University of Toronto Machine Intelligence Team (UTMIST). When the user refers to "you" or "your", they are referring to UTMIST.
+
+Classify the user's query along three dimensions and answer with a JSON object of exactly this form:
+{"relevance": "known" | "unknown" | "irrelevant", "action": "Request More Information" | "Generate Recommendation" | "Answer a Question" | "Other/Quick Response", "response_length": "general" | "specific"}
+
+relevance:
+- "known": the query is about UTMIST (events, general info) and the context contains the answer, or it is about GENERAL knowledge in AI/ML.
+- "unknown": the query is about UTMIST or AI but the answer is not in the context and it is NOT general AI/ML knowledge.
+- "irrelevant": the query is not about UTMIST or AI/ML at all.
+
+action:
+- "Answer a Question": the query is a straightforward, answerable question.
+- "Generate Recommendation": the user wants personalized resource recommendations AND enough is known about them.
+- "Request More Information": the user wants recommendations but any hard constraint is unknown (language, system/device, prerequisite knowledge level, accessibility needs, budget) or we know nothing about their soft constraints (learning style, time commitment, level of depth, preferred topics, format preferences).
+- "Other/Quick Response": anything else, e.g. greetings or thanks.
+
+response_length:
+- "general": the query asks for broad information or an overview.
+- "specific": the query asks for detailed information about a particular topic or asks to elaborate.
+
+Output only the JSON object."""
+
+
+def parse_combined_classification(response: str) -> CombinedClassification:
+    """
+    Validates the JSON produced for COMBINED_CLASSIFICATION_PROMPT. Raises ValueError (or
+    KeyError / json.JSONDecodeError) when it does not match the schema.
+    """
+    data = json.loads(response)
+    if data["action"] not in ACTIONS:
+        raise ValueError(f"unknown action: {data['action']}")
+    if data["response_length"] not in ("general", "specific"):
+        raise ValueError(f"unknown response length: {data['response_length']}")
+    return CombinedClassification(Relevance(data["relevance"]), data["action"], data["response_length"])
+
+
+def classify_combined(input: str, combined_results: str, past_context: str, context_str: str,
+                      create_completion: Callable[..., object], model: str = CLASSIFICATION_MODEL) -> CombinedClassification:
+    """
+    Single LLM call that replaces classifyRelevance, Classify_Action and determine_response_length.
+    Uses JSON mode and retries up to COMBINED_CLASSIFICATION_ATTEMPTS times when the output does
+    not validate.
+
+    Args:
+        input (str): The user's message
+        combined_results (str): Per-sentence classifier results
+        past_context (str): Formatted mem0 memories
+        context_str (str): Retrieved context
+        create_completion (Callable[..., object]): Called with messages, model and response_format;
+            returns an OpenAI ChatCompletion
+
+    Returns:
+        CombinedClassification: The validated classification, or FALLBACK_CLASSIFICATION
+    """
+    user_query = f"""<context>
+{context_str}
+</context>
+
+<classification results for each sentence>
+{combined_results}
+</classification results for each sentence>
+
+<past context>
+{past_context}
+</past context>
+
+Query: {input}"""
+    for _ in range(COMBINED_CLASSIFICATION_ATTEMPTS):
+        response = create_completion(
+            messages=[{"role": "system", "content": COMBINED_CLASSIFICATION_PROMPT},
+                      {"role": "user", "content": user_query}],
+            model=model,
+            response_format={"type": "json_object"},
+        )
+        print(f"Combined classification tokens: {response.usage.prompt_tokens} prompt, "
+              f"{response.usage.completion_tokens} completion")
+        content = response.choices[0].message.content
+        try:
+            return parse_combined_classification(content)
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"invalid combined classification ({e}): {content}")
+    return FALLBACK_CLASSIFICATION
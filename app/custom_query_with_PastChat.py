@@ -1,4 +1,5 @@
 from llama_index.core.query_engine import CustomQueryEngine
+from llama_index.core import Settings
 from llama_index.core.retrievers import BaseRetriever
 from llama_index.core import get_response_synthesizer
 from llama_index.core.response_synthesizers import BaseSynthesizer
@@ -13,17 +14,33 @@ from llama_index.core import (
 )
 import os.path
 import os
-from enum import Enum
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 import torch
 import re
 import json
+import time
+from typing import Optional
 from chatbot_convrec.retrieve_recommendation import retrieve_recommendation
+from stage_graph import Stage, StageGraph
+from micro_batcher import MicroBatcher
+from request_context import RequestContext
+from streaming import astream_completion
+from llm_client import build_messages, chat_completion, llama_llm, openai_embedding
+from prompt_builder import PromptSection, fit_sections, count_tokens, PROMPT_TOKEN_BUDGET
+from answer_cache import AnswerCache
+from retrieval.embedding_cache import CachedEmbedding
+from retrieval.mmap_vector_store import load_vector_store
+from retrieval.sqlite_kvstore import load_docstore_and_index_store
+from singleflight import SingleFlight, flight_key
+from relevance_gate import Relevance, LocalRelevanceGate
+from action_router import choose_action, achoose_action
+import combined_classification
+from combined_classification import CombinedClassification
 # Option 2: return a string (we use a raw LLM call for illustration)
 from llama_index.llms.openai import OpenAI
 from llama_index.core import PromptTemplate
 from pathlib import Path
-import openai
-from openai import OpenAI as openai_client
 from openai.types.chat import ChatCompletion
 from dotenv import load_dotenv
 import sys
@@ -31,8 +48,10 @@ import sys
 sys.path.append(os.path.abspath(r"app\Classifier Models"))
 # sys.path.append(os.path.abspath("app/Classifier Models"))         # for MacOS
 
-from get_constraint_classifier_outcome import get_constraint_prediction
-from get_intent_classifier_outcome import get_binary_outcome
+from get_constraint_classifier_outcome import get_constraint_prediction, get_constraint_predictions
+from get_intent_classifier_outcome import get_binary_outcome, get_binary_outcomes
+from get_multi_head_classifier_outcome import get_multi_head_outcomes
+from get_relevance_classifier_outcome import initialize_relevance_classifier, get_relevance_probability
 
 from mem0 import Memory
 
@@ -47,20 +66,50 @@ load_dotenv(dotenv_path=env_path)
 
 if not os.environ.get("OPENAI_API_KEY"):
     os.environ["OPENAI_API_KEY"] = "Your key"
-openai_client_instance = openai
-embedding_model = openai_client(api_key=os.environ.get("OPENAI_API_KEY"))
+
+# Serve intent + constraint from the shared-encoder multi-head model (see multi_head_classifier.py)
+USE_MULTI_HEAD_CLASSIFIER = os.environ.get("USE_MULTI_HEAD_CLASSIFIER", "false").lower() == "true"
+
+# "separate" runs classifyRelevance and the action decision as their own steps; "combined"
+# asks for relevance, action and response length in one JSON-mode call (classify_combined).
+CLASSIFICATION_MODE = os.environ.get("CLASSIFICATION_MODE", "separate")
+
+# The index (query embeddings) and the answer LLM share the pooled client from llm_client.py;
+# query embeddings are also cached on disk (retrieval/embedding_cache.py)
+Settings.embed_model = CachedEmbedding(openai_embedding())
 
 # load existing index from storage
 PERSIST_DIR = "./storage"
-storage_context = StorageContext.from_defaults(persist_dir=PERSIST_DIR)
+# The vector store is memory-mapped when it has been converted (see convert_vector_store.py), and nodes
+# are read from SQLite on demand when the docstore has been migrated (see migrate_docstore.py)
+docstore, index_store = load_docstore_and_index_store(PERSIST_DIR)
+storage_context = StorageContext.from_defaults(persist_dir=PERSIST_DIR, vector_store=load_vector_store(PERSIST_DIR),
+                                               docstore=docstore, index_store=index_store)
 index = load_index_from_storage(storage_context)
 
 # Combine existing index with new index
 retriever = index.as_retriever()
 
+# Answers to questions, reused for similar later questions until ./storage is re-indexed
+answer_cache = AnswerCache(PERSIST_DIR)
+
 # Store past chat history using mem0 memory layer
 m = Memory()
 
+# Torch forwards run here so they never block the event loop. A single worker keeps
+# the classifiers from fighting over CPU threads; torch parallelizes inside each forward.
+CLASSIFIER_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="classifier")
+
+# Sentences from concurrent conversations are classified together: the batcher waits up to
+# CLASSIFIER_BATCH_MAX_WAIT_MS for other messages and runs one padded forward per batch.
+CLASSIFIER_BATCH_MAX_SIZE = int(os.environ.get("CLASSIFIER_BATCH_MAX_SIZE", "32"))
+CLASSIFIER_BATCH_MAX_WAIT_MS = float(os.environ.get("CLASSIFIER_BATCH_MAX_WAIT_MS", "5"))
+
+
+# Identical LLM calls that are in flight at the same time (e.g. many users asking the same
+# thing right after an announcement) share one request
+llm_flight = SingleFlight("llm")
+
 
 class RAGStringQueryEngine(CustomQueryEngine):
     """RAG String Query Engine."""
@@ -69,11 +118,22 @@ class RAGStringQueryEngine(CustomQueryEngine):
     llm: OpenAI
     qa_prompt: PromptTemplate
 
+    def _flight_key(self, prompt_text):
+        return flight_key(self.llm.model, self.llm.temperature, self.llm.max_tokens, prompt_text)
+
     # Custom query that incorporates chat history
     def custom_query(self, prompt_text):
-        response = self.llm.complete(prompt_text)
+        response = llm_flight.do(self._flight_key(prompt_text), lambda: self.llm.complete(prompt_text))
         return str(response)
 
+    async def acustom_query(self, prompt_text):
+        response = await llm_flight.ado(self._flight_key(prompt_text), lambda: self.llm.acomplete(prompt_text))
+        return str(response)
+
+    # Streaming variant: yields the completion text in chunks as the LLM produces them
+    def astream_query(self, prompt_text):
+        return astream_completion(self.llm, prompt_text)
+
 def determine_response_length(query: str) -> str:
     """
     Determines whether the user's query is general or specific.
@@ -103,7 +163,8 @@ Classification (general/specific):
         # Default to "general" if the classification is unclear
         return "general"
 
-llm = OpenAI(model="gpt-3.5-turbo", max_tokens=500)
+llm = llama_llm(model="gpt-3.5-turbo", max_tokens=500)
+Settings.llm = llm
 synthesizer = get_response_synthesizer(response_mode="compact")
 
 # Intent Classification: Process one sentence at a time.
@@ -119,6 +180,16 @@ def classify_constraints(sentence, intents):
         constraint_result = ["N/A"]
     return constraint_result
 
+# Batched Intent Classification: one forward pass for all sentences.
+def classify_intents(sentences: list) -> list:
+    return get_binary_outcomes(sentences)
+
+# Batched Constraints Classification: one forward pass for the sentences that provide a preference.
+def classify_constraints_batch(sentences: list, intents_list: list) -> list:
+    preference_sentences = [sentence for sentence, intents in zip(sentences, intents_list) if "Provide_Preference" in intents]
+    predictions = iter(get_constraint_predictions(preference_sentences))
+    return [next(predictions) if "Provide_Preference" in intents else ["N/A"] for intents in intents_list]
+
 # Update temporary JSON file using a user-specific filename (userID.json)
 def update_temp_json(new_entry: dict, userID: str):
     temp_file = f"{userID}.json"
@@ -134,58 +205,134 @@ def update_temp_json(new_entry: dict, userID: str):
     with open(temp_file, "w") as f:
         json.dump(data, f, indent=2)
 
-# Classification Results: Process full user input (may be multiple sentences)
-def get_classification_results(input_text, userID):
+def split_sentences(input_text: str) -> list:
     """
-    Splits the full user input into sentences, classifies each sentence using the intent and
-    constraint classifiers, and combines the results. The combined result is stored in a 
-    user-specific temporary JSON file.
-    
-    Returns:
-      - results_list: A list of classification results for each sentence.
-      - combined_results: A single string combining all sentence results.
+    Splits the full user input into sentences (using a simple regex).
     """
-    # Split the full input into sentences (using a simple regex)
     sentences = re.split(r'(?<=[.!?])\s+', input_text.strip())
-    
-    # results_list = []
+    return [sentence for sentence in sentences if sentence]
+
+def classify_sentences(sentences: list) -> list:
+    """
+    Runs the intent and constraint classifiers over all sentences, one batched forward
+    pass per model (or a single pass of the shared encoder with USE_MULTI_HEAD_CLASSIFIER).
+
+    Returns a list of (sentence, intent_res, constraint_res) tuples. This only touches the
+    local torch models, so the async path runs it on CLASSIFIER_EXECUTOR.
+    """
+    if USE_MULTI_HEAD_CLASSIFIER:
+        return [(sentence, intent_res, constraint_res)
+                for sentence, (intent_res, constraint_res) in zip(sentences, get_multi_head_outcomes(sentences))]
+    intents_list = classify_intents(sentences)
+    constraints_list = classify_constraints_batch(sentences, intents_list)
+    return list(zip(sentences, intents_list, constraints_list))
+
+classifier_batcher = MicroBatcher(
+    classify_sentences,
+    executor=CLASSIFIER_EXECUTOR,
+    max_batch_size=CLASSIFIER_BATCH_MAX_SIZE,
+    max_wait_ms=CLASSIFIER_BATCH_MAX_WAIT_MS,
+)
+
+def store_sentence_memories(classified: list, userID: str) -> None:
+    """
+    Adds every sentence that is not a question/inquiry to the user's mem0 memory.
+    """
+    for sentence, intent_res, constraint_res in classified:
+        if ("Inquire_Resources" not in intent_res) and ("Club_Related_Inquiry" not in intent_res) and ("Short_Answer_Inquiry" not in intent_res):
+            m.add(messages=sentence, user_id=userID, metadata={"intents": intent_res, "constraints": constraint_res})
+
+def format_classification(sentence: str, intent_res: list, constraint_res: list) -> str:
+    return f"Sentence: {sentence}\nIntents: {intent_res}\nConstraints: {constraint_res}"
+
+def combine_classification_results(classified: list):
+    """
+    Combines per-sentence classification results into the (constraints, combined_results, intents)
+    triple used by the rest of the chat pipeline.
+    """
     combined_results_lines = []
     intents = {}
     constraints = {}
-    
-    # Process each sentence individually.
-    for sentence in sentences:
-        if not sentence:
-            continue
-        intent_res = classify_intent(sentence)
-        constraint_res = classify_constraints(sentence, intent_res)
-        result_str = f"Sentence: {sentence}\nIntents: {intent_res}\nConstraints: {constraint_res}"
+    for sentence, intent_res, constraint_res in classified:
+        result_str = format_classification(sentence, intent_res, constraint_res)
         if intent_res:
             intents[sentence] = intent_res
         if constraint_res != ["N/A"]:
             constraints[sentence] = constraint_res
-        
-        # Only add this sentence if it is not a question/inquiry.
-        if ("Inquire_Resources" not in intent_res) and ("Club_Related_Inquiry" not in intent_res) and ("Short_Answer_Inquiry" not in intent_res):
-            m.add(messages=sentence, user_id=userID, metadata={"intents": intent_res, "constraints": constraint_res})
-
-        # results_list.append(result_str)
         combined_results_lines.append(result_str)
-    
+
     combined_results = "\n\n".join(combined_results_lines)
+    return constraints, combined_results, intents
+
+# Classification Results: Process full user input (may be multiple sentences)
+def get_classification_results(input_text, userID):
+    """
+    Splits the full user input into sentences, classifies each sentence using the intent and
+    constraint classifiers, and combines the results. Sentences that are not inquiries are
+    stored in the user's mem0 memory.
     
+    Returns:
+      - constraints: A dict mapping each sentence to its constraint prediction.
+      - combined_results: A single string combining all sentence results.
+      - intents: A dict mapping each sentence to its predicted intents.
+    """
+    classified = classify_sentences(split_sentences(input_text))
+    store_sentence_memories(classified, userID)
+
     # Store the combined results in the user-specific temporary JSON file.
     # new_entry = {
     #     "input_text": input_text,
     #     "classification_results": combined_results,
     # }
     # update_temp_json(new_entry, userID)
-    
-    # return results_list, combined_results, intent_res
 
-    return constraints, combined_results, intents
+    return combine_classification_results(classified)
 
-def generate_missing_info_prompt(combined_results, query, past_context_str):
+def get_past_memories(userID: str) -> list:
+    """
+    Returns the user's most recent mem0 memories (dicts with "memory" and "metadata").
+    """
+    return m.get_all(user_id=userID, limit=5)['results']
+
+def format_memory(memory: dict) -> str:
+    return f"Memory: {memory['memory']}, Metadata: {memory['metadata']}"
+
+def format_past_context(memories: list) -> str:
+    """
+    Formats mem0 memories into a string for the prompts.
+    """
+    return "\n".join([format_memory(memory) for memory in memories])
+
+def budget_prompt_inputs(query_str: str, classified: list, memories: list, nodes: list = None):
+    """
+    Builds the classification results, past context and retrieved context strings of the
+    answer prompt within PROMPT_TOKEN_BUDGET (see prompt_builder.py). Sections are filled in
+    that priority order; the highest-scoring nodes and the newest memories are kept first.
+
+    Returns (combined_results, past_context, context_str); context_str is None without nodes.
+    """
+    query_tokens = count_tokens(query_str)
+    node_scores = [n.score or 0.0 for n in nodes or []]
+    # ISO timestamps sort chronologically
+    memory_times = [memory.get("updated_at") or memory.get("created_at") or "" for memory in memories]
+    newest_first = sorted(range(len(memories)), key=lambda i: memory_times[i], reverse=True)
+    texts, report = fit_sections([
+        PromptSection("classification", [format_classification(*c) for c in classified]),
+        PromptSection("context", [n.node.get_content() for n in nodes or []], ranks=[-score for score in node_scores]),
+        PromptSection("memory", [format_memory(memory) for memory in memories], separator="\n",
+                      ranks=[newest_first.index(i) for i in range(len(memories))]),
+    ], PROMPT_TOKEN_BUDGET - query_tokens)
+    print("Prompt token usage:", {"query": query_tokens, **report})
+    context_str = texts["context"] if nodes is not None else None
+    return texts["classification"], texts["memory"], context_str
+
+def get_past_context_str(userID: str) -> str:
+    """
+    Formats the user's most recent mem0 memories into a string for the prompts.
+    """
+    return format_past_context(get_past_memories(userID))
+
+def build_missing_info_prompt(combined_results, query, past_context_str) -> str:
     prompt = PromptTemplate(
         "Given the follwing information: "
         "The user's crucial context: "
@@ -204,22 +351,28 @@ def generate_missing_info_prompt(combined_results, query, past_context_str):
         "Make sure to ask the user of any of the hard constraints we have no information on and soft constraints that you identify that we also know nothing about to give the user a better informed suggestion later."
         "Be sure to talk to the user in second person. Talk as if you are talking to the user directly."
     )
+    return prompt.format(combined_results=combined_results, query=query, past_context_str=past_context_str)
+
+MISSING_INFO_FALLBACK = "Could not determine missing information. Please provide any relevant details that might be missing."
+
+def make_query_engine(prompt_formatted: str) -> RAGStringQueryEngine:
+    return RAGStringQueryEngine(
+        retriever=retriever,
+        response_synthesizer=synthesizer,
+        llm=llm,
+        qa_prompt=PromptTemplate(prompt_formatted),
+    )
+
+def generate_missing_info_prompt(combined_results, query, past_context_str):
     try:
-        prompt_formatted = prompt.format(combined_results=combined_results, query=query)
-        local_prompt = PromptTemplate(prompt_formatted)
-        query_engine = RAGStringQueryEngine(
-            retriever=retriever,
-            response_synthesizer=synthesizer,
-            llm=llm,
-            qa_prompt=local_prompt,
-        )
-        missing_info = query_engine.custom_query(prompt_formatted)
+        prompt_formatted = build_missing_info_prompt(combined_results, query, past_context_str)
+        missing_info = make_query_engine(prompt_formatted).custom_query(prompt_formatted)
         return missing_info
     except Exception as e:
         print(f"Error in generate_missing_info_prompt: {e}")
-        return "Could not determine missing information. Please provide any relevant details that might be missing."
+        return MISSING_INFO_FALLBACK
 
-def Classify_Action(combined_results: str, query_str: str, past_context: str) -> str:
+def build_action_prompt(combined_results: str, query_str: str, past_context: str) -> str:
     prompt = PromptTemplate(
         "Below is the user query: "
         "{query_str}\n\n"
@@ -251,62 +404,47 @@ def Classify_Action(combined_results: str, query_str: str, past_context: str) ->
         "- If the user appears to be seeking personalized recommendation and only when sufficient information(Outlined by the information required by the request more information output) is present, output 'Generate Recommendation'.\n"
         "Please output exactly one of these phrases with exact capitalization."
     )
-    prompt_formatted = prompt.format(combined_results=combined_results, query_str=query_str, past_context=past_context)
-    local_prompt = PromptTemplate(prompt_formatted)
-    query_engine = RAGStringQueryEngine(
-        retriever=retriever,
-        response_synthesizer=synthesizer,
-        llm=llm,
-        qa_prompt=local_prompt,
-    )
-    classification = query_engine.custom_query(prompt_formatted)
+    return prompt.format(combined_results=combined_results, query_str=query_str, past_context=past_context)
+
+def Classify_Action(combined_results: str, query_str: str, past_context: str) -> str:
+    prompt_formatted = build_action_prompt(combined_results, query_str, past_context)
+    classification = make_query_engine(prompt_formatted).custom_query(prompt_formatted)
     return classification
 
-# aiResponse combined with past chat history
-def aiResponse(input, userID):
-    # For debugging: print all the memories for the current user.
-    # print("Current memories: ", [memory["memory"] for memory in m.get_all(user_id=userID)["results"]])
-    
-    # Optionally, clear the chat history for a new conversation.
-    # Uncomment the next line if you want to clear previous history:
-    # clear_chat_history(userID)
+async def Classify_Action_async(combined_results: str, query_str: str, past_context: str) -> str:
+    prompt_formatted = build_action_prompt(combined_results, query_str, past_context)
+    classification = await make_query_engine(prompt_formatted).acustom_query(prompt_formatted)
+    return classification
 
-    # Load any existing temporary classification results.
-    # user_file = f"{userID}.json"
-    # if os.path.exists(user_file):
-    #     with open(user_file, "r") as f:
-    #         past_results = json.load(f)
-    # else:
-    #     past_results = []
-    
-    # Retrieve past conversations from the chat_store.
-    # past_context_str = "\n\n".join([f"{msg.role.value}: {msg.content}" for msg in get_chat_history(userID=userID)])
-    past_context_str = "\n".join([f"Memory: {memory['memory']}, Metadata: {memory["metadata"]}" for memory in m.get_all(user_id=userID, limit=5)['results']])
+def decide_action(classified: list, memories: list, combined_results: str, query_str: str, past_context: str) -> str:
+    """
+    Picks the action with the local router (action_router.py) and only calls Classify_Action
+    when the router is not confident. A sample of confident decisions is also checked
+    against the LLM in the background to track agreement.
+    """
+    return choose_action(classified, memories, lambda: Classify_Action(combined_results, query_str, past_context))
 
-    # Get classification results for the current user input.
-    # results_list, combined_results, intent_res = get_classification_results(input, userID)
-    constraints, combined_results, intents = get_classification_results(input, userID)    
+async def decide_action_async(classified: list, memories: list, combined_results: str, query_str: str, past_context: str) -> str:
+    return await achoose_action(classified, memories, lambda: Classify_Action_async(combined_results, query_str, past_context))
 
-    # Optionally, you can combine past temporary results if desired:
-    # results_list.extend(past_results)
+def is_club_related(intents: dict) -> bool:
+    return any("Club_Related_Inquiry" in intents[s] for s in intents)
 
-    classified_action = Classify_Action(combined_results, input, past_context_str)
-    print(combined_results)
-    print("Classified Action:", classified_action)
+# Answer length limits by response length ("general" / "specific", see classify_combined)
+ANSWER_WORD_LIMITS = {"general": 100, "specific": 200}
 
-    print("Past Chat History:", past_context_str)
-    
-    query_str = input
-    past_context = past_context_str  # Use the actual past context
-    
+def build_answer_prompt(classified_action: str, query_str: str, combined_results: str, past_context: str,
+                        context_str: str = None, recommendations=None, response_length: str = None) -> str:
+    """
+    Builds the final QA prompt for the classified action. `context_str` is the retrieved
+    vector context for club related questions and `recommendations` the output of
+    retrieve_recommendation; both are only used by the matching actions. `response_length`
+    sets the word limit of answers (100 words when not given).
+    """
     if classified_action == "Answer a Question":
+        word_limit = ANSWER_WORD_LIMITS.get(response_length, ANSWER_WORD_LIMITS["general"])
 
-        if any("Club_Related_Inquiry" in intents[s] for s in intents):
-            # Retrieve context from the vector database.
-            nodes = retriever.retrieve(input)
-            context_str = "\n\n".join([n.node.get_content() for n in nodes])
-            # print("Vector Context:", context_str)
-
+        if context_str is not None:
             qa_prompt = PromptTemplate(
                 "Below are the combined classification results derived from the user's query:\n"
                 "{combined_results}\n\n"
@@ -318,36 +456,35 @@ def aiResponse(input, userID):
                 "{past_context}\n\n"
                 "Based on the above information, provide a clear, concise, and accurate answer to the question. "
                 "Make sure to use the context provided from the vector database to enrich your answer. "
-                "Keep your response simple and limited to 100 words."
+                "Keep your response simple and limited to {word_limit} words."
             )
-            qa_prompt_formatted = qa_prompt.format(
+            return qa_prompt.format(
                 combined_results=combined_results, 
                 past_context=past_context, 
                 context_str=context_str, 
                 query_str=query_str,
+                word_limit=word_limit,
             )
 
-        else:
-            qa_prompt = PromptTemplate(
-                "Below are the combined classification results derived from the user's query:\n"
-                "{combined_results}\n\n"
-                "The user's question is:\n"
-                "{query_str}\n\n"
-                "This is the user's Chat History:\n"
-                "{past_context}\n\n"
-                "Based on the above information, provide a clear, concise, and accurate answer to the question. "
-                "Make sure to use the context provided from the vector database to enrich your answer. "
-                "Keep your response simple and limited to 100 words."
-            )
-            qa_prompt_formatted = qa_prompt.format(
-                combined_results=combined_results, 
-                past_context=past_context,
-                query_str=query_str,
-            )
+        qa_prompt = PromptTemplate(
+            "Below are the combined classification results derived from the user's query:\n"
+            "{combined_results}\n\n"
+            "The user's question is:\n"
+            "{query_str}\n\n"
+            "This is the user's Chat History:\n"
+            "{past_context}\n\n"
+            "Based on the above information, provide a clear, concise, and accurate answer to the question. "
+            "Make sure to use the context provided from the vector database to enrich your answer. "
+            "Keep your response simple and limited to {word_limit} words."
+        )
+        return qa_prompt.format(
+            combined_results=combined_results, 
+            past_context=past_context,
+            query_str=query_str,
+            word_limit=word_limit,
+        )
 
     elif classified_action == "Generate Recommendation":
-        recommendations = retrieve_recommendation(constraints, query_str)
-        print(recommendations)
         qa_prompt = PromptTemplate(
             "You are a recommendation chatbot that is to provide the user with the best resource recommendations.\n"
             "Your task is the format the response given the information below such that you give the user the best recommendations according to their query.\n"
@@ -358,7 +495,7 @@ def aiResponse(input, userID):
             "{recommendations} \n"
             "Now format this information into a response to give to the user. Address the user as if you are talking to them directly."
         )
-        qa_prompt_formatted = qa_prompt.format(
+        return qa_prompt.format(
             query_str=query_str,
             recommendations=recommendations,
         )
@@ -369,32 +506,211 @@ def aiResponse(input, userID):
             "{query_str}\n"
             "Limit your response to 50 words maximum."
         )
-        qa_prompt_formatted = qa_prompt.format(query_str=input)
+        return qa_prompt.format(query_str=query_str)
 
-    else:
+    return None
+
+# aiResponse combined with past chat history
+def aiResponse(input, userID, classified_action=None, response_length=None, context: RequestContext = None,
+               memories: list = None, classified: list = None):
+    """
+    Answers one user message. `classified_action` and `response_length` can be passed in when
+    they were already decided (e.g. by classify_combined); the action is decided here otherwise.
+    `context` carries the query embedding and retrieved nodes of earlier steps, if any, and
+    `memories` / `classified` the mem0 memories and sentence classifications if already fetched.
+    """
+    context = context or RequestContext(input, retriever)
+    # For debugging: print all the memories for the current user.
+    # print("Current memories: ", [memory["memory"] for memory in m.get_all(user_id=userID)["results"]])
+    
+    # Optionally, clear the chat history for a new conversation.
+    # Uncomment the next line if you want to clear previous history:
+    # clear_chat_history(userID)
+
+    # Retrieve past conversations from mem0.
+    if memories is None:
+        memories = get_past_memories(userID)
+    past_context_str = format_past_context(memories)
+
+    # Get classification results for the current user input.
+    if classified is None:
+        classified = classify_sentences(split_sentences(input))
+    store_sentence_memories(classified, userID)
+    constraints, combined_results, intents = combine_classification_results(classified)
+
+    if classified_action is None:
+        classified_action = decide_action(classified, memories, combined_results, input, past_context_str)
+    print(combined_results)
+    print("Classified Action:", classified_action)
+
+    print("Past Chat History:", past_context_str)
+    
+    query_str = input
+    nodes = None
+    recommendations = None
+
+    if classified_action == "Answer a Question" and is_club_related(intents):
+        # Retrieve context from the vector database.
+        nodes = context.retrieve()
+    elif classified_action == "Generate Recommendation":
+        recommendations = retrieve_recommendation(constraints, query_str)
+        print(recommendations)
+
+    # Fit the classification results, retrieved context and past context into the token budget
+    combined_results, past_context, context_str = budget_prompt_inputs(query_str, classified, memories, nodes)
+
+    qa_prompt_formatted = build_answer_prompt(classified_action, query_str, combined_results, past_context,
+                                              context_str=context_str, recommendations=recommendations,
+                                              response_length=response_length)
+    if qa_prompt_formatted is None:
         # If classified action doesn't fall into the above categories, ask for missing info.
-        missing_info_prompt = generate_missing_info_prompt(combined_results, input, past_context_str)
+        missing_info_prompt = generate_missing_info_prompt(combined_results, input, past_context)
         return missing_info_prompt
-    
-    qa_prompt_local = PromptTemplate(qa_prompt_formatted)
-    query_engine = RAGStringQueryEngine(
-        retriever=retriever,
-        response_synthesizer=synthesizer,
-        llm=llm,
-        qa_prompt=qa_prompt_local,
-    )
+
     print(qa_prompt_formatted)
-    response = query_engine.custom_query(qa_prompt_formatted)
+    response = make_query_engine(qa_prompt_formatted).custom_query(qa_prompt_formatted)
+    if classified_action == "Answer a Question":
+        # Recommendations and follow-up questions depend on the user; answers built with their chat
+        # history are only reused for them, other answers for everyone
+        answer_cache.store(input, context.get_query_embedding(), response, user_id=userID if past_context else None)
     return response
 
-class Relevance(Enum):
-    KNOWN = "known"
-    UNKNOWN = "unknown"
-    IRRELEVANT = "irrelevant"
+async def prepare_answer_async(input, userID, context: RequestContext = None):
+    """
+    Runs everything in front of the final LLM call for aiResponse_async / aiResponse_stream.
+    Returns (prompt, fallback, cacheable, personalized): the answer prompt, the text to reply with
+    if that call fails (only set for missing-information prompts; other errors propagate), whether
+    the answer may be stored in answer_cache, and whether the prompt includes the user's chat
+    history (so the answer may only be reused for them).
+
+    Nothing here blocks the event loop:
+    LLM calls use the async clients, the classifiers run on CLASSIFIER_EXECUTOR (micro-batched
+    with the sentences of other in-flight conversations by classifier_batcher) and the
+    mem0 / recommendation calls (which only have sync APIs) run on the default thread pool,
+    so many conversations can be in flight at once.
+
+    The independent stages run as a StageGraph: the memory lookup and the classifiers start
+    together, and the club-info retrieval and the mem0 writes overlap with the action decision.
+    Everything is joined before the answer prompt is assembled.
+    """
+    context = context or RequestContext(input, retriever)
+
+    async def load_memory(_):
+        return await asyncio.to_thread(get_past_memories, userID)
+
+    async def classify(_):
+        return await classifier_batcher.submit_many(split_sentences(input))
+
+    async def store_memories(deps):
+        # Waits for the memory lookup so the past context never includes the current message.
+        await asyncio.to_thread(store_sentence_memories, deps["classify"], userID)
+
+    async def classify_action(deps):
+        _, combined_results, _ = combine_classification_results(deps["classify"])
+        return await decide_action_async(deps["classify"], deps["memory"], combined_results, input,
+                                         format_past_context(deps["memory"]))
+
+    async def retrieve_club_context(deps):
+        _, _, intents = combine_classification_results(deps["classify"])
+        if not is_club_related(intents):
+            return None
+        return await context.aretrieve()
+
+    graph = StageGraph([
+        Stage("memory", load_memory),
+        Stage("classify", classify),
+        Stage("store_memories", store_memories, depends_on=("memory", "classify")),
+        Stage("action", classify_action, depends_on=("memory", "classify")),
+        Stage("club_context", retrieve_club_context, depends_on=("classify",)),
+    ])
+    results = await graph.run()
+
+    constraints, combined_results, intents = combine_classification_results(results["classify"])
+    classified_action = results["action"]
+    print(combined_results)
+    print("Classified Action:", classified_action)
+
+    query_str = input
+    nodes = None
+    recommendations = None
+
+    if classified_action == "Answer a Question":
+        nodes = results["club_context"]
+    elif classified_action == "Generate Recommendation":
+        recommendations = await asyncio.to_thread(retrieve_recommendation, constraints, query_str)
+
+    # Fit the classification results, retrieved context and past context into the token budget
+    combined_results, past_context, context_str = budget_prompt_inputs(query_str, results["classify"],
+                                                                       results["memory"], nodes)
+
+    qa_prompt_formatted = build_answer_prompt(classified_action, query_str, combined_results, past_context,
+                                              context_str=context_str, recommendations=recommendations)
+    if qa_prompt_formatted is None:
+        return build_missing_info_prompt(combined_results, input, past_context), MISSING_INFO_FALLBACK, False, bool(past_context)
+    return qa_prompt_formatted, None, classified_action == "Answer a Question", bool(past_context)
+
+async def aiResponse_async(input, userID, context: RequestContext = None):
+    """
+    Async version of aiResponse for the Discord bot (see prepare_answer_async). Similar
+    questions answered before are served from answer_cache.
+    """
+    context = context or RequestContext(input, retriever)
+    cached = answer_cache.lookup(await context.aget_query_embedding(), user_id=userID)
+    if cached is not None:
+        return cached
+
+    prompt_formatted, fallback, cacheable, personalized = await prepare_answer_async(input, userID, context)
+    try:
+        response = await make_query_engine(prompt_formatted).acustom_query(prompt_formatted)
+        if cacheable:
+            answer_cache.store(input, context.query_embedding, response, user_id=userID if personalized else None)
+        return response
+    except Exception as e:
+        if fallback is None:
+            raise
+        print(f"Error in aiResponse_async: {e}")
+        return fallback
 
-def classifyRelevance(input, retriever=retriever) -> Relevance:
+async def aiResponse_stream(input, userID, context: RequestContext = None):
     """
-    Classifies how relevant a particular user input is to UTMIST.
+    Streaming version of aiResponse_async: an async generator of answer text chunks, so the
+    bot can show the answer while it is being generated.
+    """
+    context = context or RequestContext(input, retriever)
+    cached = answer_cache.lookup(await context.aget_query_embedding(), user_id=userID)
+    if cached is not None:
+        yield cached
+        return
+
+    prompt_formatted, fallback, cacheable, personalized = await prepare_answer_async(input, userID, context)
+    try:
+        chunks = []
+        async for chunk in make_query_engine(prompt_formatted).astream_query(prompt_formatted):
+            chunks.append(chunk)
+            yield chunk
+        if cacheable:
+            answer_cache.store(input, context.query_embedding, "".join(chunks), user_id=userID if personalized else None)
+    except Exception as e:
+        if fallback is None:
+            raise
+        print(f"Error in aiResponse_stream: {e}")
+        yield fallback
+
+# The relevance model is only needed by get_response_with_relevance, so it is loaded on first use
+relevance_gate = LocalRelevanceGate(initialize_relevance_classifier, get_relevance_probability)
+
+def classify_relevance_local(input: str) -> Optional[Relevance]:
+    """
+    Returns IRRELEVANT when the local relevance classifier is confident the input is off-topic,
+    and None when the LLM should decide. The model is binary, so it can't tell "known" from
+    "unknown"; relevant messages still go through classifyRelevance / classify_combined.
+    """
+    return relevance_gate.classify(input)
+
+def classifyRelevance(input, retriever=retriever, context: RequestContext = None) -> Relevance:
+    """
+    Classifies how relevant a particular user input is to UTMIST. Pass the request's
+    `context` so the nodes retrieved here are reused by aiResponse.
     """
     RELEVANCE_PROMPT = """You are talking to a user as a representative of a club called the University of Toronto Machine Intelligence Team (UTMIST). 
 
@@ -438,8 +754,8 @@ Output: relevant
 
 ### END OF EXAMPLES ###"""
 
-    nodes = retriever.retrieve(input)
-    context_str = "\n\n".join([n.node.get_content() for n in nodes])
+    context = context or RequestContext(input, retriever)
+    context_str = context.context_str()
     user_query = f"""<context>
 {context_str}
 </context>
@@ -459,11 +775,42 @@ Output: """
             pass
     return Relevance.UNKNOWN
 
+def classify_combined(input: str, combined_results: str, past_context: str, context_str: str) -> CombinedClassification:
+    """Relevance, action and response length in one JSON-mode call (see combined_classification.py)."""
+    return combined_classification.classify_combined(input, combined_results, past_context, context_str,
+                                                     _get_openai_response)
+
 def get_response_with_relevance(input: str, past_chat_history=[], retriever=retriever) -> str:
-    relevance = classifyRelevance(input, retriever=retriever)
+    # Local classifier first; the retrieval + LLM check only runs when it doesn't reject the message
+    start = time.perf_counter()
+    # Embedding + vector search happen at most once per message, whichever step needs them first
+    context = RequestContext(input, retriever)
+    relevance = classify_relevance_local(input)
+    if relevance != Relevance.IRRELEVANT:
+        # Similar questions answered before skip classification, retrieval and generation
+        cached = answer_cache.lookup(context.get_query_embedding(), user_id="default")
+        if cached is not None:
+            return cached
+    classified_action = None
+    response_length = None
+    memories = None
+    classified = None
+    if relevance != Relevance.IRRELEVANT and CLASSIFICATION_MODE == "combined":
+        # One LLM call decides relevance, action and answer length together; aiResponse reuses
+        # the memories and classifications fetched for it
+        memories = get_past_memories("default")
+        classified = classify_sentences(split_sentences(input))
+        _, combined_results, _ = combine_classification_results(classified)
+        combined = classify_combined(input, combined_results, format_past_context(memories), context.context_str())
+        relevance = combined.relevance
+        classified_action, response_length = combined.action, combined.response_length
+    elif relevance is None:
+        relevance = classifyRelevance(input, retriever=retriever, context=context)
+    print(f"Classification ({CLASSIFICATION_MODE}): {(time.perf_counter() - start) * 1000:.0f} ms")
     print("relevance: " + str(relevance))
     if relevance == Relevance.KNOWN:
-        return aiResponse(input, userID="default")
+        return aiResponse(input, userID="default", classified_action=classified_action, response_length=response_length,
+                          context=context, memories=memories, classified=classified)
     elif relevance == Relevance.UNKNOWN:
         return get_unknown_response(input, past_chat_history, retriever)
     else:
@@ -484,10 +831,10 @@ If you cannot answer the user's query using your knowledge of AI/ML, you must te
     messages.append({"role": "user", "content": latest_user_input})
     return get_openai_response_content(system_prompt=UNKNOWN_RESPONSE_PROMPT, model="gpt-3.5-turbo", messages=messages)
 
-def get_openai_response_content(system_prompt="", messages=[], model="gpt-3.5-turbo", **kwargs) -> str:
+def get_openai_response_content(system_prompt="", messages=None, model="gpt-3.5-turbo", **kwargs) -> str:
     assert messages or system_prompt, "prompt or messages must be provided"
-    if system_prompt:
-        messages.insert(0, {"role": "system", "content": system_prompt})
+    # A new list, so neither the caller's list nor a shared default is modified
+    messages = build_messages(system_prompt, messages)
     response = _get_openai_response(messages=messages, model=model, **kwargs)
     return _extract_openai_response_content(response)
 
@@ -495,6 +842,8 @@ def _extract_openai_response_content(response: ChatCompletion) -> str:
     assert isinstance(response, ChatCompletion), "response must be a ChatCompletion object"
     return response.choices[0].message.content
 
-def _get_openai_response(messages=[], model="gpt-3.5-turbo", **kwargs) -> ChatCompletion:
-    response: ChatCompletion = openai_client_instance.chat.completions.create(model=model, messages=messages, **kwargs)
+def _get_openai_response(messages=None, model="gpt-3.5-turbo", **kwargs) -> ChatCompletion:
+    messages = messages or []
+    response: ChatCompletion = llm_flight.do(flight_key(model, messages, kwargs),
+                                             lambda: chat_completion(messages, model=model, **kwargs))
     return response
@@ -1,9 +1,16 @@
 import discord
 from discord.ext import commands, tasks
 # Modified for rag
-from custom_query_with_PastChat import aiResponse
+from custom_query_with_PastChat import (aiResponse_async, aiResponse_stream, classifier_batcher, answer_cache,
+                                       llm_flight, USE_MULTI_HEAD_CLASSIFIER)
+from request_context import embedding_flight
+from streaming import stream_to_message
+from action_router import router_stats
+from llm_client import llm_metrics
 from get_constraint_classifier_outcome import initialize_constraint_classifier
 from get_intent_classifier_outcome import initialize_intent_classifier
+from get_multi_head_classifier_outcome import initialize_multi_head_classifier
+import get_constraint_classifier_outcome, get_intent_classifier_outcome, get_multi_head_classifier_outcome
 # from rag_handler import ai_response, save_unanswered_queries, update_vector_database  
 import os
 import os.path
@@ -26,13 +33,21 @@ print("Does .env exist?", os.path.exists(env_path))
 TARGET_GUILD_ID = int(os.environ.get("GUILD_ID"))
 TARGET_CHANNEL_ID = int(os.environ.get("CHANNEL_ID"))
 
+# Post a placeholder and edit it as the answer streams in, instead of waiting for the full answer
+STREAM_RESPONSES = os.environ.get("STREAM_RESPONSES", "false").lower() == "true"
+
 # Intitialize models
-initialize_constraint_classifier()
-initialize_intent_classifier()
+if USE_MULTI_HEAD_CLASSIFIER:
+    initialize_multi_head_classifier()
+else:
+    initialize_constraint_classifier()
+    initialize_intent_classifier()
 
 @client.event
 async def on_ready():
     print("Bot is now online")
+    if not log_classifier_stats_task.is_running():  # on_ready fires again after reconnects
+        log_classifier_stats_task.start()
     # save_unanswered_queries_task.start()  # Modified for rag
     # update_vector_database_task.start()   # Modified for rag
 
@@ -49,8 +64,13 @@ async def on_message(message):
             await message.add_reaction('\U0001F970')
 
         # Respond
+        elif STREAM_RESPONSES:
+            await stream_to_message(message.channel, aiResponse_stream(input=message.content, userID=message.author.name))
         else:
-            output = aiResponse(input=message.content, userID=message.author.name)
+            # aiResponse_async never blocks the gateway loop, so other users keep being
+            # served (and heartbeats stay on time) while this message is answered.
+            async with message.channel.typing():
+                output = await aiResponse_async(input=message.content, userID=message.author.name)
             await message.channel.send(output)
     else:
         # Ignore messages not in the target guild and channel
@@ -71,6 +91,18 @@ async def on_reaction_add(reaction, user):
     if reaction.message.guild and reaction.message.guild.id == TARGET_GUILD_ID and reaction.message.channel.id == TARGET_CHANNEL_ID:
         await reaction.message.channel.send(f'{user} reacted with {reaction.emoji}')
 
+# Classifier micro-batching stats (queue depth, batch sizes, wait times) and cache hit rates
+@tasks.loop(minutes=10)
+async def log_classifier_stats_task():
+    print("Classifier batcher stats:", classifier_batcher.stats())
+    for module in (get_intent_classifier_outcome, get_constraint_classifier_outcome, get_multi_head_classifier_outcome):
+        if hasattr(module, "cache"):  # only the initialized classifiers have a cache
+            print("Classifier cache stats:", module.cache.stats())
+    print("Action router stats:", router_stats.stats())
+    print("LLM client stats:", llm_metrics.stats())
+    print("Answer cache stats:", answer_cache.stats())
+    print("Request coalescing stats:", llm_flight.stats(), embedding_flight.stats())
+
 # # Modified for rag
 # @tasks.loop(hours=24)  
 # async def save_unanswered_queries_task():
@@ -3,7 +3,8 @@ from dataclasses import dataclass, field
 from pandas import DataFrame
 import numpy as np
 import datetime
-from llama_index.embeddings.openai import OpenAIEmbedding
+from llm_client import openai_embedding
+from retrieval.embedding_cache import CachedEmbedding
 from llama_index.core.base.embeddings.base import BaseEmbedding
 from uuid import uuid4
 from typing import Any, List, Dict
@@ -26,7 +27,7 @@ class VectorDataTransformConfig(DataTransformConfig):
     vectorize_columns: List[str]
     metadata_columns: List[str]
     embeddings_model: BaseEmbedding = field(
-        default_factory=lambda: OpenAIEmbedding(model="text-embedding-ada-002")
+        default_factory=lambda: CachedEmbedding(openai_embedding(model="text-embedding-ada-002"))
     )
     embeddings_output_colname: str = "embeddings"
     metadata_output_colname: str = "metadata"
@@ -50,9 +51,9 @@ class DefaultVectorTransformer(DataTransformer):
             .agg(" ".join, axis=1)
 
         # 2) Generate embeddings and ensure they are Python lists
+        #    (one batched call, so cached rows are looked up together and only the rest is sent)
         embeddings: List[List[float]] = []
-        for text in texts_to_embed:
-            emb = config.embeddings_model.get_text_embedding(text)
+        for emb in config.embeddings_model.get_text_embedding_batch(texts_to_embed.tolist()):
             # If numpy array, convert to list; else assume it's already list-like
             if isinstance(emb, np.ndarray):
                 emb_list = emb.tolist()
@@ -0,0 +1,187 @@
+"""
+Shared OpenAI access for the whole app. Every OpenAI call (direct chat completions, the
+llama-index LLM and embedding objects, the DataCollection scripts) goes through the pooled
+HTTP clients created here, so they share keep-alive connections, timeouts, retry policy and
+metrics.
+
+Retries are done by the OpenAI SDK: 408/409/429/5xx responses and connection errors are
+retried up to LLM_MAX_RETRIES times with exponential backoff and jitter, honoring Retry-After.
+Every HTTP request (including retried attempts) is recorded in `llm_metrics`.
+"""
+import os
+import threading
+import time
+from collections import defaultdict, deque
+
+import httpx
+import openai
+from openai.types.chat import ChatCompletion
+
+#############################################
+LLM_TIMEOUT = float(os.environ.get("LLM_TIMEOUT", "30"))                  # seconds, per request
+LLM_CONNECT_TIMEOUT = float(os.environ.get("LLM_CONNECT_TIMEOUT", "5"))   # seconds, TCP/TLS connect
+LLM_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", "4"))
+LLM_MAX_CONNECTIONS = int(os.environ.get("LLM_MAX_CONNECTIONS", "20"))    # per client (sync / async)
+#############################################
+
+RETRYABLE_STATUS = {408, 409, 429}
+
+
+class LLMMetrics:
+    """Per endpoint and model: request count, errors, retryable responses, latency and token usage."""
+
+    def __init__(self, latency_history: int = 1000):
+        self._lock = threading.Lock()
+        self._stats = defaultdict(lambda: {
+            "requests": 0,
+            "errors": 0,
+            "retryable": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "latency_ms": deque(maxlen=latency_history),
+        })
+
+    def record(self, request: httpx.Request, response: httpx.Response = None, latency_s: float = 0.0):
+        body = _usage_body(response)
+        key = (request.url.path, body.get("model", "?"))
+        usage = body.get("usage") or {}
+        with self._lock:
+            stats = self._stats[key]
+            stats["requests"] += 1
+            stats["latency_ms"].append(latency_s * 1000)
+            if response is None or response.status_code >= 400:
+                stats["errors"] += 1
+            if response is not None and (response.status_code in RETRYABLE_STATUS or response.status_code >= 500):
+                stats["retryable"] += 1
+            stats["prompt_tokens"] += usage.get("prompt_tokens", 0)
+            stats["completion_tokens"] += usage.get("completion_tokens", 0)
+
+    def stats(self) -> dict:
+        with self._lock:
+            result = {}
+            for (path, model), stats in self._stats.items():
+                latencies = sorted(stats["latency_ms"])
+                result[f"{path} {model}"] = {
+                    **{k: v for k, v in stats.items() if k != "latency_ms"},
+                    "latency_ms_p50": latencies[len(latencies) // 2] if latencies else 0.0,
+                    "latency_ms_p95": latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))] if latencies else 0.0,
+                }
+            return result
+
+
+llm_metrics = LLMMetrics()
+
+
+def _usage_body(response: httpx.Response) -> dict:
+    """The JSON body of a successful non-streaming response (model and usage), else {}."""
+    if response is None or response.status_code != 200 or "application/json" not in response.headers.get("content-type", ""):
+        return {}
+    try:
+        body = response.json()
+    except ValueError:
+        return {}
+    return body if isinstance(body, dict) else {}
+
+
+def _needs_body(response: httpx.Response) -> bool:
+    # Streaming (server-sent events) responses are left untouched so tokens still arrive incrementally
+    return "application/json" in response.headers.get("content-type", "")
+
+
+class _MetricsTransport(httpx.BaseTransport):
+    def __init__(self, transport: httpx.BaseTransport):
+        self._transport = transport
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        start = time.perf_counter()
+        try:
+            response = self._transport.handle_request(request)
+        except Exception:
+            llm_metrics.record(request, None, time.perf_counter() - start)
+            raise
+        if _needs_body(response):
+            response.read()
+        llm_metrics.record(request, response, time.perf_counter() - start)
+        return response
+
+    def close(self):
+        self._transport.close()
+
+
+class _AsyncMetricsTransport(httpx.AsyncBaseTransport):
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        start = time.perf_counter()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except Exception:
+            llm_metrics.record(request, None, time.perf_counter() - start)
+            raise
+        if _needs_body(response):
+            await response.aread()
+        llm_metrics.record(request, response, time.perf_counter() - start)
+        return response
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+TIMEOUT = httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT)
+LIMITS = httpx.Limits(max_connections=LLM_MAX_CONNECTIONS, max_keepalive_connections=LLM_MAX_CONNECTIONS)
+
+http_client = httpx.Client(transport=_MetricsTransport(httpx.HTTPTransport(limits=LIMITS)), timeout=TIMEOUT)
+async_http_client = httpx.AsyncClient(transport=_AsyncMetricsTransport(httpx.AsyncHTTPTransport(limits=LIMITS)), timeout=TIMEOUT)
+
+# The SDK clients read OPENAI_API_KEY when they are created, so they are built on first use
+# (after the callers have loaded their .env files)
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client() -> openai.OpenAI:
+    with _clients_lock:
+        if "sync" not in _clients:
+            _clients["sync"] = openai.OpenAI(http_client=http_client, timeout=TIMEOUT, max_retries=LLM_MAX_RETRIES)
+        return _clients["sync"]
+
+
+def get_async_client() -> openai.AsyncOpenAI:
+    with _clients_lock:
+        if "async" not in _clients:
+            _clients["async"] = openai.AsyncOpenAI(http_client=async_http_client, timeout=TIMEOUT, max_retries=LLM_MAX_RETRIES)
+        return _clients["async"]
+
+
+def build_messages(system_prompt: str = "", messages: list = None) -> list:
+    """A new message list: the system prompt (if any) followed by `messages`, which is not modified."""
+    return ([{"role": "system", "content": system_prompt}] if system_prompt else []) + list(messages or [])
+
+
+def chat_completion(messages: list, model: str = "gpt-3.5-turbo", **kwargs) -> ChatCompletion:
+    """
+    Chat completion through the shared client. `messages` is copied, never modified.
+    Extra kwargs go to `chat.completions.create` (e.g. `timeout=` to override LLM_TIMEOUT).
+    """
+    return get_client().chat.completions.create(model=model, messages=list(messages), **kwargs)
+
+
+async def achat_completion(messages: list, model: str = "gpt-3.5-turbo", **kwargs) -> ChatCompletion:
+    return await get_async_client().chat.completions.create(model=model, messages=list(messages), **kwargs)
+
+
+def llama_llm(**kwargs):
+    """A llama-index OpenAI LLM that uses the shared HTTP clients, timeouts and retry policy."""
+    from llama_index.llms.openai import OpenAI
+
+    return OpenAI(http_client=http_client, async_http_client=async_http_client,
+                  timeout=LLM_TIMEOUT, max_retries=LLM_MAX_RETRIES, **kwargs)
+
+
+def openai_embedding(**kwargs):
+    """A llama-index OpenAIEmbedding that uses the shared HTTP clients, timeouts and retry policy."""
+    from llama_index.embeddings.openai import OpenAIEmbedding
+
+    return OpenAIEmbedding(http_client=http_client, async_http_client=async_http_client,
+                           timeout=LLM_TIMEOUT, max_retries=LLM_MAX_RETRIES, **kwargs)
@@ -0,0 +1,114 @@
+import asyncio
+import time
+from collections import Counter, deque
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, List, Optional
+
+
+class MicroBatcher:
+    """
+    Collects items submitted by concurrent callers (e.g. sentences from several Discord
+    conversations) for up to `max_wait_ms` or until `max_batch_size` items are queued, then
+    runs `batch_fn` once on the whole batch in `executor` and hands each caller its result.
+
+    `batch_fn` takes a list of items and must return a list of results in the same order.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[Any]], List[Any]],
+        executor: Optional[Executor] = None,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        wait_history: int = 1000,
+    ):
+        """
+        Args:
+            batch_fn (Callable): Runs one batch; called from `executor`
+            executor (Optional[Executor]): Where batch_fn runs (None = default thread pool)
+            max_batch_size (int): Largest batch handed to batch_fn
+            max_wait_ms (float): How long the first queued item waits for others to join its batch
+            wait_history (int): How many recent per-request wait times are kept for stats()
+        """
+        self.batch_fn = batch_fn
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.batch_size_histogram = Counter()
+        self.wait_times_ms = deque(maxlen=wait_history)
+        self.requests = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def submit(self, item: Any) -> Any:
+        """Queue one item and wait for its result."""
+        self._ensure_worker()
+        future = self._loop.create_future()
+        self.requests += 1
+        await self._queue.put((item, future, time.perf_counter()))
+        return await future
+
+    async def submit_many(self, items: List[Any]) -> List[Any]:
+        """Queue several items (e.g. all sentences of one message) and wait for all of their results."""
+        return list(await asyncio.gather(*(self.submit(item) for item in items)))
+
+    async def _next_batch(self):
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait_ms / 1000
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        # Anything already queued rides along for free, up to the size limit
+        while len(batch) < self.max_batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            started = time.perf_counter()
+            self.batch_size_histogram[len(batch)] += 1
+            for _, _, enqueued in batch:
+                self.wait_times_ms.append((started - enqueued) * 1000)
+
+            items = [item for item, _, _ in batch]
+            try:
+                results = await self._loop.run_in_executor(self.executor, self.batch_fn, items)
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future, _), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, batch-size histogram and per-request wait times (ms) for monitoring."""
+        waits = sorted(self.wait_times_ms)
+
+        def percentile(p):
+            return waits[min(len(waits) - 1, int(p / 100 * len(waits)))] if waits else 0.0
+
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "requests": self.requests,
+            "batches": sum(self.batch_size_histogram.values()),
+            "batch_size_histogram": dict(sorted(self.batch_size_histogram.items())),
+            "wait_ms_p50": percentile(50),
+            "wait_ms_p95": percentile(95),
+            "wait_ms_max": waits[-1] if waits else 0.0,
+        }
@@ -0,0 +1,83 @@
+import os
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import tiktoken
+
+#############################################
+# Token budget for the variable parts of the answer prompt (query, classification results,
+# retrieved context, memories); the fixed instructions of each template come on top
+PROMPT_TOKEN_BUDGET = int(os.environ.get("PROMPT_TOKEN_BUDGET", "1500"))
+PROMPT_TOKENIZER_MODEL = os.environ.get("PROMPT_TOKENIZER_MODEL", "gpt-3.5-turbo")
+# An item that doesn't fit is cut to the remaining budget only if at least this many tokens are left
+MIN_TRUNCATED_TOKENS = 32
+#############################################
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model: str = PROMPT_TOKENIZER_MODEL):
+    return tiktoken.encoding_for_model(model)
+
+
+def count_tokens(text: str) -> int:
+    return len(get_encoding().encode(text))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    tokens = get_encoding().encode(text)
+    return text if len(tokens) <= max_tokens else get_encoding().decode(tokens[:max_tokens])
+
+
+@dataclass
+class PromptSection:
+    """
+    One variable part of a prompt, made of items (retrieved nodes, memories, ...).
+    `ranks` orders the items by importance (lower first, default: list order); kept items
+    are joined in their original order.
+    """
+    name: str
+    items: List[str]
+    separator: str = "\n\n"
+    ranks: Optional[List[float]] = field(default=None)
+
+
+def fit_sections(sections: List[PromptSection], budget: int) -> Tuple[Dict[str, str], Dict[str, dict]]:
+    """
+    Fills the sections in the given (priority) order until `budget` tokens are used. Within
+    a section the most important items are added first; the first item that doesn't fit is
+    truncated if enough budget is left, and the rest of the section is dropped.
+
+    Returns:
+        Tuple[Dict[str, str], Dict[str, dict]]: The text of each section, and a report of
+            the tokens, kept items, dropped items and truncation per section
+    """
+    remaining = budget
+    texts, report = {}, {}
+    for section in sections:
+        ranks = section.ranks if section.ranks is not None else list(range(len(section.items)))
+        order = sorted(range(len(section.items)), key=lambda i: ranks[i])
+        separator_tokens = count_tokens(section.separator)
+        kept = {}
+        truncated = False
+        for i in order:
+            separator_cost = separator_tokens if kept else 0
+            cost = count_tokens(section.items[i]) + separator_cost
+            if cost <= remaining:
+                kept[i] = section.items[i]
+                remaining -= cost
+                continue
+            available = remaining - separator_cost
+            if available >= MIN_TRUNCATED_TOKENS:
+                kept[i] = truncate_tokens(section.items[i], available)
+                remaining -= available + separator_cost
+                truncated = True
+            break
+        texts[section.name] = section.separator.join(kept[i] for i in sorted(kept))
+        report[section.name] = {
+            "tokens": count_tokens(texts[section.name]),
+            "items": len(kept),
+            "dropped": len(section.items) - len(kept),
+            "truncated": truncated,
+        }
+    return texts, report
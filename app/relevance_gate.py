@@ -0,0 +1,60 @@
+import os
+import threading
+from enum import Enum
+from typing import Callable, Optional
+
+#############################################
+# Local relevance classifier in front of the LLM check in get_response_with_relevance. Messages
+# scored at or below RELEVANCE_REJECT_BELOW are rejected with no network call; every other
+# message goes to the LLM, which also tells "known" from "unknown".
+USE_LOCAL_RELEVANCE_CLASSIFIER = os.environ.get("USE_LOCAL_RELEVANCE_CLASSIFIER", "true").lower() == "true"
+RELEVANCE_REJECT_BELOW = float(os.environ.get("RELEVANCE_REJECT_BELOW", "0.1"))
+#############################################
+
+
+class Relevance(Enum):
+    KNOWN = "known"
+    UNKNOWN = "unknown"
+    IRRELEVANT = "irrelevant"
+
+
+class LocalRelevanceGate:
+    """
+    Rejects clearly irrelevant messages with the local (binary) relevance classifier. The model
+    is loaded on first use. If loading or scoring fails, e.g. because there is no checkpoint in
+    a fresh checkout, the error is logged and the gate turns itself off, so every message goes
+    to the LLM check as it would without the gate.
+    """
+
+    def __init__(self, initialize: Callable[[], None], score: Callable[[str], float],
+                 reject_below: float = RELEVANCE_REJECT_BELOW, enabled: bool = USE_LOCAL_RELEVANCE_CLASSIFIER):
+        """
+        Args:
+            initialize (Callable[[], None]): Loads the classifier (called once)
+            score (Callable[[str], float]): Probability that a message is relevant
+            reject_below (float): Messages scored at or below this are IRRELEVANT
+            enabled (bool): Whether the classifier is used at all
+        """
+        self.initialize = initialize
+        self.score = score
+        self.reject_below = reject_below
+        self.enabled = enabled
+        self._ready = False
+        self._lock = threading.Lock()
+
+    def classify(self, text: str) -> Optional[Relevance]:
+        """IRRELEVANT if the model is confident the message is off-topic, otherwise None (the LLM decides)."""
+        if not self.enabled:
+            return None
+        try:
+            with self._lock:
+                if not self._ready:
+                    self.initialize()
+                    self._ready = True
+            probability = self.score(text)
+        except Exception as e:
+            print(f"Local relevance classifier unavailable, using the LLM check only: {e!r}")
+            self.enabled = False
+            return None
+        print(f"relevance probability: {probability:.3f}")
+        return Relevance.IRRELEVANT if probability <= self.reject_below else None
@@ -0,0 +1,59 @@
+from dataclasses import dataclass
+from typing import List, Optional
+
+from llama_index.core import Settings
+from llama_index.core.retrievers import BaseRetriever
+from llama_index.core.schema import NodeWithScore, QueryBundle
+from singleflight import SingleFlight, flight_key
+
+# Concurrent requests with the same query share one embedding call
+embedding_flight = SingleFlight("query_embedding")
+
+
+@dataclass
+class RequestContext:
+    """
+    Per-message state shared by every step that needs the vector index (relevance check,
+    club-info answers, ...). The query is embedded at most once and the index searched at
+    most once; later steps reuse `query_embedding` and `nodes`.
+    """
+    query: str
+    retriever: BaseRetriever
+    query_embedding: Optional[List[float]] = None
+    nodes: Optional[List[NodeWithScore]] = None
+
+    def _flight_key(self) -> str:
+        return flight_key(Settings.embed_model.model_name, self.query)
+
+    def get_query_embedding(self) -> List[float]:
+        if self.query_embedding is None:
+            self.query_embedding = embedding_flight.do(
+                self._flight_key(), lambda: Settings.embed_model.get_query_embedding(self.query)
+            )
+        return self.query_embedding
+
+    async def aget_query_embedding(self) -> List[float]:
+        if self.query_embedding is None:
+            self.query_embedding = await embedding_flight.ado(
+                self._flight_key(), lambda: Settings.embed_model.aget_query_embedding(self.query)
+            )
+        return self.query_embedding
+
+    def retrieve(self) -> List[NodeWithScore]:
+        if self.nodes is None:
+            # A QueryBundle that already has an embedding skips the retriever's own embedding call
+            self.nodes = self.retriever.retrieve(QueryBundle(self.query, embedding=self.get_query_embedding()))
+        return self.nodes
+
+    async def aretrieve(self) -> List[NodeWithScore]:
+        if self.nodes is None:
+            embedding = await self.aget_query_embedding()
+            self.nodes = await self.retriever.aretrieve(QueryBundle(self.query, embedding=embedding))
+        return self.nodes
+
+    def context_str(self) -> str:
+        """The retrieved node contents, joined the way the prompts expect."""
+        return "\n\n".join([n.node.get_content() for n in self.retrieve()])
+
+    async def acontext_str(self) -> str:
+        return "\n\n".join([n.node.get_content() for n in await self.aretrieve()])
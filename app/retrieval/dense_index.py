@@ -0,0 +1,127 @@
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def normalize_rows(vectors) -> np.ndarray:
+    """Float32 copy of a vector or matrix with every row scaled to unit length (zero rows stay zero)."""
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def row_norms(matrix: np.ndarray, chunk_rows: int = 65536) -> np.ndarray:
+    """Float32 L2 norm of every row, computed in chunks so a memory-mapped matrix isn't copied whole."""
+    if not len(matrix):
+        return np.zeros(0, dtype=np.float32)
+    return np.concatenate([
+        np.linalg.norm(np.asarray(matrix[start:start + chunk_rows], dtype=np.float32), axis=1)
+        for start in range(0, len(matrix), chunk_rows)
+    ])
+
+
+def top_k_rows(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Column indices of the k highest scores in each row of a 2-D score matrix, best first.
+    argpartition finds them in O(n) per row; only those k are sorted.
+    """
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        return np.empty((scores.shape[0], 0), dtype=np.int64)
+    if k < scores.shape[1]:
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+    order = np.argsort(-np.take_along_axis(scores, candidates, axis=1), axis=1)
+    return np.take_along_axis(candidates, order, axis=1)
+
+
+class DenseIndex:
+    """
+    Exact cosine-similarity search over a contiguous float32 matrix: one matrix product scores
+    every vector and argpartition picks the top k, so a query costs a single BLAS call however
+    many vectors there are.
+
+    By default the vectors are copied into a row-normalized matrix. With `copy=False` (e.g. for
+    a memory-mapped matrix) the matrix is used as is and the scores are scaled by precomputed
+    inverse row norms instead, so no second copy of the vectors is made. Passing the row norms
+    (e.g. persisted next to a memory-mapped matrix) avoids reading every row to compute them.
+    """
+
+    def __init__(self, matrix: np.ndarray, ids: Sequence[str], copy: bool = True, norms: Optional[np.ndarray] = None):
+        """
+        Args:
+            matrix (np.ndarray): [num_vectors, dim] embeddings
+            ids (Sequence[str]): Node id of each row
+            copy (bool): Normalize into a new matrix (True) or keep `matrix` and store its norms (False)
+            norms (Optional[np.ndarray]): [num_vectors] row norms of `matrix`, computed if not given
+        """
+        if len(ids) != len(matrix):
+            raise ValueError(f"{len(ids)} ids for {len(matrix)} vectors")
+        if norms is not None and len(norms) != len(matrix):
+            raise ValueError(f"{len(norms)} norms for {len(matrix)} vectors")
+        self.ids = list(ids)
+        if norms is None:
+            norms = row_norms(matrix)
+        norms = np.asarray(norms, dtype=np.float32)
+        inv_norms = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0).astype(np.float32)
+        if copy:
+            self.matrix = np.ascontiguousarray(matrix * inv_norms[:, None], dtype=np.float32)
+            self.inv_norms = None
+        else:
+            self.matrix = matrix
+            self.inv_norms = inv_norms
+
+    @classmethod
+    def from_vector_store(cls, vector_store) -> "DenseIndex":
+        """
+        Builds the index from a SimpleVectorStore (embedding_dict) or an MmapVectorStore (its
+        memory-mapped matrix is used without copying).
+        """
+        if hasattr(vector_store, "matrix"):
+            return cls(vector_store.matrix, vector_store.data.ids, copy=False)
+        embedding_dict = vector_store.data.embedding_dict
+        ids = list(embedding_dict)
+        matrix = np.asarray([embedding_dict[node_id] for node_id in ids], dtype=np.float32)
+        return cls(matrix if ids else np.zeros((0, 0), dtype=np.float32), ids)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def scores(self, queries: np.ndarray) -> np.ndarray:
+        """Cosine similarities [num_queries, num_vectors] for a [num_queries, dim] query matrix."""
+        queries = normalize_rows(queries)
+        if not len(self.ids):
+            return np.zeros((len(queries), 0), dtype=np.float32)
+        scores = queries @ self.matrix.T
+        if self.inv_norms is not None:
+            scores *= self.inv_norms
+        return scores
+
+    def row_vectors(self, rows) -> np.ndarray:
+        """Unit-length float32 vectors of the given rows (an index array or a slice)."""
+        vectors = np.asarray(self.matrix[rows], dtype=np.float32)
+        if self.inv_norms is not None:
+            vectors = vectors * self.inv_norms[rows, None]
+        return vectors
+
+    def search_batch(self, queries: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k search for several queries at once (one matrix-matrix product).
+
+        Args:
+            queries (np.ndarray): [num_queries, dim] query embeddings
+            top_k (int): Number of results per query
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Row indices into `ids` and their cosine similarities,
+            both [num_queries, min(top_k, len(self))], best first
+        """
+        scores = self.scores(queries)
+        rows = top_k_rows(scores, top_k)
+        return rows, np.take_along_axis(scores, rows, axis=1)
+
+    def search(self, query: Sequence[float], top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Row indices and cosine similarities of the top_k vectors for one query, best first."""
+        rows, scores = self.search_batch(np.asarray(query, dtype=np.float32)[None, :], top_k)
+        return rows[0], scores[0]
@@ -0,0 +1,157 @@
+import asyncio
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+from typing import Callable, List, Optional
+
+import numpy as np
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.bridge.pydantic import Field, PrivateAttr
+
+#############################################
+# SQLite file shared by every embedding path (kept outside ./storage so it doesn't count as re-indexing)
+EMBEDDING_CACHE_PATH = os.environ.get("EMBEDDING_CACHE_PATH", "cache/embeddings.sqlite")
+#############################################
+
+
+def normalize_text(text: str) -> str:
+    """Cache key text: whitespace collapsed. Case is kept, since it can change the embedding."""
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class EmbeddingCache:
+    """
+    Disk-backed embedding cache keyed by (model name, normalized text). Vectors are stored as
+    float32 blobs; the text is stored as its SHA-256 so long documents don't bloat the index.
+    """
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH):
+        """
+        Args:
+            path (str): SQLite file (created with its directory if missing)
+        """
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (model TEXT, text_hash TEXT, vector BLOB, PRIMARY KEY (model, text_hash))"
+        )
+        self._db.commit()
+
+    @staticmethod
+    def _key(text: str) -> str:
+        return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """Cached vectors for `texts` (None where missing)."""
+        keys = [self._key(text) for text in texts]
+        with self._lock:
+            found = {}
+            unique_keys = list(set(keys))
+            for start in range(0, len(unique_keys), 500):  # stay below SQLite's parameter limit
+                chunk = unique_keys[start:start + 500]
+                rows = self._db.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({','.join('?' * len(chunk))})",
+                    (model, *chunk),
+                )
+                found.update((key, np.frombuffer(blob, dtype=np.float32).tolist()) for key, blob in rows)
+            results = [found.get(key) for key in keys]
+            self.hits += sum(result is not None for result in results)
+            self.misses += sum(result is None for result in results)
+        return results
+
+    def put_many(self, model: str, texts: List[str], vectors: List[List[float]]):
+        rows = [(model, self._key(text), np.asarray(vector, dtype=np.float32).tobytes()) for text, vector in zip(texts, vectors)]
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)", rows)
+            self._db.commit()
+
+    def lookup(self, model: str, texts: List[str], compute: Callable[[List[str]], List[List[float]]]) -> List[List[float]]:
+        """Returns one vector per text; missing ones come from a single `compute(missing_texts)` call."""
+        results = self.get_many(model, texts)
+        missing = list(dict.fromkeys(text for text, result in zip(texts, results) if result is None))
+        if missing:
+            computed = dict(zip(missing, compute(missing)))
+            self.put_many(model, missing, list(computed.values()))
+            results = [computed[text] if result is None else result for text, result in zip(texts, results)]
+        return results
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / total if total else 0.0}
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """The process-wide cache at EMBEDDING_CACHE_PATH, shared by all CachedEmbedding instances."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = EmbeddingCache()
+        return _default_cache
+
+
+class CachedEmbedding(BaseEmbedding):
+    """
+    Wraps a llama-index embedding model with the EmbeddingCache, so it can be used wherever
+    a BaseEmbedding is expected (Settings.embed_model, RetrievalConfig, the ingestion transformer).
+
+    Query and text embeddings share cache entries, which holds for the OpenAI models used here
+    (they embed queries and documents the same way).
+    """
+
+    base_embedding: BaseEmbedding = Field(description="The embedding model whose results are cached.")
+    _cache: EmbeddingCache = PrivateAttr()
+
+    def __init__(self, base_embedding: BaseEmbedding, cache: Optional[EmbeddingCache] = None, **kwargs):
+        super().__init__(
+            base_embedding=base_embedding,
+            model_name=base_embedding.model_name,
+            embed_batch_size=base_embedding.embed_batch_size,
+            **kwargs,
+        )
+        self._cache = cache or get_embedding_cache()
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedEmbedding"
+
+    def _lookup(self, texts: List[str]) -> List[List[float]]:
+        return self._cache.lookup(self.model_name, texts, self.base_embedding.get_text_embedding_batch)
+
+    async def _alookup(self, texts: List[str]) -> List[List[float]]:
+        # SQLite reads and commits run in a worker thread so a slow disk doesn't stall the event loop
+        results = await asyncio.to_thread(self._cache.get_many, self.model_name, texts)
+        missing = list(dict.fromkeys(text for text, result in zip(texts, results) if result is None))
+        if missing:
+            computed = dict(zip(missing, await self.base_embedding.aget_text_embedding_batch(missing)))
+            await asyncio.to_thread(self._cache.put_many, self.model_name, missing, list(computed.values()))
+            results = [computed[text] if result is None else result for text, result in zip(texts, results)]
+        return results
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._lookup([query])[0]
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return (await self._alookup([query]))[0]
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._lookup([text])[0]
+
+    async def _aget_text_embedding(self, text: str) -> List[float]:
+        return (await self._alookup([text]))[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return self._lookup(texts)
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return await self._alookup(texts)
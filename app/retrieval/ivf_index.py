@@ -0,0 +1,166 @@
+import hashlib
+import json
+import os
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from retrieval.dense_index import DenseIndex, normalize_rows, top_k_rows
+
+#############################################
+# Approximate (IVF) index, built offline by app/chatbot_convrec/scripts/build_ann_index.py
+IVF_FNAME = "vector_store_ivf.npz"
+USE_ANN_INDEX = os.environ.get("USE_ANN_INDEX", "false").lower() == "true"
+ANN_NPROBE = int(os.environ.get("ANN_NPROBE", 8))    # lists scanned per query: higher = better recall, slower
+#############################################
+
+
+def ids_signature(ids: Sequence[str]) -> str:
+    """Fingerprint of the row ids, so an index built for a different store isn't used by mistake."""
+    return hashlib.sha256(json.dumps(list(ids)).encode("utf-8")).hexdigest()
+
+
+def default_nlist(num_vectors: int) -> int:
+    """About 4 * sqrt(n) lists, the usual starting point for IVF."""
+    return max(1, min(num_vectors, int(4 * np.sqrt(num_vectors))))
+
+
+def spherical_kmeans(vectors: np.ndarray, nlist: int, iterations: int = 20, seed: int = 0,
+                     chunk_size: int = 4096) -> np.ndarray:
+    """
+    Clusters unit vectors by cosine similarity.
+
+    Args:
+        vectors (np.ndarray): [num_vectors, dim] unit-length training vectors
+        nlist (int): Number of clusters
+        iterations (int): Lloyd iterations
+        seed (int): Seed for the initial centroids and for re-seeding empty clusters
+        chunk_size (int): Rows assigned per matrix product, to bound memory
+
+    Returns:
+        np.ndarray: [nlist, dim] unit-length centroids
+    """
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = assign_to_centroids(vectors, centroids, chunk_size)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        empty = np.bincount(assignments, minlength=nlist) == 0
+        sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()), replace=False)]
+        centroids = normalize_rows(sums)
+    return centroids
+
+
+def assign_to_centroids(vectors: np.ndarray, centroids: np.ndarray, chunk_size: int = 4096) -> np.ndarray:
+    """Index of the most similar centroid for each unit vector."""
+    return np.concatenate([
+        np.argmax(vectors[start:start + chunk_size] @ centroids.T, axis=1)
+        for start in range(0, len(vectors), chunk_size)
+    ]) if len(vectors) else np.zeros(0, dtype=np.int64)
+
+
+class IVFIndex:
+    """
+    Inverted-file approximate search: the vectors are clustered offline with k-means, and a query
+    only scores the vectors in its `nprobe` nearest clusters (exactly, through the DenseIndex).
+    Scanning nprobe / nlist of the store trades a little recall for latency; nprobe = nlist is exact.
+
+    Has the same search / search_batch interface as DenseIndex, except that a query can get fewer
+    than top_k results, so search_batch returns one array per query instead of a 2-D array.
+    """
+
+    def __init__(self, dense: DenseIndex, centroids: np.ndarray, list_offsets: np.ndarray,
+                 list_rows: np.ndarray, nprobe: int = ANN_NPROBE):
+        """
+        Args:
+            dense (DenseIndex): Exact index over the same vectors, used to score the candidates
+            centroids (np.ndarray): [nlist, dim] unit-length cluster centroids
+            list_offsets (np.ndarray): [nlist + 1] start of each cluster's rows in `list_rows`
+            list_rows (np.ndarray): Row indices of the vectors, grouped by cluster
+            nprobe (int): Clusters scanned per query
+        """
+        self.dense = dense
+        self.ids = dense.ids
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.list_rows = list_rows
+        self.nprobe = nprobe
+
+    @classmethod
+    def build(cls, dense: DenseIndex, nlist: Optional[int] = None, iterations: int = 20,
+              sample_size: Optional[int] = None, seed: int = 0) -> "IVFIndex":
+        """
+        Clusters the vectors of `dense` into `nlist` lists (default: default_nlist).
+        k-means is trained on a random sample of `sample_size` vectors (default: 256 per list).
+        """
+        nlist = min(nlist or default_nlist(len(dense)), len(dense))
+        rng = np.random.default_rng(seed)
+        sample_size = min(sample_size or 256 * nlist, len(dense))
+        sample = np.sort(rng.choice(len(dense), sample_size, replace=False))
+        centroids = spherical_kmeans(dense.row_vectors(sample), nlist, iterations, seed)
+
+        assignments = np.concatenate([
+            assign_to_centroids(dense.row_vectors(slice(start, start + 65536)), centroids)
+            for start in range(0, len(dense), 65536)
+        ])
+        list_rows = np.argsort(assignments, kind="stable")
+        list_offsets = np.concatenate([[0], np.cumsum(np.bincount(assignments, minlength=nlist))])
+        return cls(dense, centroids, list_offsets, list_rows)
+
+    @classmethod
+    def load(cls, persist_dir: str, dense: DenseIndex, nprobe: int = ANN_NPROBE) -> Optional["IVFIndex"]:
+        """The index persisted in `persist_dir`, or None if there is none or it was built for other vectors."""
+        path = os.path.join(persist_dir, IVF_FNAME)
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as f:
+            if str(f["ids_signature"]) != ids_signature(dense.ids):
+                print(f"{path} was built for a different vector store; using exact search (re-run build_ann_index.py)")
+                return None
+            return cls(dense, f["centroids"], f["list_offsets"], f["list_rows"], nprobe)
+
+    def save(self, persist_dir: str) -> None:
+        path = os.path.join(persist_dir, IVF_FNAME)
+        with open(path + ".tmp", "wb") as f:
+            np.savez(f, centroids=self.centroids, list_offsets=self.list_offsets, list_rows=self.list_rows,
+                     ids_signature=np.array(ids_signature(self.ids)))
+        os.replace(path + ".tmp", path)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    def search_batch(self, queries: np.ndarray, top_k: int,
+                     nprobe: Optional[int] = None) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+        """
+        Approximate top-k search for several queries.
+
+        Args:
+            queries (np.ndarray): [num_queries, dim] query embeddings
+            top_k (int): Number of results per query
+            nprobe (Optional[int]): Clusters scanned per query (default: self.nprobe)
+
+        Returns:
+            Tuple[List[np.ndarray], List[np.ndarray]]: Per query, the row indices into `ids` and their
+            cosine similarities, best first
+        """
+        queries = normalize_rows(queries)
+        probes = top_k_rows(queries @ self.centroids.T, nprobe or self.nprobe)
+        all_rows, all_scores = [], []
+        for query, probe in zip(queries, probes):
+            candidates = np.concatenate([self.list_rows[self.list_offsets[i]:self.list_offsets[i + 1]] for i in probe])
+            # Reading rows in file order keeps memory-mapped reads sequential
+            candidates.sort()
+            scores = self.dense.row_vectors(candidates) @ query
+            top = top_k_rows(scores[None, :], top_k)[0]
+            all_rows.append(candidates[top])
+            all_scores.append(scores[top])
+        return all_rows, all_scores
+
+    def search(self, query: Sequence[float], top_k: int, nprobe: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Row indices and cosine similarities of the approximate top_k vectors for one query, best first."""
+        rows, scores = self.search_batch(np.asarray(query, dtype=np.float32)[None, :], top_k, nprobe)
+        return rows[0], scores[0]
@@ -0,0 +1,246 @@
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.schema import BaseNode
+from llama_index.core.vector_stores.simple import SimpleVectorStore
+from llama_index.core.vector_stores.types import (BasePydanticVectorStore, VectorStoreQuery,
+                                                  VectorStoreQueryMode, VectorStoreQueryResult)
+from llama_index.core.vector_stores.utils import node_to_metadata_dict
+from retrieval.dense_index import DenseIndex, row_norms, top_k_rows
+from retrieval.ivf_index import USE_ANN_INDEX, IVFIndex
+from retrieval.quantized_index import USE_QUANTIZED_INDEX, QuantizedIndex
+
+#############################################
+# Binary vector store files, written next to the llama-index JSON files by
+# app/chatbot_convrec/scripts/convert_vector_store.py
+MATRIX_FNAME = "vector_store.npy"          # float32 [num_nodes, dim], memory-mapped on load
+SIDECAR_FNAME = "vector_store_ids.json"    # row ids, ref doc ids and metadata
+NORMS_FNAME = "vector_store_norms.npy"     # float32 [num_nodes] row norms, so loading doesn't scan the matrix
+JSON_FNAME = "vector_store.json"           # the SimpleVectorStore file it is converted from
+FORMAT_VERSION = 1
+#############################################
+
+
+@dataclass
+class MmapVectorStoreData:
+    """Mirrors SimpleVectorStore.data (minus the embeddings), so VectorStoreRetriever works with either store."""
+    ids: List[str] = field(default_factory=list)
+    text_id_to_ref_doc_id: Dict[str, str] = field(default_factory=dict)
+    metadata_dict: Dict[str, Any] = field(default_factory=dict)
+
+
+class MmapVectorStore(BasePydanticVectorStore):
+    """
+    Vector store backed by a float32 matrix file that is memory-mapped instead of parsed, plus a
+    small JSON sidecar with the row ids and metadata. Startup cost and resident memory don't grow
+    with the number of vectors; pages are read by the OS when a query scans them.
+
+    The row norms are stored next to the matrix, so building the exact index (and loading the
+    IVF / int8 indexes on top of it) doesn't read the matrix; only the rows a search scores are.
+
+    Like SimpleVectorStore it stores no text (the docstore does) and ranks by cosine similarity.
+    Nodes added after loading are kept in memory until `persist` rewrites the files.
+    """
+
+    stores_text: bool = False
+    _matrix: np.ndarray = PrivateAttr()
+    _norms: Optional[np.ndarray] = PrivateAttr(default=None)
+    _data: MmapVectorStoreData = PrivateAttr()
+    _index: Optional[DenseIndex] = PrivateAttr(default=None)
+    _ann_index: Optional[Union[IVFIndex, QuantizedIndex]] = PrivateAttr(default=None)
+
+    def __init__(self, matrix: Optional[np.ndarray] = None, data: Optional[MmapVectorStoreData] = None,
+                 norms: Optional[np.ndarray] = None, **kwargs):
+        super().__init__(**kwargs)
+        self._data = data or MmapVectorStoreData()
+        self._matrix = matrix if matrix is not None else np.zeros((0, 0), dtype=np.float32)
+        self._norms = norms
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "MmapVectorStore"
+
+    @classmethod
+    def from_persist_dir(cls, persist_dir: str) -> "MmapVectorStore":
+        with open(os.path.join(persist_dir, SIDECAR_FNAME)) as f:
+            sidecar = json.load(f)
+        if sidecar.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported vector store format: {sidecar.get('format_version')}")
+        matrix = np.load(os.path.join(persist_dir, MATRIX_FNAME), mmap_mode="r")
+        data = MmapVectorStoreData(sidecar["ids"], sidecar["text_id_to_ref_doc_id"], sidecar["metadata_dict"])
+        store = cls(matrix=matrix, data=data, norms=load_row_norms(persist_dir, len(matrix)))
+        if USE_ANN_INDEX:
+            store._ann_index = IVFIndex.load(persist_dir, store.exact_index)
+        if USE_QUANTIZED_INDEX and store._ann_index is None:
+            store._ann_index = QuantizedIndex.load(persist_dir, store.exact_index)
+        return store
+
+    @classmethod
+    def from_simple_vector_store(cls, store: SimpleVectorStore) -> "MmapVectorStore":
+        ids = list(store.data.embedding_dict)
+        matrix = np.asarray([store.data.embedding_dict[node_id] for node_id in ids], dtype=np.float32)
+        data = MmapVectorStoreData(
+            ids,
+            {node_id: store.data.text_id_to_ref_doc_id.get(node_id) for node_id in ids},
+            {node_id: (store.data.metadata_dict or {}).get(node_id) for node_id in ids},
+        )
+        return cls(matrix=matrix, data=data)
+
+    @property
+    def client(self) -> None:
+        return None
+
+    @property
+    def data(self) -> MmapVectorStoreData:
+        return self._data
+
+    @property
+    def matrix(self) -> np.ndarray:
+        return self._matrix
+
+    @property
+    def exact_index(self) -> DenseIndex:
+        """Dense top-k index over the mapped matrix (scores by its row norms, no copy); rebuilt after add/delete."""
+        if self._index is None:
+            if self._norms is None:
+                self._norms = row_norms(self._matrix)
+            self._index = DenseIndex(self._matrix, self._data.ids, copy=False, norms=self._norms)
+        return self._index
+
+    @property
+    def index(self):
+        """
+        The IVF (USE_ANN_INDEX) or else int8 (USE_QUANTIZED_INDEX) index if one was loaded and the store
+        is unchanged since, otherwise the exact index.
+        """
+        return self._ann_index if self._ann_index is not None else self.exact_index
+
+    def _invalidate_indexes(self):
+        if self._ann_index is not None:
+            print("Vector store changed; using exact search until the IVF/int8 index is rebuilt")
+        self._index = None
+        self._ann_index = None
+        self._norms = None
+
+    def get(self, text_id: str) -> List[float]:
+        return self._matrix[self._data.ids.index(text_id)].tolist()
+
+    def add(self, nodes: List[BaseNode], **add_kwargs: Any) -> List[str]:
+        if not nodes:
+            return []
+        new_rows = np.asarray([node.get_embedding() for node in nodes], dtype=np.float32)
+        # Copies the mapped matrix into memory; persist() writes it back out
+        self._matrix = new_rows if not len(self._data.ids) else np.vstack([self._matrix, new_rows])
+        self._invalidate_indexes()
+        for node in nodes:
+            self._data.ids.append(node.node_id)
+            self._data.text_id_to_ref_doc_id[node.node_id] = node.ref_doc_id or "None"
+            self._data.metadata_dict[node.node_id] = node_to_metadata_dict(node, remove_text=True, flat_metadata=False)
+        return [node.node_id for node in nodes]
+
+    def delete(self, ref_doc_id: str, **delete_kwargs: Any) -> None:
+        keep = [i for i, node_id in enumerate(self._data.ids) if self._data.text_id_to_ref_doc_id.get(node_id) != ref_doc_id]
+        if len(keep) == len(self._data.ids):
+            return
+        kept = set(keep)
+        removed = [node_id for i, node_id in enumerate(self._data.ids) if i not in kept]
+        self._matrix = np.asarray(self._matrix[keep])
+        self._invalidate_indexes()
+        self._data.ids = [self._data.ids[i] for i in keep]
+        for node_id in removed:
+            self._data.text_id_to_ref_doc_id.pop(node_id, None)
+            self._data.metadata_dict.pop(node_id, None)
+
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        if query.mode != VectorStoreQueryMode.DEFAULT:
+            raise ValueError(f"MmapVectorStore only supports the default (dense) query mode, not {query.mode}")
+        if query.filters is not None:
+            raise ValueError("MmapVectorStore does not support metadata filters")
+
+        if query.query_embedding is None or not len(self._data.ids):
+            return VectorStoreQueryResult(nodes=None, similarities=[], ids=[])
+
+        if query.node_ids is None and query.doc_ids is None:
+            rows, similarities = self.index.search(query.query_embedding, query.similarity_top_k)
+        else:
+            node_ids = set(query.node_ids or self._data.ids)
+            doc_ids = set(query.doc_ids) if query.doc_ids is not None else None
+            candidates = np.array([
+                i for i, node_id in enumerate(self._data.ids)
+                if node_id in node_ids and (doc_ids is None or self._data.text_id_to_ref_doc_id.get(node_id) in doc_ids)
+            ], dtype=np.int64)
+            scores = self.exact_index.scores(query.query_embedding)[:, candidates]
+            top = top_k_rows(scores, query.similarity_top_k)[0]
+            rows, similarities = candidates[top], scores[0, top]
+        return VectorStoreQueryResult(
+            nodes=None,
+            similarities=np.asarray(similarities).tolist(),
+            ids=[self._data.ids[i] for i in rows],
+        )
+
+    def persist(self, persist_path: str, fs=None) -> None:
+        """
+        Writes the matrix and sidecar into the directory of `persist_path` (llama-index passes the
+        path of the JSON file it would write, e.g. storage/default__vector_store.json).
+        """
+        persist_dir = os.path.dirname(persist_path) or "."
+        os.makedirs(persist_dir, exist_ok=True)
+        # Write to temporary files first so a reader never sees a half-written store
+        matrix_tmp = os.path.join(persist_dir, MATRIX_FNAME + ".tmp")
+        with open(matrix_tmp, "wb") as f:
+            np.save(f, np.ascontiguousarray(self._matrix, dtype=np.float32))
+        norms_tmp = os.path.join(persist_dir, NORMS_FNAME + ".tmp")
+        with open(norms_tmp, "wb") as f:
+            np.save(f, self._norms if self._norms is not None else row_norms(self._matrix))
+        sidecar_tmp = os.path.join(persist_dir, SIDECAR_FNAME + ".tmp")
+        with open(sidecar_tmp, "w") as f:
+            json.dump({
+                "format_version": FORMAT_VERSION,
+                "dim": int(self._matrix.shape[1]) if self._matrix.ndim == 2 else 0,
+                "ids": self._data.ids,
+                "text_id_to_ref_doc_id": self._data.text_id_to_ref_doc_id,
+                "metadata_dict": self._data.metadata_dict,
+            }, f)
+        os.replace(matrix_tmp, os.path.join(persist_dir, MATRIX_FNAME))
+        os.replace(norms_tmp, os.path.join(persist_dir, NORMS_FNAME))
+        os.replace(sidecar_tmp, os.path.join(persist_dir, SIDECAR_FNAME))
+
+
+def load_row_norms(persist_dir: str, num_rows: int) -> Optional[np.ndarray]:
+    """The persisted row norms, or None if the store was converted without them (they are then computed)."""
+    path = os.path.join(persist_dir, NORMS_FNAME)
+    if not os.path.exists(path):
+        print(f"No {NORMS_FNAME} in {persist_dir}; row norms are computed from the whole matrix (re-run convert_vector_store.py)")
+        return None
+    norms = np.load(path)
+    if len(norms) != num_rows:
+        print(f"{path} does not match {MATRIX_FNAME}; computing the row norms (re-run convert_vector_store.py)")
+        return None
+    return norms
+
+
+def has_binary_vector_store(persist_dir: str) -> bool:
+    """True if the converted files exist and are not older than the JSON store next to them."""
+    matrix_path = os.path.join(persist_dir, MATRIX_FNAME)
+    sidecar_path = os.path.join(persist_dir, SIDECAR_FNAME)
+    if not (os.path.exists(matrix_path) and os.path.exists(sidecar_path)):
+        return False
+    json_path = os.path.join(persist_dir, JSON_FNAME)
+    if os.path.exists(json_path) and os.path.getmtime(json_path) > os.path.getmtime(matrix_path):
+        print(f"{json_path} is newer than {matrix_path}; using the JSON store (re-run convert_vector_store.py)")
+        return False
+    return True
+
+
+def load_vector_store(persist_dir: str):
+    """
+    The vector store of a llama-index storage directory: the memory-mapped binary store if it
+    has been converted, otherwise the original SimpleVectorStore JSON.
+    """
+    if has_binary_vector_store(persist_dir):
+        return MmapVectorStore.from_persist_dir(persist_dir)
+    return SimpleVectorStore.from_persist_path(os.path.join(persist_dir, JSON_FNAME))
@@ -0,0 +1,122 @@
+import json
+import os
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from retrieval.dense_index import DenseIndex, normalize_rows, top_k_rows
+from retrieval.ivf_index import ids_signature
+
+#############################################
+# int8 first-stage index, built offline by app/chatbot_convrec/scripts/build_quantized_index.py
+CODES_FNAME = "vector_store_int8.npy"           # int8 [num_nodes, dim], memory-mapped on load
+QUANTIZED_META_FNAME = "vector_store_int8.json"  # per-dimension scales and the ids fingerprint
+USE_QUANTIZED_INDEX = os.environ.get("USE_QUANTIZED_INDEX", "false").lower() == "true"
+RERANK_CANDIDATES = int(os.environ.get("RERANK_CANDIDATES", 50))   # re-scored exactly per query (at least top_k)
+SCAN_CHUNK_ROWS = 16384
+#############################################
+
+
+class QuantizedIndex:
+    """
+    Two-stage search: every vector is scored from int8 codes (a quarter of the float32 size), then
+    the best RERANK_CANDIDATES are re-scored exactly from the float matrix. With the row norms
+    persisted next to a memory-mapped matrix (MmapVectorStore), only those rows of the float file
+    are read, so several bot processes can share a host while each keeps little more than the
+    (also memory-mapped, so shared) codes resident.
+
+    Codes are symmetric per-dimension quantizations of the unit-length vectors:
+    vector[d] ~= codes[d] * scales[d].
+    Same search / search_batch interface as DenseIndex.
+    """
+
+    def __init__(self, dense: DenseIndex, codes: np.ndarray, scales: np.ndarray, rerank: int = RERANK_CANDIDATES):
+        """
+        Args:
+            dense (DenseIndex): Exact index over the same vectors, used for re-ranking
+            codes (np.ndarray): [num_vectors, dim] int8 codes
+            scales (np.ndarray): [dim] float32 dequantization scales
+            rerank (int): Candidates re-scored exactly per query
+        """
+        self.dense = dense
+        self.ids = dense.ids
+        self.codes = codes
+        self.scales = scales
+        self.rerank = rerank
+
+    @classmethod
+    def build(cls, dense: DenseIndex, persist_dir: str) -> "QuantizedIndex":
+        """Quantizes the vectors of `dense` into persist_dir (written in chunks, so the store needn't fit in memory)."""
+        chunks = [slice(start, start + SCAN_CHUNK_ROWS) for start in range(0, len(dense), SCAN_CHUNK_ROWS)]
+        max_abs = np.zeros(dense.matrix.shape[1], dtype=np.float32)
+        for chunk in chunks:
+            np.maximum(max_abs, np.abs(dense.row_vectors(chunk)).max(axis=0), out=max_abs)
+        scales = np.where(max_abs > 0, max_abs / 127, 1).astype(np.float32)
+
+        codes_path = os.path.join(persist_dir, CODES_FNAME)
+        codes = np.lib.format.open_memmap(codes_path + ".tmp", mode="w+", dtype=np.int8, shape=dense.matrix.shape)
+        for chunk in chunks:
+            codes[chunk] = np.clip(np.rint(dense.row_vectors(chunk) / scales), -127, 127)
+        codes.flush()
+        del codes
+
+        meta_path = os.path.join(persist_dir, QUANTIZED_META_FNAME)
+        with open(meta_path + ".tmp", "w") as f:
+            json.dump({"ids_signature": ids_signature(dense.ids), "scales": scales.tolist()}, f)
+        os.replace(codes_path + ".tmp", codes_path)
+        os.replace(meta_path + ".tmp", meta_path)
+        return cls.load(persist_dir, dense)
+
+    @classmethod
+    def load(cls, persist_dir: str, dense: DenseIndex, rerank: int = RERANK_CANDIDATES) -> Optional["QuantizedIndex"]:
+        """The index persisted in `persist_dir`, or None if there is none or it was built for other vectors."""
+        meta_path = os.path.join(persist_dir, QUANTIZED_META_FNAME)
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta["ids_signature"] != ids_signature(dense.ids):
+            print(f"{meta_path} was built for a different vector store; using exact search (re-run build_quantized_index.py)")
+            return None
+        codes = np.load(os.path.join(persist_dir, CODES_FNAME), mmap_mode="r")
+        return cls(dense, codes, np.asarray(meta["scales"], dtype=np.float32), rerank)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def approximate_scores(self, queries: np.ndarray) -> np.ndarray:
+        """First-stage cosine similarities [num_queries, num_vectors] from the int8 codes."""
+        # Folding the scales into the queries leaves one product per chunk of codes
+        scaled = normalize_rows(queries) * self.scales
+        return np.concatenate([
+            scaled @ np.asarray(self.codes[start:start + SCAN_CHUNK_ROWS], dtype=np.float32).T
+            for start in range(0, len(self.codes), SCAN_CHUNK_ROWS)
+        ], axis=1) if len(self.codes) else np.zeros((len(scaled), 0), dtype=np.float32)
+
+    def search_batch(self, queries: np.ndarray, top_k: int) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+        """
+        Top-k search for several queries: int8 scan, then exact re-ranking of the best candidates.
+
+        Args:
+            queries (np.ndarray): [num_queries, dim] query embeddings
+            top_k (int): Number of results per query
+
+        Returns:
+            Tuple[List[np.ndarray], List[np.ndarray]]: Per query, the row indices into `ids` and their
+            exact cosine similarities, best first
+        """
+        queries = normalize_rows(queries)
+        candidates = top_k_rows(self.approximate_scores(queries), max(self.rerank, top_k))
+        all_rows, all_scores = [], []
+        for query, rows in zip(queries, candidates):
+            # Reading rows in file order keeps memory-mapped reads sequential
+            rows = np.sort(rows)
+            scores = self.dense.row_vectors(rows) @ query
+            top = top_k_rows(scores[None, :], top_k)[0]
+            all_rows.append(rows[top])
+            all_scores.append(scores[top])
+        return all_rows, all_scores
+
+    def search(self, query: Sequence[float], top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Row indices and exact cosine similarities of the top_k vectors for one query, best first."""
+        rows, scores = self.search_batch(np.asarray(query, dtype=np.float32)[None, :], top_k)
+        return rows[0], scores[0]
@@ -1,10 +1,12 @@
 from typing import List, Dict, Any, Optional
 from dataclasses import dataclass, field
-from llama_index.embeddings.openai import OpenAIEmbedding
 from llama_index.core.base.embeddings.base import BaseEmbedding
 from llama_index.core.schema import NodeWithScore, TextNode
-from llama_index.core.vector_stores.types import VectorStore, VectorStoreQuery
+from llama_index.core.vector_stores.types import VectorStore
 from retrieval.query_transformers import QueryTransformer
+from retrieval.dense_index import DenseIndex
+from retrieval.embedding_cache import CachedEmbedding
+from llm_client import openai_embedding
 
 
 @dataclass
@@ -12,7 +14,7 @@ class RetrievalConfig:
     """Configuration for the retriever."""
     top_k: int = 5
     score_threshold: Optional[float] = 0.7
-    embedding_model: BaseEmbedding = field(default_factory=lambda: OpenAIEmbedding(model="text-embedding-ada-002"))
+    embedding_model: BaseEmbedding = field(default_factory=lambda: CachedEmbedding(openai_embedding(model="text-embedding-ada-002")))
 
     def __post_init__(self):
         self.score_threshold = self.score_threshold or 0
@@ -34,6 +36,28 @@ class VectorStoreRetriever:
         """
         self.config = config or RetrievalConfig()
         self.vector_store = vector_store
+        self._index: Optional[DenseIndex] = None
+
+    def _get_index(self) -> DenseIndex:
+        """The dense index over the vector store, so a query is one matrix-vector product. Rebuilt if the store changes size."""
+        data = self.vector_store.data
+        ids = getattr(data, "ids", None)
+        size = len(ids) if ids is not None else len(data.embedding_dict)
+        if self._index is None or len(self._index) != size:
+            # The memory-mapped store keeps its own index over the mapped matrix
+            store_index = getattr(self.vector_store, "index", None)
+            self._index = store_index if store_index is not None else DenseIndex.from_vector_store(self.vector_store)
+        return self._index
+
+    def _links_above_threshold(self, index: DenseIndex, rows, scores) -> List[str]:
+        """The formatted Link of each result scoring at least score_threshold (results without a Link are skipped)."""
+        metadata_dict = self.vector_store.data.metadata_dict or {}
+        links = []
+        for row, score in zip(rows, scores):
+            link = (metadata_dict.get(index.ids[row]) or {}).get("Link")
+            if score >= self.config.score_threshold and link is not None:
+                links.append(f"<{link}>")
+        return links
 
     def retrieve(self, query: str) -> List[NodeWithScore]:
         """
@@ -47,19 +71,26 @@ class VectorStoreRetriever:
         """ 
 
         query_embedding = self.config.embedding_model.get_text_embedding(query)
-        vec_store_query = VectorStoreQuery(
-            query_embedding=query_embedding,
-            similarity_top_k=self.config.top_k,
-        )
-        query_result = self.vector_store.query(
-            vec_store_query
-        )
-        nodes = [self.vector_store.data.metadata_dict[node_id]["Link"] for node_id in query_result.ids]
+        index = self._get_index()
+        rows, scores = index.search(query_embedding, self.config.top_k)
+        return self._links_above_threshold(index, rows, scores)
 
-        # nodes = query_result.nodes
-        nodes = [f"<{node}>" for node, score in zip(nodes, query_result.similarities) if score >= self.config.score_threshold]
+    def retrieve_batch(self, queries: List[str]) -> List[List[str]]:
+        """
+        Retrieve the most relevant documents for several queries with one embedding call and one search.
 
-        return nodes
+        Args:
+            queries (List[str]): The search queries
+
+        Returns:
+            List[List[str]]: The retrieved links for each query, as `retrieve` returns them
+        """
+        if not queries:
+            return []
+        query_embeddings = self.config.embedding_model.get_text_embedding_batch(queries)
+        index = self._get_index()
+        rows, scores = index.search_batch(query_embeddings, self.config.top_k)
+        return [self._links_above_threshold(index, query_rows, query_scores) for query_rows, query_scores in zip(rows, scores)]
 
     def get_metadata_from_nodes(self, nodes: List[NodeWithScore]) -> List[Dict[str, Any]]:
         """
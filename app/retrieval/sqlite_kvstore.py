@@ -0,0 +1,160 @@
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from llama_index.core.storage.docstore import BaseDocumentStore, SimpleDocumentStore
+from llama_index.core.storage.docstore.keyval_docstore import KVDocumentStore
+from llama_index.core.storage.index_store import SimpleIndexStore
+from llama_index.core.storage.index_store.keyval_index_store import KVIndexStore
+from llama_index.core.storage.index_store.types import BaseIndexStore
+from llama_index.core.storage.kvstore.types import DEFAULT_BATCH_SIZE, DEFAULT_COLLECTION, BaseKVStore
+
+#############################################
+# Docstore and index store in one SQLite file next to the llama-index JSON files, written by
+# app/chatbot_convrec/scripts/migrate_docstore.py
+KV_DB_FNAME = "docstore.sqlite"
+DOCSTORE_JSON_FNAME = "docstore.json"
+INDEX_STORE_JSON_FNAME = "index_store.json"
+KV_CACHE_SIZE = int(os.environ.get("KV_CACHE_SIZE", 256))   # values kept in memory per process
+#############################################
+
+
+class SqliteKVStore(BaseKVStore):
+    """
+    llama-index key-value store in a single SQLite table, indexed by (collection, key). Values are
+    read on demand, so a KVDocumentStore on top of it only loads the nodes a query returns instead
+    of deserializing the whole docstore at startup. The `cache_size` most recently read values are
+    kept in an LRU (per process; writes from other processes aren't seen until evicted). The LRU
+    holds the stored JSON and every `get` decodes its own copy, so callers may mutate the result.
+    """
+
+    def __init__(self, path: str, cache_size: int = KV_CACHE_SIZE):
+        """
+        Args:
+            path (str): SQLite file (created if missing)
+            cache_size (int): Values kept in the LRU
+        """
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._cache: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS kv (collection TEXT, key TEXT, value TEXT, PRIMARY KEY (collection, key))"
+        )
+        self._db.commit()
+
+    def put(self, key: str, val: dict, collection: str = DEFAULT_COLLECTION) -> None:
+        self.put_all([(key, val)], collection)
+
+    async def aput(self, key: str, val: dict, collection: str = DEFAULT_COLLECTION) -> None:
+        self.put(key, val, collection)
+
+    def put_all(self, kv_pairs: List[Tuple[str, dict]], collection: str = DEFAULT_COLLECTION,
+                batch_size: int = DEFAULT_BATCH_SIZE) -> None:
+        """Writes all pairs in one transaction (batch_size is accepted for the interface and ignored)."""
+        rows = [(collection, key, json.dumps(val)) for key, val in kv_pairs]
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO kv VALUES (?, ?, ?)", rows)
+            self._db.commit()
+            for key, _ in kv_pairs:
+                self._cache.pop((collection, key), None)
+
+    async def aput_all(self, kv_pairs: List[Tuple[str, dict]], collection: str = DEFAULT_COLLECTION,
+                       batch_size: int = DEFAULT_BATCH_SIZE) -> None:
+        self.put_all(kv_pairs, collection, batch_size)
+
+    def get(self, key: str, collection: str = DEFAULT_COLLECTION) -> Optional[dict]:
+        with self._lock:
+            value = self._cache.get((collection, key))
+            if value is not None:
+                self._cache.move_to_end((collection, key))
+                self.hits += 1
+            else:
+                self.misses += 1
+                row = self._db.execute("SELECT value FROM kv WHERE collection = ? AND key = ?", (collection, key)).fetchone()
+                if row is None:
+                    return None
+                value = row[0]
+                self._cache[(collection, key)] = value
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return json.loads(value)
+
+    async def aget(self, key: str, collection: str = DEFAULT_COLLECTION) -> Optional[dict]:
+        return self.get(key, collection)
+
+    def get_all(self, collection: str = DEFAULT_COLLECTION) -> Dict[str, dict]:
+        """Every value of a collection (a full scan; not cached)."""
+        with self._lock:
+            rows = self._db.execute("SELECT key, value FROM kv WHERE collection = ?", (collection,)).fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    async def aget_all(self, collection: str = DEFAULT_COLLECTION) -> Dict[str, dict]:
+        return self.get_all(collection)
+
+    def delete(self, key: str, collection: str = DEFAULT_COLLECTION) -> bool:
+        with self._lock:
+            deleted = self._db.execute("DELETE FROM kv WHERE collection = ? AND key = ?", (collection, key)).rowcount
+            self._db.commit()
+            self._cache.pop((collection, key), None)
+        return deleted > 0
+
+    async def adelete(self, key: str, collection: str = DEFAULT_COLLECTION) -> bool:
+        return self.delete(key, collection)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {"cached": len(self._cache), "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0}
+
+
+def migrate_json_stores(persist_dir: str) -> Dict[str, int]:
+    """
+    Copies every collection of docstore.json and index_store.json into a new docstore.sqlite
+    (replacing any previous one once it is complete). Returns the number of entries per collection.
+    """
+    db_path = os.path.join(persist_dir, KV_DB_FNAME)
+    tmp_path = db_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    kvstore = SqliteKVStore(tmp_path)
+    counts = {}
+    for fname in (DOCSTORE_JSON_FNAME, INDEX_STORE_JSON_FNAME):
+        with open(os.path.join(persist_dir, fname)) as f:
+            # {collection: {key: value}}, as written by llama-index's SimpleKVStore
+            for collection, values in json.load(f).items():
+                kvstore.put_all(list(values.items()), collection)
+                counts[collection] = len(values)
+    kvstore._db.execute("VACUUM")
+    kvstore._db.close()
+    os.replace(tmp_path, db_path)
+    return counts
+
+
+def has_sqlite_kvstore(persist_dir: str) -> bool:
+    """True if docstore.sqlite exists and is not older than the JSON stores next to it."""
+    db_path = os.path.join(persist_dir, KV_DB_FNAME)
+    if not os.path.exists(db_path):
+        return False
+    for fname in (DOCSTORE_JSON_FNAME, INDEX_STORE_JSON_FNAME):
+        json_path = os.path.join(persist_dir, fname)
+        if os.path.exists(json_path) and os.path.getmtime(json_path) > os.path.getmtime(db_path):
+            print(f"{json_path} is newer than {db_path}; using the JSON stores (re-run migrate_docstore.py)")
+            return False
+    return True
+
+
+def load_docstore_and_index_store(persist_dir: str) -> Tuple[BaseDocumentStore, BaseIndexStore]:
+    """
+    The docstore and index store of a llama-index storage directory: backed by docstore.sqlite if
+    it has been migrated, otherwise the original JSON files.
+    """
+    if has_sqlite_kvstore(persist_dir):
+        kvstore = SqliteKVStore(os.path.join(persist_dir, KV_DB_FNAME))
+        return KVDocumentStore(kvstore), KVIndexStore(kvstore)
+    return SimpleDocumentStore.from_persist_dir(persist_dir), SimpleIndexStore.from_persist_dir(persist_dir)
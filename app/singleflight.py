@@ -0,0 +1,88 @@
+import asyncio
+import hashlib
+import json
+import threading
+from typing import Any, Awaitable, Callable, Dict
+
+
+def flight_key(*parts: Any) -> str:
+    """Stable key for a call, e.g. flight_key(model, messages, kwargs)."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent calls: while a call for a key is in flight, other callers
+    with the same key wait for it and get its result (or exception) instead of repeating it.
+    Nothing is kept once the call finishes, so this is not a cache.
+
+    `do` is for threads, `ado` for coroutines; the two don't share in-flight calls.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.shared = 0
+        self._calls: Dict[str, _Call] = {}
+        self._tasks: Dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.calls += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def ado(self, key: str, coro_fn: Callable[[], Awaitable[Any]]) -> Any:
+        with self._lock:
+            task = self._tasks.get(key)
+            if task is None:
+                task = self._tasks[key] = asyncio.ensure_future(coro_fn())
+                task.add_done_callback(lambda done: self._forget(key, done))
+                self.calls += 1
+            else:
+                self.shared += 1
+        # A caller that gets cancelled doesn't cancel the call for the others
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Future):
+        with self._lock:
+            if self._tasks.get(key) is task:
+                del self._tasks[key]
+
+    def stats(self) -> dict:
+        total = self.calls + self.shared
+        return {
+            "name": self.name,
+            "calls": self.calls,
+            "shared": self.shared,
+            "shared_rate": self.shared / total if total else 0.0,
+        }
@@ -0,0 +1,85 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+
+@dataclass
+class Stage:
+    """A single step of the chat pipeline."""
+    name: str
+    # Called with a dict of {dependency name: result} once every dependency has finished.
+    run: Callable[[Dict[str, Any]], Awaitable[Any]]
+    depends_on: Tuple[str, ...] = field(default_factory=tuple)
+
+
+class StageGraph:
+    """
+    Runs a small DAG of async stages. Every stage starts as soon as all of its
+    dependencies have finished, so independent stages (e.g. memory lookup and
+    classification) overlap instead of running one after another.
+    """
+
+    def __init__(self, stages: List[Stage]):
+        """
+        Args:
+            stages (List[Stage]): The stages to run. Names must be unique and every
+                dependency must refer to another stage in the list.
+        """
+        self.stages: Dict[str, Stage] = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"Duplicate stage name: {stage.name}")
+            self.stages[stage.name] = stage
+        for stage in stages:
+            for dep in stage.depends_on:
+                if dep not in self.stages:
+                    raise ValueError(f"Stage {stage.name} depends on unknown stage {dep}")
+        self._order = self._topological_order()
+
+    def _topological_order(self) -> List[str]:
+        order = []
+        state = {}  # name -> "visiting" | "done"
+
+        def visit(name):
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "visiting":
+                raise ValueError(f"Cycle detected at stage {name}")
+            state[name] = "visiting"
+            for dep in self.stages[name].depends_on:
+                visit(dep)
+            state[name] = "done"
+            order.append(name)
+
+        for name in self.stages:
+            visit(name)
+        return order
+
+    async def run(self) -> Dict[str, Any]:
+        """
+        Run every stage and wait for all of them to finish.
+
+        Returns:
+            Dict[str, Any]: The result of each stage keyed by stage name.
+
+        If a stage raises, the remaining stages are cancelled and the exception is re-raised.
+        """
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def run_stage(stage: Stage):
+            dep_results = {}
+            for dep in stage.depends_on:
+                dep_results[dep] = await tasks[dep]
+            return await stage.run(dep_results)
+
+        # Dependencies are created first, so every task a stage awaits already exists.
+        for name in self._order:
+            tasks[name] = asyncio.ensure_future(run_stage(self.stages[name]))
+
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            raise
+        return {name: task.result() for name, task in tasks.items()}
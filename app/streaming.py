@@ -0,0 +1,93 @@
+import os
+import time
+from typing import Any, AsyncIterator
+
+from llama_index.core.llms import CompletionResponse, CompletionResponseGen, CustomLLM, LLMMetadata
+from llama_index.core.llms.callbacks import llm_completion_callback
+
+#############################################
+# Minimum seconds between edits of a streamed Discord message (Discord allows ~5 edits / 5 s)
+STREAM_EDIT_INTERVAL = float(os.environ.get("STREAM_EDIT_INTERVAL", "1.0"))
+STREAM_PLACEHOLDER = "..."
+STREAM_ERROR_MESSAGE = "Sorry, something went wrong while answering. Please try again."
+DISCORD_MESSAGE_LIMIT = 2000
+#############################################
+
+
+async def astream_completion(llm, prompt: str) -> AsyncIterator[str]:
+    """Yields the text deltas of a llama-index LLM streaming completion."""
+    async for response in await llm.astream_complete(prompt):
+        if response.delta:
+            yield response.delta
+
+
+async def stream_to_message(channel, chunks: AsyncIterator[str], edit_interval: float = STREAM_EDIT_INTERVAL,
+                            placeholder: str = STREAM_PLACEHOLDER) -> str:
+    """
+    Posts a placeholder message in `channel` and edits it as chunks arrive. The first chunk is
+    shown right away, later ones at most every `edit_interval` seconds, and a final edit
+    shows the full text. Returns the full text.
+
+    If `chunks` raises, the message is edited to show STREAM_ERROR_MESSAGE (after any partial
+    answer) and the exception is re-raised.
+
+    Args:
+        channel: Anything with `async send(content)` returning a message with `async edit(content=...)`
+        chunks (AsyncIterator[str]): Answer text chunks, e.g. from aiResponse_stream
+        edit_interval (float): Minimum seconds between edits
+        placeholder (str): Content shown until the first chunk arrives
+    """
+    message = await channel.send(placeholder)
+    text = ""
+    shown = placeholder
+    last_edit = None
+    try:
+        async for chunk in chunks:
+            text += chunk
+            now = time.monotonic()
+            if text.strip() and (last_edit is None or now - last_edit >= edit_interval):
+                shown = text[:DISCORD_MESSAGE_LIMIT]
+                await message.edit(content=shown)
+                last_edit = now
+    except Exception as e:
+        # Don't leave the placeholder or a cut-off answer looking like the whole reply
+        print(f"Error while streaming a response: {e}")
+        error_text = f"{text}\n\n{STREAM_ERROR_MESSAGE}" if text.strip() else STREAM_ERROR_MESSAGE
+        if len(error_text) > DISCORD_MESSAGE_LIMIT:
+            error_text = f"{text[:DISCORD_MESSAGE_LIMIT - len(STREAM_ERROR_MESSAGE) - 2]}\n\n{STREAM_ERROR_MESSAGE}"
+        await message.edit(content=error_text)
+        raise
+
+    final = text[:DISCORD_MESSAGE_LIMIT] if text.strip() else placeholder
+    if final != shown:
+        await message.edit(content=final)
+    return text
+
+
+class FakeStreamingLLM(CustomLLM):
+    """
+    Local stand-in for the OpenAI LLM that streams a fixed answer word by word with a delay,
+    for exercising the streaming path without network access (see tests/test_streaming.py).
+    """
+    answer: str = "UTMIST runs workshops, conferences and academic programs about machine learning."
+    token_delay: float = 0.1
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return LLMMetadata(model_name="fake-streaming-llm")
+
+    @llm_completion_callback()
+    def complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        return CompletionResponse(text=self.answer)
+
+    @llm_completion_callback()
+    def stream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponseGen:
+        def gen() -> CompletionResponseGen:
+            text = ""
+            for word in self.answer.split(" "):
+                delta = word if not text else " " + word
+                text += delta
+                time.sleep(self.token_delay)
+                yield CompletionResponse(text=text, delta=delta)
+        return gen()
+
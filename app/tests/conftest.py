@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+# The bot runs with app/ (and the classifier folder) on sys.path, e.g. `python app/discordbot.py`
+APP_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(APP_DIR))
+sys.path.insert(0, str(APP_DIR / "Classifier Models"))
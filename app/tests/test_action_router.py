@@ -0,0 +1,116 @@
+import asyncio
+import time
+
+import pytest
+
+import action_router
+from action_router import (ANSWER_QUESTION, GENERATE_RECOMMENDATION, QUICK_RESPONSE, REQUEST_MORE_INFO, RouterDecision,
+                           RouterStats, achoose_action, choose_action, normalize_action, route_action)
+
+
+@pytest.fixture(autouse=True)
+def defaults(monkeypatch):
+    monkeypatch.setattr(action_router, "MIN_HARD_CONSTRAINTS", 2)
+    monkeypatch.setattr(action_router, "ROUTER_CONFIDENCE_THRESHOLD", 0.8)
+    monkeypatch.setattr(action_router, "should_shadow", lambda: False)
+
+
+def sentence(*intents, constraints=()):
+    return ("some sentence", list(intents), list(constraints))
+
+
+def memory(*constraints):
+    return {"memory": "earlier message", "metadata": {"constraints": list(constraints)}}
+
+
+@pytest.mark.parametrize("classified, memories, action, confidence", [
+    ([sentence("Short_Answer_Inquiry")], [], ANSWER_QUESTION, 0.95),
+    ([sentence("Club_Related_Inquiry")], [], ANSWER_QUESTION, 0.95),
+    ([sentence("Inquire_Resources"), sentence("Short_Answer_Inquiry")], [], ANSWER_QUESTION, 0.4),
+    ([sentence("Inquire_Resources", constraints=["hard", "hard"])], [], GENERATE_RECOMMENDATION, 0.9),
+    ([sentence("Inquire_Resources", constraints=["hard"])], [memory("hard")], GENERATE_RECOMMENDATION, 0.9),
+    ([sentence("Reject_Recommendation")], [], REQUEST_MORE_INFO, 0.9),
+    ([sentence("Inquire_Resources", constraints=["hard", "soft"])], [], REQUEST_MORE_INFO, 0.6),
+    ([sentence("Accept_Recommendation")], [], QUICK_RESPONSE, 0.85),
+    ([sentence("Provide_Preference")], [memory("hard", "hard")], GENERATE_RECOMMENDATION, 0.7),
+    ([sentence("Provide_Preference", constraints=["soft"])], [], REQUEST_MORE_INFO, 0.7),
+    ([sentence()], [], QUICK_RESPONSE, 0.85),
+    ([], [], QUICK_RESPONSE, 0.85),
+])
+def test_route_action_rules(classified, memories, action, confidence):
+    decision = route_action(classified, memories)
+    assert (decision.action, decision.confidence) == (action, confidence)
+
+
+def test_memories_without_metadata_are_ignored():
+    decision = route_action([sentence("Inquire_Resources")], [{"memory": "hi"}, {"memory": "x", "metadata": None}])
+    assert decision.action == REQUEST_MORE_INFO
+
+
+@pytest.mark.parametrize("output, action", [
+    ("Answer a Question", ANSWER_QUESTION),
+    ('"answer a question."', ANSWER_QUESTION),
+    ("  Output: GENERATE RECOMMENDATION\n", GENERATE_RECOMMENDATION),
+    ("'Other/Quick Response'", QUICK_RESPONSE),
+    ("I don't know", None),
+])
+def test_normalize_action(output, action):
+    assert normalize_action(output) == action
+
+
+def test_confident_decisions_skip_the_llm():
+    stats, calls = RouterStats(), []
+    action = choose_action([sentence("Short_Answer_Inquiry")], [], lambda: calls.append(1) or "", stats)
+    assert action == ANSWER_QUESTION
+    assert calls == []
+    assert stats.stats()["local"] == 1 and stats.stats()["llm_fallbacks"] == 0
+
+
+def test_below_threshold_falls_back_to_the_normalized_llm_answer():
+    stats = RouterStats()
+    mixed = [sentence("Inquire_Resources"), sentence("Short_Answer_Inquiry")]  # confidence 0.4
+    assert choose_action(mixed, [], lambda: '"generate recommendation."', stats) == GENERATE_RECOMMENDATION
+    assert choose_action(mixed, [], lambda: "Answer a Question", stats) == ANSWER_QUESTION
+    assert choose_action(mixed, [], lambda: "no idea", stats) == "no idea"
+    result = stats.stats()
+    assert (result["local"], result["llm_fallbacks"], result["compared"]) == (0, 3, 3)
+    assert result["agreement_by_action"] == {ANSWER_QUESTION: pytest.approx(1 / 3)}
+
+
+def test_async_fallback_is_normalized():
+    async def classify():
+        return "Request More Information."
+
+    stats = RouterStats()
+    mixed = [sentence("Inquire_Resources"), sentence("Club_Related_Inquiry")]
+    assert asyncio.run(achoose_action(mixed, [], classify, stats)) == REQUEST_MORE_INFO
+    assert stats.stats()["llm_fallbacks"] == 1
+
+
+def test_shadow_checks_count_agreement(monkeypatch):
+    monkeypatch.setattr(action_router, "should_shadow", lambda: True)
+    stats = RouterStats()
+    assert choose_action([sentence("Short_Answer_Inquiry")], [], lambda: "answer a question", stats) == ANSWER_QUESTION
+    deadline = time.time() + 5
+    while not stats.stats()["compared"] and time.time() < deadline:
+        time.sleep(0.01)
+    result = stats.stats()
+    assert (result["local"], result["compared"], result["agreement_rate"]) == (1, 1, 1.0)
+
+
+def test_agreement_counters_by_action():
+    stats = RouterStats()
+    stats.record_comparison(RouterDecision(ANSWER_QUESTION, 0.95, ""), ANSWER_QUESTION)
+    stats.record_comparison(RouterDecision(ANSWER_QUESTION, 0.95, ""), QUICK_RESPONSE)
+    stats.record_comparison(RouterDecision(QUICK_RESPONSE, 0.85, ""), "Other/Quick Response")
+    stats.record_local()
+    stats.record_fallback()
+    result = stats.stats()
+    assert result["compared"] == 3
+    assert result["agreement_rate"] == pytest.approx(2 / 3)
+    assert result["agreement_by_action"] == {ANSWER_QUESTION: 0.5, QUICK_RESPONSE: 1.0}
+    assert (result["local"], result["llm_fallbacks"]) == (1, 1)
+
+
+def test_empty_stats():
+    assert RouterStats().stats()["agreement_rate"] == 0.0
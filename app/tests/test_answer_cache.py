@@ -0,0 +1,93 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import answer_cache as answer_cache_module
+from answer_cache import AnswerCache
+
+
+@pytest.fixture
+def storage(tmp_path):
+    (tmp_path / "vector_store.json").write_text("{}")
+    return tmp_path
+
+
+def unit(angle):
+    """A 2-d unit vector; the cosine similarity of unit(a) and unit(b) is cos(a - b)."""
+    return [float(np.cos(angle)), float(np.sin(angle))]
+
+
+def test_hit_only_above_the_similarity_threshold(storage):
+    cache = AnswerCache(str(storage), threshold=0.95)
+    cache.store("when is the conference?", unit(0.0), "in March")
+    assert cache.lookup(unit(0.2)) == "in March"   # cos 0.2 ~ 0.980
+    assert cache.lookup(unit(0.4)) is None         # cos 0.4 ~ 0.921
+    assert cache.lookup([5.0, 0.0]) == "in March"  # embeddings are compared by direction only
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_the_most_similar_entry_wins(storage):
+    cache = AnswerCache(str(storage), threshold=0.9)
+    cache.store("a", unit(0.0), "first")
+    cache.store("b", unit(0.3), "second")
+    assert cache.lookup(unit(0.25)) == "second"
+
+
+def test_entries_expire_after_the_ttl(storage, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(answer_cache_module.time, "time", lambda: now[0])
+    cache = AnswerCache(str(storage), ttl=60)
+    cache.store("q", unit(0.0), "answer")
+    now[0] += 59
+    assert cache.lookup(unit(0.0)) == "answer"
+    now[0] += 2
+    assert cache.lookup(unit(0.0)) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entry_is_evicted(storage):
+    cache = AnswerCache(str(storage), max_entries=2, threshold=0.99)
+    cache.store("a", unit(0.0), "A")
+    cache.store("b", unit(1.0), "B")
+    assert cache.lookup(unit(0.0)) == "A"   # "b" is now the least recently used
+    cache.store("c", unit(2.0), "C")
+    assert cache.lookup(unit(1.0)) is None
+    assert cache.lookup(unit(0.0)) == "A"
+    assert cache.lookup(unit(2.0)) == "C"
+
+
+def test_changing_the_storage_directory_drops_every_entry(storage):
+    cache = AnswerCache(str(storage))
+    cache.store("q", unit(0.0), "old answer")
+    assert cache.lookup(unit(0.0)) == "old answer"
+    (storage / "vector_store.json").write_text('{"embedding_dict": {}}')
+    assert cache.lookup(unit(0.0)) is None
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_new_files_in_the_storage_directory_change_the_version(storage):
+    version = answer_cache_module.storage_version(str(storage))
+    (storage / "docstore.json").write_text("{}")
+    assert answer_cache_module.storage_version(str(storage)) != version
+
+
+def test_personalized_answers_are_only_served_to_their_user(storage):
+    cache = AnswerCache(str(storage))
+    cache.store("what should I attend?", unit(0.0), "the ML workshop, since you like PyTorch", user_id="alice")
+    assert cache.lookup(unit(0.0), user_id="bob") is None
+    assert cache.lookup(unit(0.0)) is None
+    assert cache.lookup(unit(0.0), user_id="alice") == "the ML workshop, since you like PyTorch"
+
+
+def test_shared_answers_are_served_to_everyone(storage):
+    cache = AnswerCache(str(storage))
+    cache.store("what is UTMIST?", unit(0.0), "a student club", user_id=None)
+    cache.store("what is UTMIST?", unit(0.01), "alice's answer", user_id="alice")
+    assert cache.lookup(unit(0.01), user_id="bob") == "a student club"
+    assert cache.lookup(unit(0.01), user_id="alice") == "alice's answer"
+
+
+def test_zero_capacity_disables_the_cache(storage):
+    cache = AnswerCache(str(storage), max_entries=0)
+    cache.store("q", unit(0.0), "answer")
+    assert cache.lookup(unit(0.0)) is None
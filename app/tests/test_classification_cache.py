@@ -0,0 +1,51 @@
+import os
+
+from classification_cache import ClassificationCache, file_signature, normalize_sentence
+
+
+class Counter:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return [text.upper() for text in texts]
+
+
+def test_normalize_only_collapses_whitespace():
+    assert normalize_sentence("  I prefer\tvideos \n") == "I prefer videos"
+    assert normalize_sentence("AI") != normalize_sentence("ai")
+
+
+def test_differently_cased_sentences_are_classified_separately():
+    cache, compute = ClassificationCache("test", "v1"), Counter()
+    assert cache.lookup(["Thanks", "thanks", "thanks  "], compute) == ["THANKS", "THANKS", "THANKS"]
+    assert compute.calls == [["Thanks", "thanks"]]
+
+
+def test_hits_are_not_recomputed_and_lru_evicts():
+    cache, compute = ClassificationCache("test", "v1", max_entries=2), Counter()
+    cache.lookup(["a", "b"], compute)
+    cache.lookup(["a"], compute)
+    cache.lookup(["c"], compute)  # evicts "b", the least recently used
+    cache.lookup(["a", "b"], compute)
+    assert compute.calls == [["a", "b"], ["c"], ["b"]]
+
+
+def test_persisted_entries_are_dropped_when_the_version_changes(tmp_path):
+    compute = Counter()
+    ClassificationCache("test", "v1", persist_dir=str(tmp_path)).lookup(["hi"], compute)
+    ClassificationCache("test", "v1", persist_dir=str(tmp_path)).lookup(["hi"], compute)
+    assert compute.calls == [["hi"]]
+    ClassificationCache("test", "v2", persist_dir=str(tmp_path)).lookup(["hi"], compute)
+    assert compute.calls == [["hi"], ["hi"]]
+
+
+def test_file_signature_changes_when_the_weights_are_replaced(tmp_path):
+    weights = tmp_path / "model.pth"
+    weights.write_bytes(b"x" * 10)
+    before = file_signature(str(weights))
+    assert file_signature(str(weights)) == before
+    weights.write_bytes(b"y" * 11)
+    os.utime(weights, ns=(1, 1))
+    assert file_signature(str(weights)) != before
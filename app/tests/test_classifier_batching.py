@@ -0,0 +1,87 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("transformers")
+pytest.importorskip("sklearn")
+pytest.importorskip("pandas")
+
+import classifier_runtime
+import get_constraint_classifier_outcome
+import get_intent_classifier_outcome
+from classification_cache import ClassificationCache
+from Intent_Classifier import LABELS
+
+PAD_ID = 1  # RoBERTa's <pad>
+
+SENTENCES = [
+    "hi",
+    "I want to learn about AI and ML, what do you recommend for someone who has only done a bit of Python?",
+    "thanks",
+    "Can you recommend some resources on machine learning?",
+    "I prefer videos over long articles and I only have about two hours a week, ideally on weekends",
+    "ok",
+]
+
+
+class StubTokenizer:
+    """Word-level stand-in for RobertaTokenizer with the two calls tokenize_batches makes."""
+
+    def __call__(self, texts, truncation, max_length, padding):
+        ids = [[0] + [2 + sum(map(ord, word)) % 997 for word in text.split()][:max_length - 2] + [2] for text in texts]
+        return {"input_ids": ids}
+
+    def pad(self, encoded, padding, max_length, return_tensors):
+        rows = encoded["input_ids"]
+        length = max_length if padding == "max_length" else max(map(len, rows))
+        input_ids = torch.tensor([row + [PAD_ID] * (length - len(row)) for row in rows])
+        return {"input_ids": input_ids, "attention_mask": (input_ids != PAD_ID).long()}
+
+
+class StubClassifier(torch.nn.Module):
+    """Masked mean of token embeddings, so padding must not change a row's logits."""
+
+    def __init__(self, num_labels):
+        super().__init__()
+        torch.manual_seed(0)
+        self.embedding = torch.nn.Embedding(1000, num_labels)
+
+    def forward(self, input_ids, attention_mask):
+        mask = attention_mask.unsqueeze(-1).float()
+        return (self.embedding(input_ids) * mask).sum(1) / mask.sum(1) * 4
+
+
+@pytest.fixture(params=[("max_length", []), ("longest", []), ("longest", [4, 8, 16])],
+                ids=["max_length", "longest", "longest-buckets"])
+def padding(request, monkeypatch):
+    mode, buckets = request.param
+    monkeypatch.setattr(classifier_runtime, "PADDING_MODE", mode)
+    monkeypatch.setattr(classifier_runtime, "LENGTH_BUCKETS", buckets)
+
+
+def serve(monkeypatch, module, num_labels):
+    monkeypatch.setattr(module, "model", StubClassifier(num_labels).eval(), raising=False)
+    monkeypatch.setattr(module, "tokenizer", StubTokenizer(), raising=False)
+    monkeypatch.setattr(module, "device", torch.device("cpu"), raising=False)
+    # No caching, so every call really runs the model
+    monkeypatch.setattr(module, "cache", ClassificationCache(module.__name__, "test", max_entries=0), raising=False)
+
+
+def test_batched_logits_match_single_sentence_logits(padding):
+    model, tokenizer = StubClassifier(len(LABELS)).eval(), StubTokenizer()
+    batched = classifier_runtime.run_forward(model, tokenizer, SENTENCES, torch.device("cpu"))
+    single = torch.cat([classifier_runtime.run_forward(model, tokenizer, [s], torch.device("cpu")) for s in SENTENCES])
+    assert torch.allclose(batched, single, atol=1e-6)
+
+
+def test_intent_batch_matches_per_sentence(padding, monkeypatch):
+    serve(monkeypatch, get_intent_classifier_outcome, len(LABELS))
+    batched = get_intent_classifier_outcome.get_binary_outcomes(SENTENCES)
+    assert batched == [get_intent_classifier_outcome.get_binary_outcome(s) for s in SENTENCES]
+    assert any(batched) and not all(row == batched[0] for row in batched)
+
+
+def test_constraint_batch_matches_per_sentence(padding, monkeypatch):
+    serve(monkeypatch, get_constraint_classifier_outcome, 2)
+    batched = get_constraint_classifier_outcome.get_constraint_predictions(SENTENCES)
+    assert batched == [get_constraint_classifier_outcome.get_constraint_prediction(s) for s in SENTENCES]
+    assert {label for row in batched for label in row} == {"soft", "hard"}
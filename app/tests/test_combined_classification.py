@@ -0,0 +1,78 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from combined_classification import (COMBINED_CLASSIFICATION_ATTEMPTS, FALLBACK_CLASSIFICATION, CombinedClassification,
+                                     classify_combined, parse_combined_classification)
+from relevance_gate import Relevance
+
+VALID = {"relevance": "known", "action": "Answer a Question", "response_length": "specific"}
+
+
+class Completions:
+    """Returns the queued contents in order, shaped like OpenAI ChatCompletion objects."""
+
+    def __init__(self, *contents):
+        self.contents = list(contents)
+        self.calls = []
+
+    def __call__(self, **kwargs):
+        self.calls.append(kwargs)
+        return SimpleNamespace(
+            usage=SimpleNamespace(prompt_tokens=100, completion_tokens=20),
+            choices=[SimpleNamespace(message=SimpleNamespace(content=self.contents.pop(0)))],
+        )
+
+
+def classify(completions):
+    return classify_combined("When is the next workshop?", "sentence: ...", "no memories", "workshop on Friday", completions)
+
+
+def test_parse_valid_output():
+    assert parse_combined_classification(json.dumps(VALID)) == \
+        CombinedClassification(Relevance.KNOWN, "Answer a Question", "specific")
+
+
+@pytest.mark.parametrize("field, value", [
+    ("relevance", "maybe"),
+    ("action", "Answer the Question"),
+    ("action", "answer a question"),
+    ("response_length", "long"),
+])
+def test_out_of_enum_labels_are_rejected(field, value):
+    with pytest.raises(ValueError):
+        parse_combined_classification(json.dumps({**VALID, field: value}))
+
+
+@pytest.mark.parametrize("content, error", [
+    ("not json", ValueError),
+    (json.dumps({"relevance": "known", "action": "Answer a Question"}), KeyError),
+    (json.dumps(["known"]), TypeError),
+    (None, TypeError),
+])
+def test_malformed_output_is_rejected(content, error):
+    with pytest.raises(error):
+        parse_combined_classification(content)
+
+
+def test_valid_output_needs_one_call():
+    completions = Completions(json.dumps(VALID))
+    assert classify(completions) == CombinedClassification(Relevance.KNOWN, "Answer a Question", "specific")
+    [call] = completions.calls
+    assert call["response_format"] == {"type": "json_object"}
+    assert "Query: When is the next workshop?" in call["messages"][1]["content"]
+    assert "workshop on Friday" in call["messages"][1]["content"]
+
+
+def test_malformed_output_is_retried():
+    completions = Completions("{not json", json.dumps({**VALID, "action": "Dance"}), json.dumps({**VALID, "relevance": "irrelevant"}))
+    assert classify(completions).relevance == Relevance.IRRELEVANT
+    assert len(completions.calls) == 3
+
+
+def test_falls_back_after_every_attempt_fails():
+    completions = Completions(*["{}"] * COMBINED_CLASSIFICATION_ATTEMPTS)
+    assert classify(completions) == FALLBACK_CLASSIFICATION
+    assert len(completions.calls) == COMBINED_CLASSIFICATION_ATTEMPTS
+    assert FALLBACK_CLASSIFICATION == CombinedClassification(Relevance.UNKNOWN, "Other/Quick Response", "general")
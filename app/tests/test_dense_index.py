@@ -0,0 +1,76 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from retrieval.dense_index import DenseIndex, normalize_rows, top_k_rows
+
+
+def corpus(num_vectors=500, dim=32, seed=0):
+    rng = np.random.default_rng(seed)
+    # Varied norms, so copy=False has to rescale the scores to get cosine similarities
+    matrix = (rng.standard_normal((num_vectors, dim)) * rng.uniform(0.1, 10, (num_vectors, 1))).astype(np.float32)
+    return matrix, [f"node-{i}" for i in range(num_vectors)], rng.standard_normal((20, dim)).astype(np.float32)
+
+
+def brute_force(matrix, queries, k):
+    scores = normalize_rows(queries) @ normalize_rows(matrix).T
+    rows = np.argsort(-scores, axis=1)[:, :k]
+    return rows, np.take_along_axis(scores, rows, axis=1)
+
+
+@pytest.mark.parametrize("copy", [True, False])
+@pytest.mark.parametrize("k", [1, 5, 50])
+def test_search_matches_brute_force(copy, k):
+    matrix, ids, queries = corpus()
+    index = DenseIndex(matrix, ids, copy=copy)
+    expected_rows, expected_scores = brute_force(matrix, queries, k)
+    for query, rows, scores in zip(queries, expected_rows, expected_scores):
+        found_rows, found_scores = index.search(query, k)
+        assert np.array_equal(found_rows, rows)
+        assert np.allclose(found_scores, scores, atol=1e-5)
+
+
+@pytest.mark.parametrize("copy", [True, False])
+def test_search_batch_matches_brute_force(copy):
+    matrix, ids, queries = corpus()
+    rows, scores = DenseIndex(matrix, ids, copy=copy).search_batch(queries, 10)
+    expected_rows, expected_scores = brute_force(matrix, queries, 10)
+    assert rows.shape == scores.shape == (len(queries), 10)
+    assert np.array_equal(rows, expected_rows)
+    assert np.allclose(scores, expected_scores, atol=1e-5)
+
+
+def test_copy_false_keeps_the_matrix():
+    matrix, ids, _ = corpus()
+    index = DenseIndex(matrix, ids, copy=False)
+    assert index.matrix is matrix
+    assert np.allclose(index.row_vectors(np.array([3, 7])), normalize_rows(matrix[[3, 7]]), atol=1e-6)
+
+
+def test_k_larger_than_the_index_returns_everything():
+    matrix, ids, queries = corpus(num_vectors=4)
+    rows, scores = DenseIndex(matrix, ids).search(queries[0], 10)
+    assert sorted(rows) == [0, 1, 2, 3]
+    assert np.all(np.diff(scores) <= 0)
+
+
+def test_empty_index_and_zero_vectors():
+    index = DenseIndex(np.zeros((0, 8), dtype=np.float32), [])
+    rows, scores = index.search(np.ones(8), 5)
+    assert len(rows) == len(scores) == 0
+
+    matrix = np.array([[0, 0], [1, 0]], dtype=np.float32)
+    rows, scores = DenseIndex(matrix, ["zero", "x"], copy=False).search([2.0, 0.0], 2)
+    assert list(rows) == [1, 0]
+    assert np.allclose(scores, [1.0, 0.0])
+
+
+def test_mismatched_ids_are_rejected():
+    with pytest.raises(ValueError):
+        DenseIndex(np.zeros((3, 4), dtype=np.float32), ["a", "b"])
+
+
+def test_top_k_rows_orders_each_row():
+    scores = np.array([[0.1, 0.9, 0.5, 0.7], [4.0, 3.0, 2.0, 1.0]])
+    assert top_k_rows(scores, 3).tolist() == [[1, 3, 2], [0, 1, 2]]
+    assert top_k_rows(scores, 0).shape == (2, 0)
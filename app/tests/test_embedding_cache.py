@@ -0,0 +1,103 @@
+import asyncio
+import threading
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("llama_index.core")
+
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from retrieval.embedding_cache import CachedEmbedding, EmbeddingCache
+
+
+class Embedder:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(text)), 0.1, -2.5] for text in texts]
+
+
+def test_get_many_returns_none_for_missing_texts(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite"))
+    cache.put_many("model", ["a"], [[1.0, 2.0]])
+    assert cache.get_many("model", ["a", "b"]) == [[1.0, 2.0], None]
+    assert cache.get_many("other-model", ["a"]) == [None]
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_vectors_round_trip_as_float32(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite")
+    vector = np.random.default_rng(0).standard_normal(1536)
+    EmbeddingCache(path).put_many("model", ["text"], [vector.tolist()])
+    [stored] = EmbeddingCache(path).get_many("model", ["text"])
+    assert len(stored) == 1536
+    assert np.array_equal(np.asarray(stored, dtype=np.float32), vector.astype(np.float32))
+
+
+def test_lookup_only_computes_missing_texts_once(tmp_path):
+    cache, embed = EmbeddingCache(str(tmp_path / "embeddings.sqlite")), Embedder()
+    cache.put_many("model", ["cached"], [[9.0, 9.0, 9.0]])
+    vectors = cache.lookup("model", ["new", "cached", "new", "other"], embed)
+    assert embed.calls == [["new", "other"]]
+    assert vectors[1] == [9.0, 9.0, 9.0]
+    assert vectors[0] == vectors[2]
+    cache.lookup("model", ["new", "other"], embed)
+    assert len(embed.calls) == 1
+
+
+def test_keys_collapse_whitespace_but_keep_case(tmp_path):
+    cache, embed = EmbeddingCache(str(tmp_path / "embeddings.sqlite")), Embedder()
+    cache.lookup("model", ["UTMIST  events\n"], embed)
+    cache.lookup("model", ["UTMIST events", "utmist events"], embed)
+    assert embed.calls == [["UTMIST  events\n"], ["utmist events"]]
+
+
+class CountingEmbedding(BaseEmbedding):
+    calls: list = []
+
+    def _get_query_embedding(self, query):
+        return self._get_text_embeddings([query])[0]
+
+    async def _aget_query_embedding(self, query):
+        return self._get_query_embedding(query)
+
+    def _get_text_embedding(self, text):
+        return self._get_text_embeddings([text])[0]
+
+    def _get_text_embeddings(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(text)), 1.0] for text in texts]
+
+
+class ThreadRecordingCache(EmbeddingCache):
+    def __init__(self, path):
+        super().__init__(path)
+        self.threads = []
+
+    def get_many(self, model, texts):
+        self.threads.append(threading.current_thread())
+        return super().get_many(model, texts)
+
+    def put_many(self, model, texts, vectors):
+        self.threads.append(threading.current_thread())
+        return super().put_many(model, texts, vectors)
+
+
+def test_async_lookups_keep_sqlite_off_the_event_loop(tmp_path):
+    cache = ThreadRecordingCache(str(tmp_path / "embeddings.sqlite"))
+    embedding = CachedEmbedding(CountingEmbedding(model_name="counting", calls=[]), cache=cache)
+
+    async def main():
+        loop_thread = threading.current_thread()
+        first = await embedding.aget_query_embedding("what is UTMIST?")
+        second = await embedding.aget_text_embedding_batch(["what is UTMIST?", "workshops"])
+        return loop_thread, first, second
+
+    loop_thread, first, second = asyncio.run(main())
+    assert first == [15.0, 1.0]
+    assert second == [[15.0, 1.0], [9.0, 1.0]]
+    assert embedding.base_embedding.calls == [["what is UTMIST?"], ["workshops"]]
+    assert len(cache.threads) == 4  # get + put per call
+    assert loop_thread not in cache.threads
@@ -0,0 +1,62 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from retrieval.dense_index import DenseIndex
+from retrieval.ivf_index import IVF_FNAME, IVFIndex
+
+
+@pytest.fixture
+def dense():
+    rng = np.random.default_rng(0)
+    # Clustered data, closer to real embeddings than uniform noise
+    centers = rng.standard_normal((8, 24))
+    matrix = (centers[rng.integers(0, 8, 600)] + 0.3 * rng.standard_normal((600, 24))).astype(np.float32)
+    return DenseIndex(matrix, [f"node-{i}" for i in range(600)])
+
+
+@pytest.fixture
+def queries():
+    return np.random.default_rng(1).standard_normal((25, 24)).astype(np.float32)
+
+
+def test_every_row_is_in_exactly_one_list(dense):
+    ivf = IVFIndex.build(dense, nlist=16, seed=0)
+    assert ivf.nlist == 16
+    assert ivf.list_offsets[0] == 0 and ivf.list_offsets[-1] == len(dense)
+    assert sorted(ivf.list_rows.tolist()) == list(range(len(dense)))
+
+
+def test_probing_every_list_matches_exact_search(dense, queries):
+    ivf = IVFIndex.build(dense, nlist=16, seed=0)
+    exact_rows, exact_scores = dense.search_batch(queries, 10)
+    rows, scores = ivf.search_batch(queries, 10, nprobe=ivf.nlist)
+    for found, expected in zip(rows, exact_rows):
+        assert np.array_equal(found, expected)
+    assert np.allclose(np.stack(scores), exact_scores, atol=1e-5)
+
+
+def test_fewer_probes_give_a_subset_of_scores_in_order(dense, queries):
+    ivf = IVFIndex.build(dense, nlist=16, seed=0)
+    for query in queries:
+        rows, scores = ivf.search(query, 10, nprobe=2)
+        assert len(rows) <= 10
+        assert np.all(np.diff(scores) <= 0)
+        assert np.allclose(scores, dense.row_vectors(rows) @ (query / np.linalg.norm(query)), atol=1e-5)
+
+
+def test_save_and_load_round_trip(dense, queries, tmp_path):
+    ivf = IVFIndex.build(dense, nlist=16, seed=0)
+    ivf.save(str(tmp_path))
+    loaded = IVFIndex.load(str(tmp_path), dense, nprobe=4)
+    assert loaded.nprobe == 4
+    assert np.array_equal(loaded.centroids, ivf.centroids)
+    assert np.array_equal(loaded.search(queries[0], 5)[0], ivf.search(queries[0], 5, nprobe=4)[0])
+
+
+def test_load_ignores_a_missing_index_or_one_built_for_other_vectors(dense, tmp_path):
+    assert IVFIndex.load(str(tmp_path), dense) is None
+    IVFIndex.build(dense, nlist=4).save(str(tmp_path))
+    other = DenseIndex(np.asarray(dense.matrix), [f"other-{i}" for i in range(len(dense))])
+    assert (tmp_path / IVF_FNAME).exists()
+    assert IVFIndex.load(str(tmp_path), other) is None
@@ -0,0 +1,109 @@
+import asyncio
+import json
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+openai = pytest.importorskip("openai")
+
+import llm_client
+from llm_client import LLMMetrics, build_messages, chat_completion
+
+
+def completion_body(model="gpt-3.5-turbo", content="hi there"):
+    return {
+        "id": "chatcmpl-1", "object": "chat.completion", "created": 0, "model": model,
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+        "usage": {"prompt_tokens": 12, "completion_tokens": 3, "total_tokens": 15},
+    }
+
+
+@pytest.fixture
+def metrics(monkeypatch):
+    metrics = LLMMetrics()
+    monkeypatch.setattr(llm_client, "llm_metrics", metrics)
+    return metrics
+
+
+@pytest.fixture
+def server():
+    """Answers chat completions; `responses` can queue error responses to send first."""
+    class Server:
+        def __init__(self):
+            self.requests = []
+            self.responses = []
+
+        def __call__(self, request):
+            self.requests.append(json.loads(request.content))
+            if self.responses:
+                return self.responses.pop(0)
+            return httpx.Response(200, json=completion_body(self.requests[-1]["model"]))
+
+    return Server()
+
+
+@pytest.fixture
+def client(monkeypatch, server, metrics):
+    http_client = httpx.Client(transport=llm_client._MetricsTransport(httpx.MockTransport(server)))
+    client = openai.OpenAI(api_key="test", http_client=http_client, max_retries=2)
+    monkeypatch.setattr(llm_client, "get_client", lambda: client)
+    return client
+
+
+def test_build_messages_never_modifies_its_inputs():
+    history = [{"role": "user", "content": "hello"}]
+    assert build_messages("be brief", history) == [{"role": "system", "content": "be brief"}, *history]
+    assert history == [{"role": "user", "content": "hello"}]
+    # Repeated calls with the default list don't accumulate system prompts
+    assert build_messages("first") == [{"role": "system", "content": "first"}]
+    assert build_messages("second") == [{"role": "system", "content": "second"}]
+    assert build_messages(messages=history) is not history
+
+
+def test_chat_completion_sends_the_messages_unmodified(client, server):
+    messages = [{"role": "user", "content": "what is UTMIST?"}]
+    response = chat_completion(messages, model="gpt-4o-mini", temperature=0)
+    assert response.choices[0].message.content == "hi there"
+    assert server.requests[0]["messages"] == messages
+    assert server.requests[0]["temperature"] == 0
+    assert messages == [{"role": "user", "content": "what is UTMIST?"}]
+
+
+def test_metrics_transport_records_requests_and_usage(client, metrics):
+    chat_completion([{"role": "user", "content": "a"}])
+    chat_completion([{"role": "user", "content": "b"}])
+    stats = metrics.stats()["/v1/chat/completions gpt-3.5-turbo"]
+    assert (stats["requests"], stats["errors"], stats["retryable"]) == (2, 0, 0)
+    assert (stats["prompt_tokens"], stats["completion_tokens"]) == (24, 6)
+    assert stats["latency_ms_p95"] >= stats["latency_ms_p50"] >= 0
+
+
+def test_retried_attempts_are_recorded(client, server, metrics):
+    server.responses.append(httpx.Response(429, headers={"retry-after-ms": "1"}, json={"error": {"message": "slow down"}}))
+    assert chat_completion([{"role": "user", "content": "a"}]).choices[0].message.content == "hi there"
+    assert len(server.requests) == 2
+    stats = metrics.stats()
+    failed = stats["/v1/chat/completions ?"]
+    assert (failed["requests"], failed["errors"], failed["retryable"]) == (1, 1, 1)
+    assert stats["/v1/chat/completions gpt-3.5-turbo"]["requests"] == 1
+
+
+def test_transport_errors_are_recorded(metrics):
+    def fail(request):
+        raise httpx.ConnectError("refused", request=request)
+
+    http_client = httpx.Client(transport=llm_client._MetricsTransport(httpx.MockTransport(fail)))
+    with pytest.raises(httpx.ConnectError):
+        http_client.post("https://api.openai.com/v1/chat/completions", json={})
+    assert metrics.stats()["/v1/chat/completions ?"]["errors"] == 1
+
+
+def test_async_transport_records_requests(server, metrics):
+    async def main():
+        transport = llm_client._AsyncMetricsTransport(httpx.MockTransport(server))
+        async with httpx.AsyncClient(transport=transport) as http_client:
+            client = openai.AsyncOpenAI(api_key="test", http_client=http_client, max_retries=0)
+            return await client.chat.completions.create(model="gpt-4o", messages=[{"role": "user", "content": "a"}])
+
+    assert asyncio.run(main()).model == "gpt-4o"
+    assert metrics.stats()["/v1/chat/completions gpt-4o"]["prompt_tokens"] == 12
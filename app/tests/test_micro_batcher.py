@@ -0,0 +1,83 @@
+import asyncio
+import time
+
+import pytest
+from micro_batcher import MicroBatcher
+
+
+class Recorder:
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+
+    def __call__(self, items):
+        self.batches.append(list(items))
+        if self.fail:
+            raise ValueError("batch failed")
+        return [item * 10 for item in items]
+
+
+def test_results_keep_the_order_of_the_items():
+    batch_fn = Recorder()
+    batcher = MicroBatcher(batch_fn, max_batch_size=32, max_wait_ms=20)
+    results = asyncio.run(batcher.submit_many(list(range(10))))
+    assert results == [i * 10 for i in range(10)]
+    assert batch_fn.batches == [list(range(10))]
+
+
+def test_batches_are_split_at_max_batch_size():
+    batch_fn = Recorder()
+    batcher = MicroBatcher(batch_fn, max_batch_size=4, max_wait_ms=20)
+    results = asyncio.run(batcher.submit_many(list(range(10))))
+    assert results == [i * 10 for i in range(10)]
+    assert [len(batch) for batch in batch_fn.batches] == [4, 4, 2]
+    assert batcher.stats()["batch_size_histogram"] == {2: 1, 4: 2}
+
+
+def test_concurrent_callers_share_a_batch():
+    batch_fn = Recorder()
+    batcher = MicroBatcher(batch_fn, max_batch_size=32, max_wait_ms=50)
+
+    async def main():
+        return await asyncio.gather(batcher.submit_many([1, 2]), batcher.submit(3), batcher.submit_many([4]))
+
+    assert asyncio.run(main()) == [[10, 20], 30, [40]]
+    assert len(batch_fn.batches) == 1
+
+
+def test_partial_batch_is_flushed_after_max_wait():
+    batch_fn = Recorder()
+    batcher = MicroBatcher(batch_fn, max_batch_size=32, max_wait_ms=30)
+
+    async def main():
+        start = time.perf_counter()
+        result = await batcher.submit(1)
+        return result, time.perf_counter() - start
+
+    result, elapsed = asyncio.run(main())
+    assert result == 10
+    assert 0.025 <= elapsed < 0.5
+    assert batch_fn.batches == [[1]]
+
+
+def test_batch_error_is_raised_for_every_caller():
+    batcher = MicroBatcher(Recorder(fail=True), max_batch_size=32, max_wait_ms=20)
+
+    async def main():
+        return await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+def test_worker_keeps_running_after_a_failed_batch():
+    batch_fn = Recorder(fail=True)
+    batcher = MicroBatcher(batch_fn, max_batch_size=32, max_wait_ms=5)
+
+    async def main():
+        with pytest.raises(ValueError):
+            await batcher.submit(1)
+        batch_fn.fail = False
+        return await batcher.submit(2)
+
+    assert asyncio.run(main()) == 20
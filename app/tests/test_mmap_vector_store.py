@@ -0,0 +1,121 @@
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("llama_index.core")
+
+from llama_index.core.schema import NodeRelationship, RelatedNodeInfo, TextNode
+from llama_index.core.vector_stores.simple import SimpleVectorStore
+from llama_index.core.vector_stores.types import VectorStoreQuery
+import retrieval.dense_index
+import retrieval.mmap_vector_store
+from retrieval.mmap_vector_store import (JSON_FNAME, MATRIX_FNAME, NORMS_FNAME, MmapVectorStore, has_binary_vector_store,
+                                         load_vector_store)
+
+DIM = 16
+
+
+def make_nodes(count, seed=0, doc="doc"):
+    rng = np.random.default_rng(seed)
+    return [
+        TextNode(id_=f"{doc}-{i}", text=f"node {i}", embedding=rng.standard_normal(DIM).tolist(),
+                 metadata={"position": i}, relationships={NodeRelationship.SOURCE: RelatedNodeInfo(node_id=f"{doc}-{i % 3}")})
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def storage(tmp_path):
+    """A storage directory with a SimpleVectorStore JSON file and its converted binary files."""
+    json_store = SimpleVectorStore()
+    json_store.add(make_nodes(40))
+    json_path = str(tmp_path / JSON_FNAME)
+    json_store.persist(json_path)
+    MmapVectorStore.from_simple_vector_store(SimpleVectorStore.from_persist_path(json_path)).persist(json_path)
+    return tmp_path
+
+
+def query(store, embedding, k=5):
+    result = store.query(VectorStoreQuery(query_embedding=embedding, similarity_top_k=k))
+    return result.ids, np.asarray(result.similarities)
+
+
+def test_converted_store_round_trips(storage):
+    json_store = SimpleVectorStore.from_persist_path(str(storage / JSON_FNAME))
+    store = MmapVectorStore.from_persist_dir(str(storage))
+    assert isinstance(store.matrix, np.memmap)
+    assert store.data.ids == list(json_store.data.embedding_dict)
+    assert store.data.text_id_to_ref_doc_id == json_store.data.text_id_to_ref_doc_id
+    assert store.data.metadata_dict == json_store.data.metadata_dict
+    assert np.array_equal(store.get("doc-7"), np.float32(json_store.get("doc-7")))
+
+
+def test_queries_match_the_json_store(storage):
+    json_store = SimpleVectorStore.from_persist_path(str(storage / JSON_FNAME))
+    store = MmapVectorStore.from_persist_dir(str(storage))
+    for embedding in np.random.default_rng(1).standard_normal((10, DIM)).tolist():
+        json_ids, json_scores = query(json_store, embedding)
+        ids, scores = query(store, embedding)
+        assert ids == json_ids
+        assert np.allclose(scores, json_scores, atol=1e-5)
+
+
+def test_restricted_queries_only_return_matching_nodes(storage):
+    store = MmapVectorStore.from_persist_dir(str(storage))
+    embedding = np.random.default_rng(2).standard_normal(DIM).tolist()
+    result = store.query(VectorStoreQuery(query_embedding=embedding, similarity_top_k=3, node_ids=["doc-1", "doc-2", "doc-5"]))
+    assert sorted(result.ids) == ["doc-1", "doc-2", "doc-5"]
+    result = store.query(VectorStoreQuery(query_embedding=embedding, similarity_top_k=40, doc_ids=["doc-0"]))
+    assert sorted(result.ids) == sorted(f"doc-{i}" for i in range(0, 40, 3))
+
+
+def test_added_and_deleted_nodes_survive_persist(storage):
+    store = MmapVectorStore.from_persist_dir(str(storage))
+    new_nodes = make_nodes(4, seed=3, doc="new")
+    store.add(new_nodes)
+    store.delete("doc-0")
+    store.persist(str(storage / JSON_FNAME))
+
+    reloaded = MmapVectorStore.from_persist_dir(str(storage))
+    assert reloaded.data.ids == store.data.ids
+    assert "doc-0" not in reloaded.data.ids and "new-3" in reloaded.data.ids
+    assert np.array_equal(reloaded.get("new-3"), np.float32(new_nodes[3].embedding))
+    assert query(reloaded, new_nodes[3].embedding, k=1)[0] == ["new-3"]
+
+
+def test_persisted_norms_spare_reading_the_matrix(storage, monkeypatch):
+    def fail(matrix, *args, **kwargs):
+        raise AssertionError("row norms computed from the matrix")
+
+    monkeypatch.setattr(retrieval.mmap_vector_store, "row_norms", fail)
+    monkeypatch.setattr(retrieval.dense_index, "row_norms", fail)
+    store = MmapVectorStore.from_persist_dir(str(storage))
+    norms = np.linalg.norm(np.asarray(store.matrix), axis=1)
+    assert np.allclose(store.exact_index.inv_norms, 1 / norms)
+    assert query(store, store.get("doc-4"), k=1)[0] == ["doc-4"]
+
+
+def test_missing_or_stale_norms_are_recomputed(storage):
+    expected = 1 / np.linalg.norm(np.asarray(MmapVectorStore.from_persist_dir(str(storage)).matrix), axis=1)
+    np.save(storage / NORMS_FNAME, np.ones(3, dtype=np.float32))
+    assert np.allclose(MmapVectorStore.from_persist_dir(str(storage)).exact_index.inv_norms, expected)
+    os.remove(storage / NORMS_FNAME)
+    assert np.allclose(MmapVectorStore.from_persist_dir(str(storage)).exact_index.inv_norms, expected)
+
+
+def test_load_prefers_the_binary_store_unless_the_json_is_newer(storage):
+    assert has_binary_vector_store(str(storage))
+    assert isinstance(load_vector_store(str(storage)), MmapVectorStore)
+
+    matrix_mtime = os.path.getmtime(storage / MATRIX_FNAME)
+    os.utime(storage / JSON_FNAME, (matrix_mtime + 10, matrix_mtime + 10))
+    assert not has_binary_vector_store(str(storage))
+    assert isinstance(load_vector_store(str(storage)), SimpleVectorStore)
+
+
+def test_load_falls_back_to_json_without_converted_files(tmp_path):
+    json_store = SimpleVectorStore()
+    json_store.add(make_nodes(3))
+    json_store.persist(str(tmp_path / JSON_FNAME))
+    assert isinstance(load_vector_store(str(tmp_path)), SimpleVectorStore)
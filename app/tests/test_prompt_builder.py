@@ -0,0 +1,75 @@
+import pytest
+
+pytest.importorskip("tiktoken")
+
+import prompt_builder
+from prompt_builder import MIN_TRUNCATED_TOKENS, PromptSection, fit_sections
+
+
+class CharEncoding:
+    """One token per character, so budgets are easy to reason about (and no BPE file is downloaded)."""
+
+    def encode(self, text):
+        return list(text)
+
+    def decode(self, tokens):
+        return "".join(tokens)
+
+
+@pytest.fixture(autouse=True)
+def char_tokens(monkeypatch):
+    monkeypatch.setattr(prompt_builder, "get_encoding", lambda model=None: CharEncoding())
+
+
+def test_everything_fits():
+    texts, report = fit_sections([PromptSection("query", ["hello"]), PromptSection("context", ["a", "b"], separator="|")], 100)
+    assert texts == {"query": "hello", "context": "a|b"}
+    assert report["context"] == {"tokens": 3, "items": 2, "dropped": 0, "truncated": False}
+
+
+def test_sections_are_filled_in_priority_order():
+    query = PromptSection("query", ["q" * 60])
+    context = PromptSection("context", ["c" * 60])
+    texts, report = fit_sections([query, context], 80)
+    assert texts == {"query": "q" * 60, "context": ""}
+    assert report["context"] == {"tokens": 0, "items": 0, "dropped": 1, "truncated": False}
+
+    texts, _ = fit_sections([context, query], 80)
+    assert texts == {"context": "c" * 60, "query": ""}
+
+
+def test_lowest_priority_item_is_truncated_to_the_remaining_budget():
+    budget = 10 + 1 + MIN_TRUNCATED_TOKENS + 5
+    section = PromptSection("memories", ["m" * 10, "n" * 100, "o" * 10], separator="\n")
+    texts, report = fit_sections([section], budget)
+    assert texts["memories"] == "m" * 10 + "\n" + "n" * (budget - 11)
+    assert len(texts["memories"]) == budget
+    assert report["memories"] == {"tokens": budget, "items": 2, "dropped": 1, "truncated": True}
+
+
+def test_item_is_dropped_when_too_little_budget_is_left_to_truncate():
+    section = PromptSection("memories", ["m" * 10, "n" * 100])
+    texts, report = fit_sections([section], 10 + MIN_TRUNCATED_TOKENS - 1)
+    assert texts["memories"] == "m" * 10
+    assert report["memories"] == {"tokens": 10, "items": 1, "dropped": 1, "truncated": False}
+
+
+def test_ranks_pick_items_but_keep_their_order():
+    section = PromptSection("context", ["a" * 40, "b" * 40, "c" * 40], separator="|", ranks=[2, 0, 1])
+    texts, report = fit_sections([section], 81)
+    assert texts["context"] == "b" * 40 + "|" + "c" * 40
+    assert report["context"]["dropped"] == 1
+
+
+def test_later_sections_get_what_earlier_ones_leave():
+    sections = [PromptSection("query", ["q" * 20]), PromptSection("context", ["c" * 100]), PromptSection("past", ["p" * 5])]
+    texts, report = fit_sections(sections, 20 + MIN_TRUNCATED_TOKENS + 10)
+    assert texts["context"] == "c" * (MIN_TRUNCATED_TOKENS + 10)
+    assert texts["past"] == ""
+    assert sum(section["tokens"] for section in report.values()) == 20 + MIN_TRUNCATED_TOKENS + 10
+
+
+def test_empty_sections():
+    texts, report = fit_sections([PromptSection("context", [])], 10)
+    assert texts == {"context": ""}
+    assert report["context"] == {"tokens": 0, "items": 0, "dropped": 0, "truncated": False}
@@ -0,0 +1,56 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from retrieval.dense_index import DenseIndex, normalize_rows
+from retrieval.quantized_index import CODES_FNAME, QuantizedIndex
+
+
+@pytest.fixture
+def dense():
+    rng = np.random.default_rng(0)
+    matrix = rng.standard_normal((2000, 64)).astype(np.float32)
+    return DenseIndex(matrix, [f"node-{i}" for i in range(len(matrix))], copy=False)
+
+
+@pytest.fixture
+def queries(dense):
+    # Stored vectors plus noise, like real queries that have close matches
+    rng = np.random.default_rng(1)
+    rows = rng.choice(len(dense), 30, replace=False)
+    return dense.row_vectors(rows) + 0.5 * normalize_rows(rng.standard_normal((30, 64)))
+
+
+def test_codes_approximate_the_vectors(dense, tmp_path):
+    quantized = QuantizedIndex.build(dense, str(tmp_path))
+    assert quantized.codes.dtype == np.int8
+    assert isinstance(quantized.codes, np.memmap)
+    reconstructed = np.asarray(quantized.codes, dtype=np.float32) * quantized.scales
+    assert np.abs(reconstructed - dense.row_vectors(slice(None))).max() <= quantized.scales.max() / 2 + 1e-6
+
+
+def test_rerank_returns_the_exact_top_k(dense, queries, tmp_path):
+    quantized = QuantizedIndex.build(dense, str(tmp_path))
+    quantized.rerank = 50
+    exact_rows, exact_scores = dense.search_batch(queries, 10)
+    rows, scores = quantized.search_batch(queries, 10)
+    for found, found_scores, expected, expected_scores in zip(rows, scores, exact_rows, exact_scores):
+        assert np.array_equal(found, expected)
+        assert np.allclose(found_scores, expected_scores, atol=1e-5)
+
+
+def test_rerank_below_top_k_still_returns_top_k(dense, queries, tmp_path):
+    quantized = QuantizedIndex.build(dense, str(tmp_path))
+    quantized.rerank = 1
+    rows, scores = quantized.search(queries[0], 5)
+    assert len(rows) == 5
+    assert np.all(np.diff(scores) <= 0)
+
+
+def test_load_ignores_a_missing_index_or_one_built_for_other_vectors(dense, tmp_path):
+    assert QuantizedIndex.load(str(tmp_path), dense) is None
+    QuantizedIndex.build(dense, str(tmp_path))
+    assert (tmp_path / CODES_FNAME).exists()
+    other = DenseIndex(np.asarray(dense.matrix), [f"other-{i}" for i in range(len(dense))])
+    assert QuantizedIndex.load(str(tmp_path), other) is None
+    assert QuantizedIndex.load(str(tmp_path), dense, rerank=7).rerank == 7
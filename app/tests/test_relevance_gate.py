@@ -0,0 +1,67 @@
+from relevance_gate import LocalRelevanceGate, Relevance
+
+
+class Classifier:
+    def __init__(self, probability=0.5, load_error=None):
+        self.probability = probability
+        self.load_error = load_error
+        self.loads = 0
+        self.scored = []
+
+    def initialize(self):
+        self.loads += 1
+        if self.load_error is not None:
+            raise self.load_error
+
+    def score(self, text):
+        self.scored.append(text)
+        return self.probability
+
+
+def gate_for(classifier, **kwargs):
+    return LocalRelevanceGate(classifier.initialize, classifier.score, reject_below=0.1, **kwargs)
+
+
+def test_missing_checkpoint_falls_through_to_the_llm():
+    classifier = Classifier(load_error=FileNotFoundError("final_model_weights.pth"))
+    gate = gate_for(classifier)
+    assert gate.classify("what's the weather?") is None
+    assert not gate.enabled
+    # Later messages go straight to the LLM check without retrying the load
+    assert gate.classify("when is the next workshop?") is None
+    assert classifier.loads == 1
+    assert classifier.scored == []
+
+
+def test_scoring_errors_fall_through_to_the_llm():
+    classifier = Classifier()
+    classifier.score = lambda text: 1 / 0
+    gate = gate_for(classifier)
+    assert gate.classify("hello") is None
+    assert not gate.enabled
+
+
+def test_confidently_irrelevant_messages_are_rejected():
+    classifier = Classifier(probability=0.05)
+    assert gate_for(classifier).classify("best pizza in town?") == Relevance.IRRELEVANT
+
+
+def test_relevant_messages_are_left_to_the_llm():
+    # The binary model can't tell "known" from "unknown", so even a confident score isn't a verdict
+    for probability in (0.5, 0.99):
+        assert gate_for(Classifier(probability=probability)).classify("what is UTMIST?") is None
+
+
+def test_model_is_loaded_once():
+    classifier = Classifier(probability=0.5)
+    gate = gate_for(classifier)
+    gate.classify("a")
+    gate.classify("b")
+    assert classifier.loads == 1
+    assert classifier.scored == ["a", "b"]
+
+
+def test_disabled_gate_never_loads_the_model():
+    classifier = Classifier(probability=0.0)
+    assert gate_for(classifier, enabled=False).classify("anything") is None
+    assert classifier.loads == 0
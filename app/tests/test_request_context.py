@@ -0,0 +1,106 @@
+import asyncio
+import itertools
+
+import pytest
+
+pytest.importorskip("llama_index.core")
+
+from llama_index.core import Settings
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.retrievers import BaseRetriever
+from llama_index.core.schema import NodeWithScore, TextNode
+from request_context import RequestContext
+
+
+class CountingEmbedding(BaseEmbedding):
+    calls: int = 0
+
+    def _get_query_embedding(self, query):
+        self.calls += 1
+        return [float(len(query)), 1.0]
+
+    async def _aget_query_embedding(self, query):
+        await asyncio.sleep(0.01)
+        return self._get_query_embedding(query)
+
+    def _get_text_embedding(self, text):
+        return self._get_query_embedding(text)
+
+
+class CountingRetriever(BaseRetriever):
+    def __init__(self):
+        super().__init__()
+        self.bundles = []
+
+    def _retrieve(self, query_bundle):
+        self.bundles.append(query_bundle)
+        return [NodeWithScore(node=TextNode(text="first node"), score=0.9),
+                NodeWithScore(node=TextNode(text="second node"), score=0.8)]
+
+
+@pytest.fixture
+def embed_model():
+    model = CountingEmbedding(model_name="counting")
+    previous = Settings._embed_model
+    Settings.embed_model = model
+    yield model
+    Settings._embed_model = previous
+
+
+STEPS = {
+    "embedding": lambda context: context.get_query_embedding(),
+    "retrieve": lambda context: context.retrieve(),
+    "context_str": lambda context: context.context_str(),
+}
+
+
+@pytest.mark.parametrize("order", list(itertools.permutations(STEPS)))
+def test_each_order_embeds_and_retrieves_once(embed_model, order):
+    retriever = CountingRetriever()
+    context = RequestContext("when is the next workshop?", retriever)
+    for step in order + order:
+        STEPS[step](context)
+    assert embed_model.calls == 1
+    assert len(retriever.bundles) == 1
+    # The retriever gets the embedding computed here instead of embedding the query again
+    assert retriever.bundles[0].embedding == context.query_embedding
+    assert context.context_str() == "first node\n\nsecond node"
+
+
+def test_async_and_sync_steps_share_results(embed_model):
+    retriever = CountingRetriever()
+    context = RequestContext("what is UTMIST?", retriever)
+
+    async def main():
+        await context.aget_query_embedding()
+        nodes = await context.aretrieve()
+        return nodes, await context.acontext_str()
+
+    nodes, text = asyncio.run(main())
+    assert context.retrieve() is nodes
+    assert context.context_str() == text
+    assert context.get_query_embedding() == [15.0, 1.0]
+    assert (embed_model.calls, len(retriever.bundles)) == (1, 1)
+
+
+def test_retrieve_first_embeds_once_async(embed_model):
+    retriever = CountingRetriever()
+    context = RequestContext("what is UTMIST?", retriever)
+
+    async def main():
+        await context.acontext_str()
+        await context.aget_query_embedding()
+        await context.aretrieve()
+
+    asyncio.run(main())
+    assert (embed_model.calls, len(retriever.bundles)) == (1, 1)
+
+
+def test_concurrent_contexts_for_the_same_query_share_one_embedding(embed_model):
+    contexts = [RequestContext("same question", CountingRetriever()) for _ in range(3)]
+
+    async def main():
+        return await asyncio.gather(*(context.aget_query_embedding() for context in contexts))
+
+    assert asyncio.run(main()) == [[13.0, 1.0]] * 3
+    assert embed_model.calls == 1
@@ -0,0 +1,64 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("llama_index.llms.openai")
+
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.schema import TextNode
+from llama_index.core.vector_stores.simple import SimpleVectorStore
+from retrieval.retriever import RetrievalConfig, VectorStoreRetriever
+
+
+class LookupEmbedding(BaseEmbedding):
+    """Embeds the query text "a", "b", ... as the matching fixed vector."""
+    vectors: dict = {}
+
+    def _get_query_embedding(self, query):
+        return self.vectors[query]
+
+    async def _aget_query_embedding(self, query):
+        return self.vectors[query]
+
+    def _get_text_embedding(self, text):
+        return self.vectors[text]
+
+
+VECTORS = {"a": [1.0, 0.0, 0.0], "b": [0.0, 1.0, 0.0], "c": [0.0, 0.0, 1.0]}
+
+
+@pytest.fixture
+def store():
+    store = SimpleVectorStore()
+    store.add([
+        TextNode(id_="node-a", text="a", embedding=VECTORS["a"], metadata={"Link": "https://a.example"}),
+        TextNode(id_="node-b", text="b", embedding=VECTORS["b"], metadata={"Link": "https://b.example"}),
+        # Nodes without a Link (e.g. ingested from another source) must not break retrieval
+        TextNode(id_="node-c", text="c", embedding=VECTORS["c"], metadata={}),
+    ])
+    return store
+
+
+def retriever_for(store, top_k=1, score_threshold=0.7):
+    config = RetrievalConfig(top_k=top_k, score_threshold=score_threshold,
+                             embedding_model=LookupEmbedding(vectors=VECTORS, model_name="lookup"))
+    return VectorStoreRetriever(store, config)
+
+
+def test_node_without_link_does_not_break_other_queries(store):
+    assert retriever_for(store).retrieve("a") == ["<https://a.example>"]
+    assert retriever_for(store).retrieve("b") == ["<https://b.example>"]
+
+
+def test_results_without_link_are_skipped(store):
+    assert retriever_for(store).retrieve("c") == []
+
+
+def test_score_threshold(store):
+    assert retriever_for(store, top_k=3, score_threshold=0.7).retrieve("a") == ["<https://a.example>"]
+    assert retriever_for(store, top_k=3, score_threshold=None).retrieve("a") == ["<https://a.example>", "<https://b.example>"]
+
+
+def test_retrieve_batch_matches_retrieve(store):
+    retriever = retriever_for(store, top_k=3, score_threshold=None)
+    assert retriever.retrieve_batch(["a", "b", "c"]) == [retriever.retrieve(query) for query in "abc"]
+    assert retriever.retrieve_batch([]) == []
@@ -0,0 +1,103 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from singleflight import SingleFlight, flight_key
+
+
+def test_flight_key_is_stable_and_distinguishes_calls():
+    assert flight_key("gpt", [{"role": "user", "content": "hi"}], {"b": 1, "a": 2}) == \
+        flight_key("gpt", [{"role": "user", "content": "hi"}], {"a": 2, "b": 1})
+    assert flight_key("gpt", "hi") != flight_key("gpt", "hello")
+
+
+def test_concurrent_threads_share_one_call():
+    flight = SingleFlight("test")
+    calls = []
+    barrier = threading.Barrier(5)
+
+    def fn():
+        calls.append(1)
+        time.sleep(0.2)
+        return "answer"
+
+    results = []
+
+    def caller():
+        barrier.wait()
+        results.append(flight.do("key", fn))
+
+    threads = [threading.Thread(target=caller) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ["answer"] * 5
+    assert len(calls) == 1
+    assert flight.stats()["calls"] == 1 and flight.stats()["shared"] == 4
+
+
+def test_concurrent_coroutines_share_one_call():
+    flight = SingleFlight("test")
+    calls = []
+
+    async def fn():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def main():
+        return await asyncio.gather(*(flight.ado("key", fn) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["answer"] * 5
+    assert len(calls) == 1
+
+
+def test_errors_are_shared():
+    flight = SingleFlight("test")
+    calls = []
+
+    async def fn():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        raise RuntimeError("upstream failed")
+
+    async def main():
+        return await asyncio.gather(*(flight.ado("key", fn) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_sequential_calls_are_not_cached():
+    flight = SingleFlight("test")
+    calls = []
+
+    def fn():
+        calls.append(1)
+        return len(calls)
+
+    assert flight.do("key", fn) == 1
+    assert flight.do("key", fn) == 2
+    with pytest.raises(ZeroDivisionError):
+        flight.do("key", lambda: 1 / 0)
+    assert flight.do("key", fn) == 3
+
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    flight = SingleFlight("test")
+
+    async def fn():
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def main():
+        first = asyncio.ensure_future(flight.ado("key", fn))
+        second = asyncio.ensure_future(flight.ado("key", fn))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(main()) == "answer"
@@ -0,0 +1,106 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+pytest.importorskip("llama_index.core")
+
+from llama_index.core.schema import TextNode
+from llama_index.core.storage.docstore import SimpleDocumentStore
+from llama_index.core.storage.index_store import SimpleIndexStore
+from retrieval.sqlite_kvstore import (DOCSTORE_JSON_FNAME, INDEX_STORE_JSON_FNAME, KV_DB_FNAME, SqliteKVStore,
+                                      has_sqlite_kvstore, load_docstore_and_index_store, migrate_json_stores)
+
+
+@pytest.fixture
+def kvstore(tmp_path):
+    return SqliteKVStore(str(tmp_path / KV_DB_FNAME), cache_size=2)
+
+
+def test_put_get_delete(kvstore):
+    kvstore.put("a", {"text": "first"})
+    kvstore.put_all([("b", {"text": "second"}), ("c", {"text": "third"})])
+    assert kvstore.get("a") == {"text": "first"}
+    assert kvstore.get("missing") is None
+    kvstore.put("a", {"text": "replaced"})
+    assert kvstore.get("a") == {"text": "replaced"}
+    assert kvstore.delete("b")
+    assert not kvstore.delete("b")
+    assert kvstore.get("b") is None
+    assert kvstore.get_all() == {"a": {"text": "replaced"}, "c": {"text": "third"}}
+
+
+def test_collections_are_separate(kvstore):
+    kvstore.put("key", {"v": 1}, collection="docstore/data")
+    kvstore.put("key", {"v": 2}, collection="index_store/data")
+    assert kvstore.get("key", collection="docstore/data") == {"v": 1}
+    assert kvstore.get("key", collection="index_store/data") == {"v": 2}
+    assert kvstore.get("key") is None
+    kvstore.delete("key", collection="docstore/data")
+    assert kvstore.get_all("index_store/data") == {"key": {"v": 2}}
+
+
+def test_get_returns_an_independent_copy(kvstore):
+    kvstore.put("node", {"metadata": {"tags": ["a"]}, "text": "hello"})
+    for _ in range(2):  # a miss, then an LRU hit
+        value = kvstore.get("node")
+        value["text"] = "changed"
+        value["metadata"]["tags"].append("b")
+    assert kvstore.get("node") == {"metadata": {"tags": ["a"]}, "text": "hello"}
+
+
+def test_lru_counts_hits_and_evicts(kvstore):
+    for key in "abc":
+        kvstore.put(key, {"key": key})
+    kvstore.get("a")
+    kvstore.get("b")
+    kvstore.get("a")
+    kvstore.get("c")  # evicts "b"
+    kvstore.get("b")
+    assert kvstore.stats()["cached"] == 2
+    assert (kvstore.hits, kvstore.misses) == (1, 4)
+
+
+def test_async_methods(kvstore):
+    async def main():
+        await kvstore.aput("a", {"v": 1})
+        await kvstore.aput_all([("b", {"v": 2})])
+        assert await kvstore.aget("a") == {"v": 1}
+        assert await kvstore.adelete("a")
+        return await kvstore.aget_all()
+
+    assert asyncio.run(main()) == {"b": {"v": 2}}
+
+
+def test_migration_round_trips_the_json_stores(tmp_path):
+    docstore = SimpleDocumentStore()
+    docstore.add_documents([TextNode(id_=f"node-{i}", text=f"text {i}", metadata={"i": i}) for i in range(5)])
+    docstore.persist(str(tmp_path / DOCSTORE_JSON_FNAME))
+    SimpleIndexStore().persist(str(tmp_path / INDEX_STORE_JSON_FNAME))
+    assert not has_sqlite_kvstore(str(tmp_path))
+
+    with open(tmp_path / DOCSTORE_JSON_FNAME) as f:
+        expected = json.load(f)
+    counts = migrate_json_stores(str(tmp_path))
+    assert counts["docstore/data"] == 5
+    assert not os.path.exists(tmp_path / (KV_DB_FNAME + ".tmp"))
+    assert has_sqlite_kvstore(str(tmp_path))
+
+    migrated_docstore, _ = load_docstore_and_index_store(str(tmp_path))
+    assert isinstance(migrated_docstore._kvstore, SqliteKVStore)
+    assert migrated_docstore.get_node("node-3").get_content() == "text 3"
+    assert migrated_docstore.get_node("node-3").metadata == {"i": 3}
+    kvstore = SqliteKVStore(str(tmp_path / KV_DB_FNAME))
+    for collection, values in expected.items():
+        assert kvstore.get_all(collection) == values
+
+
+def test_json_stores_are_used_when_newer_than_the_migration(tmp_path):
+    SimpleDocumentStore().persist(str(tmp_path / DOCSTORE_JSON_FNAME))
+    SimpleIndexStore().persist(str(tmp_path / INDEX_STORE_JSON_FNAME))
+    migrate_json_stores(str(tmp_path))
+    db_mtime = os.path.getmtime(tmp_path / KV_DB_FNAME)
+    os.utime(tmp_path / DOCSTORE_JSON_FNAME, (db_mtime + 10, db_mtime + 10))
+    docstore, _ = load_docstore_and_index_store(str(tmp_path))
+    assert not isinstance(docstore._kvstore, SqliteKVStore)
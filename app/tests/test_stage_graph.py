@@ -0,0 +1,71 @@
+import asyncio
+import time
+
+import pytest
+from stage_graph import Stage, StageGraph
+
+
+def sleeper(result, delay=0.05, log=None, name=None):
+    async def run(deps):
+        if log is not None:
+            log.append(("start", name, dict(deps)))
+        await asyncio.sleep(delay)
+        if log is not None:
+            log.append(("end", name))
+        return result
+    return run
+
+
+def test_independent_stages_overlap():
+    graph = StageGraph([Stage("a", sleeper(1, 0.2)), Stage("b", sleeper(2, 0.2)), Stage("c", sleeper(3, 0.2))])
+    start = time.perf_counter()
+    results = asyncio.run(graph.run())
+    assert results == {"a": 1, "b": 2, "c": 3}
+    assert time.perf_counter() - start < 0.5  # sequential would take 0.6 s
+
+
+def test_dependencies_run_first_and_get_results():
+    log = []
+    graph = StageGraph([
+        # Declared before its dependencies on purpose
+        Stage("answer", sleeper("answer", 0.01, log, "answer"), depends_on=("memories", "classified")),
+        Stage("memories", sleeper("m", 0.05, log, "memories")),
+        Stage("classified", sleeper("c", 0.02, log, "classified")),
+    ])
+    results = asyncio.run(graph.run())
+    assert results["answer"] == "answer"
+    start_answer = log.index(("start", "answer", {"memories": "m", "classified": "c"}))
+    assert log.index(("end", "memories")) < start_answer
+    assert log.index(("end", "classified")) < start_answer
+
+
+def test_failure_cancels_the_other_stages():
+    cancelled = []
+
+    async def slow(deps):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append("slow")
+            raise
+
+    async def fail(deps):
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    graph = StageGraph([Stage("slow", slow), Stage("fail", fail), Stage("after", sleeper(1), depends_on=("fail",))])
+    start = time.perf_counter()
+    with pytest.raises(RuntimeError, match="boom"):
+        asyncio.run(graph.run())
+    assert cancelled == ["slow"]
+    assert time.perf_counter() - start < 1
+
+
+@pytest.mark.parametrize("stages", [
+    [Stage("a", sleeper(1)), Stage("a", sleeper(2))],
+    [Stage("a", sleeper(1), depends_on=("missing",))],
+    [Stage("a", sleeper(1), depends_on=("b",)), Stage("b", sleeper(2), depends_on=("a",))],
+])
+def test_invalid_graphs_are_rejected(stages):
+    with pytest.raises(ValueError):
+        StageGraph(stages)
@@ -0,0 +1,79 @@
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("llama_index.core")
+
+from streaming import (DISCORD_MESSAGE_LIMIT, STREAM_ERROR_MESSAGE, STREAM_PLACEHOLDER, FakeStreamingLLM,
+                       astream_completion, stream_to_message)
+
+
+class FakeMessage:
+    def __init__(self, log):
+        self.log = log
+
+    async def edit(self, content):
+        self.log.append((time.monotonic(), "edit", content))
+
+
+class FakeChannel:
+    def __init__(self):
+        self.log = []
+
+    async def send(self, content):
+        self.log.append((time.monotonic(), "send", content))
+        return FakeMessage(self.log)
+
+
+def stream(llm, edit_interval):
+    channel = FakeChannel()
+    text = asyncio.run(stream_to_message(channel, astream_completion(llm, "What is UTMIST?"), edit_interval=edit_interval))
+    return channel.log, text
+
+
+def test_first_chunk_is_shown_immediately_and_edits_are_throttled():
+    llm = FakeStreamingLLM(token_delay=0.02)
+    log, text = stream(llm, edit_interval=0.1)
+
+    assert text == llm.answer
+    (sent_at, kind, content), edits = log[0], log[1:]
+    assert (kind, content) == ("send", STREAM_PLACEHOLDER)
+    # The first word is on screen after one token delay, not after an edit interval
+    assert edits[0][2] == llm.answer.split(" ")[0]
+    assert edits[0][0] - sent_at < 0.1
+    # Every edit but the final one is at least edit_interval after the previous edit
+    assert all(b[0] - a[0] >= 0.1 for a, b in zip(edits, edits[1:-1]))
+    assert len(edits) < len(llm.answer.split(" "))
+    assert edits[-1][2] == llm.answer
+
+
+def test_long_answers_are_cut_to_the_discord_limit():
+    llm = FakeStreamingLLM(answer=" ".join(["word"] * 800), token_delay=0)
+    log, text = stream(llm, edit_interval=0)
+
+    assert text == llm.answer and len(text) > DISCORD_MESSAGE_LIMIT
+    assert all(len(content) <= DISCORD_MESSAGE_LIMIT for _, _, content in log)
+    assert log[-1][2] == llm.answer[:DISCORD_MESSAGE_LIMIT]
+
+
+def failing_chunks(partial):
+    async def chunks():
+        for chunk in partial:
+            yield chunk
+        raise ConnectionError("stream dropped")
+    return chunks()
+
+
+def test_error_mid_stream_replaces_the_partial_answer_and_is_raised():
+    channel = FakeChannel()
+    with pytest.raises(ConnectionError):
+        asyncio.run(stream_to_message(channel, failing_chunks(["UTMIST runs", " workshops"]), edit_interval=0))
+    assert channel.log[-1][2] == f"UTMIST runs workshops\n\n{STREAM_ERROR_MESSAGE}"
+
+
+def test_error_before_any_chunk_replaces_the_placeholder():
+    channel = FakeChannel()
+    with pytest.raises(ConnectionError):
+        asyncio.run(stream_to_message(channel, failing_chunks([]), edit_interval=0))
+    assert channel.log[-1][2] == STREAM_ERROR_MESSAGE